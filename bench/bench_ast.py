@@ -0,0 +1,47 @@
+import os
+import sys
+import gc
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.regex_scanner import RegexScanner
+from src.parser import Parser
+from src.errors import ErrorCollector
+from synth import synth_program
+
+# memory held by the AST (and the objects it keeps alive) per source line,
+# on a large synthetic program
+
+def ast_memory(source : str) -> int:
+
+  errors = ErrorCollector()
+  tokens = RegexScanner(errors).tokenize(source)
+
+  gc.collect()
+  tracemalloc.start()
+
+  prog = Parser(errors).parse(tokens)
+  del tokens # only what the AST references is left
+  gc.collect()
+
+  held = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  assert errors.ok()
+  return held
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("-n", type=int, default=1000, help="number of synthetic functions")
+  args = arg_parser.parse_args()
+
+  source = synth_program(args.n)
+  lines = source.count('\n')
+
+  held = ast_memory(source)
+
+  print("source: %d lines" %(lines))
+  print("AST: %.2f MB, %.1f bytes/line" %(held / 1e6, held / lines))
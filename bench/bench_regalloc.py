@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compiler import Options, compile
+
+# instructions, memory operations and run time of loop-heavy kernels, compiled
+# with the stack machine (-fno-regalloc) and with the register allocation
+# it needs gcc to assemble and run the kernels
+
+kernels = {
+  "sum" : """
+    int sum(int n) { int i, s=0; for (i=0; i<n; i=i+1) s = s + i; return s; }
+    int main() { int r, k=0; for (r=0; r<%(reps)d; r=r+1) k = k + sum(10000); return k == 0; }
+  """,
+  "nested" : """
+    int grid(int n) {
+      int i, j, s=0;
+      for (i=0; i<n; i=i+1)
+        for (j=0; j<n; j=j+1)
+          s = s + (i*n + j) / (j+1) - (i <= j);
+      return s;
+    }
+    int main() { int r, k=0; for (r=0; r<%(reps)d; r=r+1) k = k + grid(100); return k == 0; }
+  """,
+  "fib" : """
+    int fib(int n) { int a=0, b=1, c, i; for (i=0; i<n; i=i+1) { c=a+b; a=b; b=c; } return a; }
+    int main() { int r, k=0; for (r=0; r<%(reps)d * 20; r=r+1) k = k + fib(80) / 1000 + fib(40); return k == 0; }
+  """,
+  "array" : """
+    int t[256];
+    int fill(int n) {
+      int i, s=0;
+      for (i=0; i<n; i=i+1) t[i] = i * 3;
+      for (i=0; i<n; i=i+1) s = s + t[i] * t[n-1-i];
+      return s;
+    }
+    int main() { int r, k=0; for (r=0; r<%(reps)d * 10; r=r+1) k = k + fill(256); return k == 0; }
+  """,
+}
+
+def count(asm : str) -> tuple:
+  # number of instructions, and of those that touch memory (pushes and pops included)
+  instrs = mem_ops = 0
+
+  for line in asm.splitlines() :
+    if not line.startswith("\t") or line.startswith("\t.") : continue # labels and directives
+
+    instrs += 1
+    op = line.split()[0]
+    if "(" in line or op in ("pushq", "popq", "call", "ret", "leave") :
+      mem_ops += 1
+
+  return instrs, mem_ops
+
+def run_time(asm : str, workdir : str, repeat : int) -> float:
+
+  asm_path = os.path.join(workdir, "kernel.s")
+  exe_path = os.path.join(workdir, "kernel")
+
+  with open(asm_path, "w") as asm_file :
+    asm_file.write(asm)
+  subprocess.run(["gcc", "-o", exe_path, asm_path], check=True, capture_output=True)
+
+  best = float("inf")
+  for _ in range(repeat) :
+    start = time.perf_counter()
+    subprocess.run([exe_path])
+    best = min(best, time.perf_counter() - start)
+
+  return best
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("--reps", type=int, default=5000, help="calls of each kernel")
+  arg_parser.add_argument("-r", "--repeat", type=int, default=3)
+  args = arg_parser.parse_args()
+
+  configs = (("stack", Options(flags={"regalloc" : False})),
+             ("regalloc", Options(flags={"regalloc" : True})))
+
+  print("%-8s %-9s %7s %8s %9s" %("kernel", "", "instrs", "mem ops", "time (s)"))
+
+  with tempfile.TemporaryDirectory() as workdir :
+    for name, source in kernels.items() :
+      for config, options in configs :
+        result = compile(source %{"reps" : args.reps}, options)
+        assert result.ok, result.messages
+
+        instrs, mem_ops = count(result.asm)
+        elapsed = run_time(result.asm, workdir, args.repeat)
+
+        print("%-8s %-9s %7d %8d %9.3f" %(name, config, instrs, mem_ops, elapsed))
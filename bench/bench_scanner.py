@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scanner import Scanner
+from src.regex_scanner import RegexScanner
+from src.errors import ErrorCollector
+from synth import synth_program
+
+# lexing throughput (MB/s) of the classic per-character scanner and the
+# master regex scanner, on a large synthetic program, and the memory taken by
+# a list of Token objects against the compact TokenBuffer
+
+def tokenize(scanner_type : type, source : str) -> list:
+  errors = ErrorCollector()
+  tk_list = scanner_type(errors).tokenize(source)
+  assert errors.ok()
+  return tk_list
+
+def token_memory(tokenize, source : str) -> tuple:
+  # returns the number of tokens and the bytes held by them
+
+  tracemalloc.start()
+  tk_list = tokenize(source)
+  held = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  return len(tk_list), held
+
+def throughput(scanner_type : type, source : str, repeat : int) -> float:
+
+  best = float("inf")
+  for _ in range(repeat) :
+    start = time.perf_counter()
+    tokenize(scanner_type, source)
+    best = min(best, time.perf_counter() - start)
+
+  return len(source.encode()) / best / 1e6
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("-n", type=int, default=2000, help="number of synthetic functions")
+  arg_parser.add_argument("-r", "--repeat", type=int, default=3)
+  args = arg_parser.parse_args()
+
+  source = synth_program(args.n)
+
+  # both scanners must produce the same token stream
+  fields = lambda tk : (tk.kind, tk.lexeme, tk.literal, tk.row, tk.col)
+  classic = list(map(fields, tokenize(Scanner, source)))
+  regex = list(map(fields, tokenize(RegexScanner, source)))
+  assert classic == regex, "token streams differ"
+
+  print("source: %.2f MB, %d tokens" %(len(source) / 1e6, len(classic)))
+
+  base = throughput(Scanner, source, args.repeat)
+  fast = throughput(RegexScanner, source, args.repeat)
+
+  print("%-8s %8.2f MB/s" %("classic", base))
+  print("%-8s %8.2f MB/s  (%.1fx)" %("regex", fast, fast / base))
+
+  for name, tokenize in (("Token list",  lambda source : list(RegexScanner(ErrorCollector()).scan(source))),
+                         ("TokenBuffer", lambda source : RegexScanner(ErrorCollector()).tokenize(source))) :
+    count, held = token_memory(tokenize, source)
+    print("%-12s %8.2f MB  (%.1f bytes/token)" %(name, held / 1e6, held / count))
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import argparse
+import subprocess
+
+# compares the compile throughput (requests/sec) of:
+#   cold    : one 'python3 main.py' process per source
+#   client  : one 'python3 client.py' process per source, against a running server
+#   stream  : requests sent over a single connection to the running server
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+source = """
+int add(int x, int y) { return x+y; }
+int sum(int *x, int n) { int i=0, s=0; for (i=0; i<n; i=i+1) s=add(s, x[i]); return s; }
+int main() { int x[4]; x[0]=1; x[1]=2; x[2]=3; x[3]=4; if (sum(x, 4) == 10) return 0; return 1; }
+"""
+
+def bench_cold(path : str, n : int) -> float:
+
+  start = time.perf_counter()
+  for _ in range(n) :
+    subprocess.run([sys.executable, os.path.join(root, "main.py"), path, "-o", os.devnull],
+                   check=True)
+  return n / (time.perf_counter() - start)
+
+def bench_client(path : str, sock : str, n : int) -> float:
+
+  start = time.perf_counter()
+  for _ in range(n) :
+    subprocess.run([sys.executable, os.path.join(root, "client.py"), "--socket", sock,
+                    path, "-o", os.devnull], check=True)
+  return n / (time.perf_counter() - start)
+
+def bench_stream(sock : str, n : int) -> float:
+
+  request = json.dumps({"id" : 0, "source" : source}).encode() + b"\n"
+
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn :
+    conn.connect(sock)
+    stream = conn.makefile("rwb")
+
+    start = time.perf_counter()
+    for _ in range(n) :
+      stream.write(request); stream.flush()
+      assert json.loads(stream.readline())["ok"]
+    return n / (time.perf_counter() - start)
+
+def wait_for(sock : str, timeout : float = 10.0) -> None:
+
+  deadline = time.monotonic() + timeout
+  while not os.path.exists(sock) :
+    if time.monotonic() > deadline :
+      raise RuntimeError("compile server didn't start")
+    time.sleep(0.05)
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("-n", type=int, default=50, help="number of compilations")
+  args = arg_parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmp :
+    path = os.path.join(tmp, "prog.c")
+    sock = os.path.join(tmp, "sidcc.sock")
+
+    with open(path, "w") as f : f.write(source)
+
+    server = subprocess.Popen([sys.executable, os.path.join(root, "main.py"), "--serve", sock])
+    try :
+      wait_for(sock)
+      results = [
+        ("cold main.py", bench_cold(path, args.n)),
+        ("client.py",    bench_client(path, sock, args.n)),
+        ("stream",       bench_stream(sock, args.n * 20)),
+      ]
+    finally :
+      server.terminate()
+      server.wait()
+
+  base = results[0][1]
+  for name, rate in results :
+    print("%-14s %10.1f req/s  (%.1fx)" %(name, rate, rate / base))
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.symtab import SymbolTable
+from src.object_type import GVar, LVar
+from src.data_type import ty_int
+from src.regex_scanner import RegexScanner
+from src.parser import Parser
+from src.errors import ErrorCollector
+
+# cost of the symbol table as the number of declarations grows: the time per
+# declaration or lookup should stay flat from 10k to 1M declarations
+# (with the former linear lookups it grew with the number of globals)
+
+def table_ops(n : int, block : int = 16) -> float:
+  # n globals and n locals, declared in nested blocks of 'block' variables
+  # that shadow the globals, all looked up, returns the ns per operation
+
+  names = ["v%d" %(i) for i in range(n)]
+  symbols = SymbolTable()
+
+  start = time.perf_counter()
+
+  for name in names :
+    symbols.add_global(GVar(ty_int, name))
+
+  symbols.enter_scope()
+  for i, name in enumerate(names) :
+    if i % block == 0 : symbols.enter_scope()
+    symbols.add_local(name, LVar(ty_int, -8 * (i + 1)))
+    assert symbols.find_var(name).is_local
+    if i % block == block - 1 : symbols.exit_scope()
+
+  while symbols.depth > 0 :
+    symbols.exit_scope()
+
+  for name in names :
+    assert not symbols.find_var(name).is_local
+
+  elapsed = time.perf_counter() - start
+
+  # n global declarations, n local ones, 2n lookups
+  return elapsed / (4 * n) * 1e9
+
+def declarations(n : int, per_fn : int = 100) -> str:
+  # n globals, used by functions spread along the program
+  lines = []
+
+  for i in range(0, n, per_fn) :
+    names = ["g%d" %(j) for j in range(i, min(i + per_fn, n))]
+    lines += ["int %s;" %(name) for name in names]
+    lines.append("int f%d() {" %(i))
+    lines += ["  %s = %d;" %(name, j) for j, name in enumerate(names)]
+    lines.append("  return %s;" %(names[0]))
+    lines.append("}")
+
+  return "\n".join(lines) + "\n"
+
+def parse_time(source : str) -> float:
+
+  errors = ErrorCollector()
+  tokens = RegexScanner(errors).tokenize(source)
+
+  start = time.perf_counter()
+  Parser(errors).parse(tokens)
+  elapsed = time.perf_counter() - start
+
+  assert errors.ok()
+  return elapsed
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+  arg_parser.add_argument("--parse-limit", type=int, default=100_000,
+                          help="largest size also measured through the parser")
+  args = arg_parser.parse_args()
+
+  for n in args.sizes :
+    line = "%9d declarations: %7.1f ns/op" %(n, table_ops(n))
+
+    if n <= args.parse_limit :
+      elapsed = parse_time(declarations(n))
+      line += ", parse %7.3f s (%.1f us/declaration)" %(elapsed, elapsed / n * 1e6)
+
+    print(line)
@@ -0,0 +1,55 @@
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compiler import Options, compile
+from bench_regalloc import count, run_time
+
+# the same array-scanning kernel over arrays of each integer type, the data
+# (and the cache bandwidth it takes) shrinks with the size of the elements
+# it needs gcc to assemble and run the kernels
+
+kernel = """
+  %(type)s t[%(length)d];
+  long scan(int n) {
+    long s=0; int i;
+    for (i=0; i<n; i=i+1) s = s + t[i];
+    return s;
+  }
+  int main() {
+    int i, r; long k=0;
+    for (i=0; i<%(length)d; i=i+1) t[i] = i;
+    for (r=0; r<%(reps)d; r=r+1) k = k + scan(%(length)d);
+    return k == 0;
+  }
+"""
+
+types = ("char", "short", "int", "long")
+
+if __name__ == "__main__" :
+
+  arg_parser = argparse.ArgumentParser()
+  arg_parser.add_argument("--length", type=int, default=1 << 18, help="elements of the array")
+  arg_parser.add_argument("--reps", type=int, default=200, help="scans of the array")
+  arg_parser.add_argument("-r", "--repeat", type=int, default=3)
+  args = arg_parser.parse_args()
+
+  print("%-6s %-4s %9s %7s %9s" %("type", "", "data (B)", "instrs", "time (s)"))
+
+  with tempfile.TemporaryDirectory() as workdir :
+    for name in types :
+      source = kernel %{"type" : name, "length" : args.length, "reps" : args.reps}
+
+      for level in (1, 2) :
+        result = compile(source, Options(opt_level = level))
+        assert result.ok, result.messages
+
+        data = sum(int(line.split()[1]) for line in result.asm.splitlines()
+                   if line.startswith("\t.zero"))
+        instrs, _ = count(result.asm)
+        elapsed = run_time(result.asm, workdir, args.repeat)
+
+        print("%-6s -O%d %9d %7d %9.3f" %(name, level, data, instrs, elapsed))
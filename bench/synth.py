@@ -0,0 +1,34 @@
+
+# generates large synthetic C programs for the benchmarks
+
+def synth_program(n_functions : int) -> str:
+  # every function touches globals, arrays, pointers, loops, branches and calls
+  lines = []
+
+  for i in range(n_functions) :
+    lines += [
+      "int g%d;" %(i),
+      "int t%d[8];" %(i),
+      "int f%d(int x, int y) {" %(i),
+      "  int i=0, s=0;",
+      "  int *p=&s;",
+      "  for (i=0; i<8; i=i+1) {",
+      "    t%d[i] = i * %d + x;" %(i, i % 7 + 1),
+      "    s = s + t%d[i] / 2;" %(i),
+      "  }",
+      "  if (s >= y) *p = s - y; else *p = y - s;",
+      "  g%d = s;" %(i),
+    ]
+    if i > 0 :
+      lines.append("  return f%d(s, g%d) + 1;" %(i - 1, i))
+    else :
+      lines.append("  return s;")
+    lines.append("}")
+
+  lines += [
+    "int main() {",
+    "  return f%d(1, 2) == 0;" %(n_functions - 1),
+    "}",
+  ]
+
+  return "\n".join(lines) + "\n"
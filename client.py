@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import socket
+import argparse
+
+# thin client for a compile server started with 'main.py --serve SOCKET'
+# it takes the same arguments as main.py, but doesn't import the compiler itself
+
+default_socket = os.environ.get("SIDCC_SOCKET", "/tmp/sidcc.sock")
+
+def parse_args() :
+
+  arg_parser = argparse.ArgumentParser(prog="sidcc-client")
+  arg_parser.add_argument("inputs", nargs="+", metavar="FILE",
+                          help="C source files to be compiled, '-' reads from stdin")
+  arg_parser.add_argument("-o", dest="output", metavar="FILE", default=None,
+                          help="write the assembly to FILE, only for a single input")
+  arg_parser.add_argument("--stats", action="store_true",
+                          help="report the number of lines and bytes emitted")
+  arg_parser.add_argument("--socket", default=default_socket,
+                          help="unix socket of the compile server (default: %(default)s)")
+  # forwarded to the server in the options of each request, that checks them
+  arg_parser.add_argument("--scanner", default=None,
+                          help="scanner engine (default: the one of the server)")
+  arg_parser.add_argument("--tokens", choices=("stream", "buffer"), default=None,
+                          help="stream the tokens to the parser, or buffer them all first (default: stream)")
+  arg_parser.add_argument("-O", dest="opt_level", metavar="LEVEL", type=int, default=None,
+                          help="optimization level (default: 1)")
+  arg_parser.add_argument("-f", dest="flags", metavar="[no-]PASS", action="append", default=[],
+                          help="enable (or disable, with -fno-PASS) an optimization pass")
+  arg_parser.add_argument("--inline-threshold", metavar="N", type=int, default=None,
+                          help="inline the functions of at most N IR instructions (default: 16)")
+  arg_parser.add_argument("--emit-ir", action="store_true",
+                          help="write the three-address IR instead of the assembly (foo.c -> foo.ir)")
+
+  args = arg_parser.parse_args()
+
+  if args.output is not None and len(args.inputs) > 1 :
+    arg_parser.error("cannot specify '-o' with multiple files")
+
+  return args
+
+def request_options(args) -> dict:
+  # the options of the requests, the ones not given are left to the server
+  flags = {}
+  for flag in args.flags :
+    enabled = not flag.startswith("no-")
+    flags[flag if enabled else flag[len("no-"):]] = enabled
+
+  options = {"scanner" : args.scanner, "opt_level" : args.opt_level,
+             "inline_threshold" : args.inline_threshold}
+  options = {name : value for name, value in options.items() if value is not None}
+
+  if flags : options["flags"] = flags
+  if args.tokens is not None : options["stream_tokens"] = args.tokens == "stream"
+  if args.emit_ir : options["emit_ir"] = True
+
+  return options
+
+def read_source(path : str) -> str:
+
+  if path == '-' :
+    return sys.stdin.read()
+
+  with open(path, "r") as input_file :
+    return input_file.read()
+
+def output_path(path : str, output : str, suffix : str = ".s") -> str:
+
+  if output is not None :
+    return output
+  elif path == '-' :
+    return '-'
+  else :
+    return os.path.splitext(path)[0] + suffix
+
+if __name__ == "__main__" :
+
+  args = parse_args()
+
+  failed = 0
+  requests = []
+  options = request_options(args)
+
+  for path in args.inputs :
+    try :
+      source = read_source(path)
+    except OSError as err :
+      sys.stderr.write("sidcc: %s: %s\n" %(path, err.strerror))
+      failed += 1
+    except UnicodeDecodeError as err :
+      sys.stderr.write("sidcc: %s: invalid UTF-8 text (%s at byte %d)\n" %(path, err.reason, err.start))
+      failed += 1
+    else :
+      request = {"id" : len(requests), "source" : source, "options" : options}
+      if path != '-' : request["filename"] = path
+      requests.append((path, request))
+
+  try :
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(args.socket)
+  except OSError as err :
+    sys.stderr.write("sidcc: cannot connect to %s: %s\n" %(args.socket, err.strerror))
+    sys.exit(1)
+
+  with conn, conn.makefile("rwb") as stream :
+
+    for path, request in requests :
+      stream.write(json.dumps(request).encode() + b"\n")
+      stream.flush()
+
+      line = stream.readline()
+      if not line :
+        sys.stderr.write("sidcc: connection closed by the compile server\n")
+        sys.exit(1)
+
+      response = json.loads(line)
+
+      if "error" in response :
+        sys.stderr.write("sidcc: %s: %s\n" %(path, response["error"]))
+        failed += 1; continue
+
+      sys.stderr.write(response["messages"])
+
+      if not response["ok"] :
+        failed += 1; continue
+
+      if response["ir"] is not None :
+        output, text = output_path(path, args.output, ".ir"), response["ir"]
+      else :
+        output, text = output_path(path, args.output), response["asm"]
+
+      if output == '-' :
+        sys.stdout.write(text)
+      else :
+        with open(output, "w") as output_file :
+          output_file.write(text)
+
+      if args.stats :
+        sys.stderr.write("%s: %d lines, %d bytes emitted\n"
+                         %(output, response["lines"], response["bytes"]))
+
+  if failed :
+    sys.exit(1)
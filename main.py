@@ -1,36 +1,247 @@
+import os
 import sys
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from src.scanner import Scanner
-from src.parser import Parser
-from src.asm_gen import Asm_Generator
-from src.errors import error_collector
+from src.compiler import Options, compile, compile_file, read_source
+from src.cache import CompileCache
 
-if __name__ == "__main__" :
+# multipliers of the suffixes of --cache-size
+size_units = {"" : 1, "K" : 1 << 10, "M" : 1 << 20, "G" : 1 << 30}
 
-  if len(sys.argv) != 2 :
-    sys.stderr.write("%s: invalid number of arguments" %(sys.argv[0]))
-    sys.exit(64)
+def parse_size(text : str) -> int:
+  # a number of bytes, e.g. 4096, 512K or 2G
+  unit = text[-1:].upper() if text[-1:].isalpha() else ""
+  number = text[:len(text) - len(unit)]
+  if not number.isdigit() or unit not in size_units :
+    raise argparse.ArgumentTypeError("invalid size: '%s'" %(text))
+  return int(number) * size_units[unit]
 
-  user_input = sys.argv[1] 
-  
-  error_collector.set_source(user_input)
+def parse_args() :
 
-  tk_list = Scanner.tokenize(user_input)
+  arg_parser = argparse.ArgumentParser(prog="sidcc")
+  arg_parser.add_argument("inputs", nargs="*", metavar="FILE",
+                          help="C source files to be compiled, '-' reads from stdin")
+  arg_parser.add_argument("-o", dest="output", metavar="FILE", default=None,
+                          help="write the assembly to FILE, only for a single input")
+  arg_parser.add_argument("--stats", action="store_true",
+                          help="report the number of lines and bytes emitted")
+  arg_parser.add_argument("-j", dest="jobs", metavar="N", type=int, default=1,
+                          help="compile the inputs in N worker processes, 0 uses all cores")
+  arg_parser.add_argument("--scanner", choices=sorted(Options.scanners), default="regex",
+                          help="scanner engine (default: %(default)s)")
+  arg_parser.add_argument("--tokens", choices=("stream", "buffer"), default="stream",
+                          help="stream the tokens to the parser as they are scanned, or scan "
+                               "them all into a compact buffer first (default: %(default)s)")
+  arg_parser.add_argument("-O", dest="opt_level", metavar="LEVEL", type=int,
+                          choices=sorted(Options.levels), default=1,
+                          help="optimization level (default: %(default)s)")
+  arg_parser.add_argument("-f", dest="flags", metavar="[no-]PASS", action="append", default=[],
+                          help="enable (or disable, with -fno-PASS) an optimization pass, "
+                               "one of: %s" %(", ".join(Options.passes)))
+  arg_parser.add_argument("--inline-threshold", metavar="N", type=int, default=16,
+                          help="inline the functions of at most N IR instructions (default: %(default)s)")
+  arg_parser.add_argument("--emit-ir", action="store_true",
+                          help="write the three-address IR instead of the assembly (foo.c -> foo.ir)")
+  arg_parser.add_argument("--serve", metavar="SOCKET", default=None,
+                          help="run as a compile server on the unix socket SOCKET, "
+                               "or on stdin/stdout if SOCKET is '-'")
+  arg_parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("SIDCC_CACHE_DIR"),
+                          help="keep the results in the compile cache at DIR, and reuse them "
+                               "for the same source and options (default: $SIDCC_CACHE_DIR)")
+  arg_parser.add_argument("--cache-size", metavar="SIZE", type=parse_size,
+                          default=CompileCache.default_size,
+                          help="evict the least recently used results once the cache takes "
+                               "more than SIZE bytes, with a K, M or G suffix (default: 64M)")
+  arg_parser.add_argument("--cache-stats", action="store_true",
+                          help="report the cache hits and misses, and the size of the cache "
+                               "once trimmed to --cache-size")
 
-  # for token in tk_list :
-  #  print(token)
-  
-  error_collector.show()	
-  if not error_collector.ok() :
-    sys.exit(1)
+  args = arg_parser.parse_args()
 
-  prog = Parser.parse(tk_list)
+  if args.cache_stats and args.cache_dir is None :
+    arg_parser.error("--cache-stats requires --cache-dir")
 
-  error_collector.show()	
-  if not error_collector.ok() :
-    sys.exit(1)
+  if args.serve is None and not args.inputs and not args.cache_stats :
+    arg_parser.error("no input files")
+
+  if args.output is not None and len(args.inputs) > 1 :
+    arg_parser.error("cannot specify '-o' with multiple files")
+
+  flags = {}
+  for flag in args.flags :
+    enabled = not flag.startswith("no-")
+    name = flag if enabled else flag[len("no-"):]
+
+    if name not in Options.passes :
+      arg_parser.error("unknown optimization pass: %s" %(name))
+    flags[name] = enabled
+
+  args.flags = flags
+
+  if args.jobs < 0 :
+    arg_parser.error("invalid number of jobs: %d" %(args.jobs))
+  elif args.jobs == 0 :
+    args.jobs = os.cpu_count() or 1
+
+  return args
+
+def output_path(path : str, output : str, suffix : str = ".s") -> str:
+  # stdin is compiled to stdout, unless -o is given
+  # each source file foo.c is compiled to foo.s (or foo.ir), next to it
+  if output is not None :
+    return output
+  elif path == '-' :
+    return '-'
+  else :
+    return os.path.splitext(path)[0] + suffix
+
+def write_result(path : str, result, output : str, stats : bool) -> bool:
+
+  sys.stderr.write(result.messages)
+
+  if not result.ok :
+    return False
+
+  if result.ir is not None :
+    output, text = output_path(path, output, ".ir"), result.ir
+  else :
+    output, text = output_path(path, output), result.asm
+
+  if output == '-' :
+    sys.stdout.write(text)
+  else :
+    with open(output, "w") as output_file :
+      output_file.write(text)
+
+  if stats :
+    sys.stderr.write("%s: %d lines, %d bytes emitted\n" %(output, result.lines, result.bytes))
+
+    if result.peephole is not None :
+      hits = ", ".join("%s: %d" %(rule, count) for rule, count in result.peephole.items() if count)
+      sys.stderr.write("%s: peephole eliminated %d instructions%s\n"
+                       %(output, result.eliminated, " (%s)" %(hits) if hits else ""))
+
+    if result.frames is not None :
+      for name, (before, after) in result.frames.items() :
+        sys.stderr.write("%s: frame of %s: %d bytes of locals, %d before sharing slots\n"
+                         %(output, name, after, before))
+
+    if result.inlined :
+      sys.stderr.write("%s: inlined %d calls\n" %(output, result.inlined))
+
+    if result.tailcalls is not None and any(result.tailcalls.values()) :
+      sys.stderr.write("%s: turned %d self-recursive calls into loops, %d tail calls into jumps\n"
+                       %(output, result.tailcalls["loops"], result.tailcalls["jumps"]))
 
-  Asm_Generator.gen(prog)
-	
+    if result.ssa is not None :
+      removed = dict(result.ssa)
+      promoted = removed.pop("promoted")
+      moved = removed.pop("licm", 0)
+      passes = ", ".join("%s: %d" %(name, count) for name, count in removed.items() if count)
+      sys.stderr.write("%s: ssa promoted %d variables, removed %d instructions%s, hoisted %d out of loops\n"
+                       %(output, promoted, sum(removed.values()), " (%s)" %(passes) if passes else "", moved))
 
+  return True
 
+def write_cache_stats(options : Options, cached : Counter) -> None:
+  # the cache is trimmed to its size first, as it may have been given a smaller one
+  cache = CompileCache(options.cache_dir, options.cache_size)
+  cache.evict()
+  entries = cache.entries()
+  sys.stderr.write("cache %s: %d hits, %d misses, %d entries, %d bytes (limit %d)\n"
+                   %(options.cache_dir, cached[True], cached[False], len(entries),
+                     sum(size for _, size, _ in entries), options.cache_size))
+
+def report_unreadable(path : str, err : Exception) -> None:
+  # an input that can't be read (OSError), or isn't UTF-8 text (UnicodeDecodeError)
+  if isinstance(err, UnicodeDecodeError) :
+    reason = "invalid UTF-8 text (%s at byte %d)" %(err.reason, err.start)
+  else :
+    reason = err.strerror
+
+  sys.stderr.write("sidcc: %s: %s\n" %(path, reason))
+
+def compile_serial(inputs : list, options : Options, output : str, stats : bool,
+                   cached : Counter) -> int:
+  # all inputs are compiled in this process, even if some of them fail
+  # the hits (True) and misses (False) of the cache are counted in cached
+  failed = 0
+
+  for path in inputs :
+    try :
+      if path == '-' :
+        result = compile(read_source(path), options)
+      else :
+        result = compile_file(path, options)
+    except (OSError, UnicodeDecodeError) as err :
+      report_unreadable(path, err)
+      failed += 1
+    else :
+      if result.cached is not None : cached[result.cached] += 1
+      if not write_result(path, result, output, stats) :
+        failed += 1
+
+  return failed
+
+def compile_parallel(inputs : list, options : Options, output : str, stats : bool,
+                     cached : Counter, jobs : int) -> int:
+  # each input is an independent translation unit, so they are compiled by a pool of
+  # worker processes and every result is written as soon as its file finishes
+  failed = 0
+
+  with ProcessPoolExecutor(max_workers=min(jobs, len(inputs))) as pool :
+
+    pending = {}
+    for path in inputs :
+      if path == '-' : # only the parent can read stdin
+        try :
+          source = read_source(path)
+        except (OSError, UnicodeDecodeError) as err :
+          report_unreadable(path, err)
+          failed += 1
+        else :
+          pending[pool.submit(compile, source, options)] = path
+      else :
+        pending[pool.submit(compile_file, path, options)] = path
+
+    for future in as_completed(pending) :
+      path = pending[future]
+
+      try :
+        result = future.result()
+      except (OSError, UnicodeDecodeError) as err :
+        report_unreadable(path, err)
+        failed += 1
+      else :
+        if result.cached is not None : cached[result.cached] += 1
+        if not write_result(path, result, output, stats) :
+          failed += 1
+
+  return failed
+
+if __name__ == "__main__" :
+
+  args = parse_args()
+
+  if args.serve is not None :
+    from src.server import serve
+    serve(args.serve, cache_dir=args.cache_dir, cache_size=args.cache_size)
+    sys.exit(0)
+
+  options = Options(scanner=args.scanner, stream_tokens=(args.tokens == "stream"), opt_level=args.opt_level, flags=args.flags,
+                    emit_ir=args.emit_ir, inline_threshold=args.inline_threshold,
+                    cache_dir=args.cache_dir, cache_size=args.cache_size)
+  cached = Counter()
+
+  if args.jobs > 1 and len(args.inputs) > 1 :
+    failed = compile_parallel(args.inputs, options, args.output, args.stats, cached, args.jobs)
+  else :
+    failed = compile_serial(args.inputs, options, args.output, args.stats, cached)
+
+  if args.cache_stats :
+    write_cache_stats(options, cached)
+
+  if failed :
+    sys.exit(1)
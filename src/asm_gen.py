@@ -1,88 +1,332 @@
-
 from .stmt import *
 from .expr import *
 from .parser import Object
+from .object_type import Var
 from .data_type import *
+from .emitter import Emitter
+from .instr import *
+from .regalloc import RegisterAllocator
+from .peephole import PeepholeOptimizer
+from .strength import StrengthReducer
+from .ir import truncate
+
+class _Lines(list) :
+  # collects the instructions of a function, before they are written out
+  emit = list.append
 
 class Asm_Generator :
   
-  _depth = 0
-  _label_count = 0
   _argreg = ["%rdi", "%rsi", "%rdx", "%rcx", "%r8", "%r9"]
-  _current_fn = None
 
-  @classmethod
-  def gen(cls, prog : list) -> None:
-    
-    cls._emit_data(prog)
-    cls._emit_text(prog)
+  # registers preserved across calls, that a function must restore before returning
+  _callee_saved = ["%rbx", "%r12", "%r13", "%r14", "%r15"]
+
+  # scratch registers that aren't used to pass arguments nor clobbered by idivq
+  _caller_saved = ["%r10", "%r11"]
+
+  # argument registers the body never writes to besides calls, the parameters
+  # passed in them stay there in a leaf function
+  _kept_argreg = ["%rsi", "%rcx", "%r8", "%r9"]
+
+  # bytes below %rsp that a function may use without moving it, and that signal
+  # handlers leave alone (the red zone of the System V ABI)
+  _red_zone = 128
+
+  # the instructions loading a signed integer of each size to a 64-bit register,
+  # sign-extending it, and storing the low bytes of a register
+  _loads = {1 : "movsbq", 2 : "movswq", 4 : "movslq", 8 : "movq"}
+  _stores = {1 : "movb", 2 : "movw", 4 : "movl", 8 : "movq"}
+
+  # the directives of the data of each size
+  _data = {1 : ".byte", 2 : ".short", 4 : ".long", 8 : ".quad"}
+
+  # condition codes of the relational operators, and the opposite of each one
+  _cc = {Operator.EQ : "e", Operator.NE : "ne", Operator.LT : "l", Operator.LE : "le"}
+  _negated = {"e" : "ne", "ne" : "e", "l" : "ge", "ge" : "l", "le" : "g", "g" : "le"}
+
+  def __init__(self, regalloc : bool = False, peephole : PeepholeOptimizer = None,
+                     strength : StrengthReducer = None, branch : bool = False,
+                     leaf : bool = False) :
+    # without regalloc, every temporary goes through the stack and
+    # every variable lives in memory
+    # the instructions of each function are rewritten by peephole, if given
+    # the multiplications and divisions by constants are reduced by strength, if given
+    # with branch, conditions jump straight from the flags of a comparison, and
+    # loops test their condition at the bottom
+    # with leaf, functions that make no calls keep their parameters in the argument
+    # registers, and don't set up a frame if their locals fit in the red zone
+    self._regalloc = regalloc
+    self._peephole = peephole
+    self._strength = strength
+    self._branch = branch
+    self._leaf = leaf
+    self._depth = 0       # number of live temporaries
+    self._pushes = 0      # number of values pushed on the stack, for the alignment of calls
+    self._label_count = 0
+    self._current_fn = None
+    self._out = None
+    self._temps = []      # registers of the temporaries, the rest go to the stack
+    self._regs = dict()   # LVar -> register, for the variables kept in registers
+    self._saved = set()   # callee-saved registers used by the current function
+
+  def gen(self, prog : list, out : Emitter = None) -> Emitter:
+    # instructions are collected by the emitter, that writes them in bulk
+    # if no emitter is given, the assembly is kept in memory
+    self._out = out if out is not None else Emitter()
+
+    self._emit_data(prog)
+    self._emit_text(prog)
+
+    self._out.flush()
+    return self._out
     
-  @classmethod
-  def _emit_data(cls, prog : list) :
-
-    print(".data")
+  def _emit_data(self, prog : list) :
+    # the globals with a value other than 0 go to .data, the rest to .bss, that
+    # takes no room in the object file
+    gvars = [obj for obj in prog if not obj.is_function]
+    data = [var for var in gvars if var.init and any(var.init)]
+    bss = [var for var in gvars if not (var.init and any(var.init))]
+
+    for section, section_vars in ((".data", data), (".bss", bss)) :
+      if not section_vars : continue
+      self._out.emit(section)
    
-    for obj in prog :
-      if obj.is_function : continue
+      for var in section_vars :
+        self._out.emit("\t.globl %s" %(var.name))
+        self._out.emit("\t.align %d" %(self._data_align(var.data_type)))
+        self._out.emit("%s:" %(var.name))
+        self._emit_values(var)
   
-      print("\t.globl %s" %(obj.name))
-      print("%s:" %(obj.name))
-      print("\t.zero %d\n" %(obj.data_type.size))
+  def _data_align(self, data_type : DataType) -> int:
+    # the System V ABI aligns the arrays of 16 bytes or more to 16
+    if data_type.is_array and data_type.size >= 16 : return 16
+    return data_type.align
 
-  @classmethod
-  def _emit_text(cls, prog : list) :
+  def _emit_values(self, var : Var) :
+    # the initializer of var, with the directive of the size of its elements
+    elem_type = var.data_type
+    while elem_type.is_array : elem_type = elem_type.base
+
+    values = var.init if var.init and any(var.init) else []
+    for value in values :
+      self._out.emit("\t%s %d" %(self._data[elem_type.size], truncate(value, elem_type.size)))
+
+    rest = var.data_type.size - len(values) * elem_type.size
+    if rest > 0 : self._out.emit("\t.zero %d" %(rest))
+    self._out.emit("")
+
+  def _emit_text(self, prog : list) :
     
-    print(".text")
+    self._out.emit(".text")
 
     for obj in prog :
   
       if not obj.is_function : continue
     
-      print("\t.globl %s" %(obj.name))
-      print("%s:" %(obj.name))
-      
-      cls._current_fn = obj
+      self._current_fn = obj
+      self._allocate_registers(obj)
+
+      # the body is generated first, to know which callee-saved registers it uses
+      out, self._out = self._out, _Lines()
+
+      # save passed-by-register arguments to their registers or to the stack
+      # the bits above the size of a parameter are undefined, they are sign-extended
+      for reg, var in zip(self._argreg, obj.params) :
+        size = var.data_type.size
+        if var in self._regs :
+          if self._regs[var] != reg or size < 8 :
+            self._emit(self._loads[size], self._register(reg, size), self._regs[var])
+        else :
+          self._emit(self._stores[size], self._register(reg, size), "%d(%%rbp)" %(var.offset))
 
-      # Prologue
-      print("\tpushq %rbp")
-      print("\tmovq %rsp, %rbp")
+      # emit code
+      self._gen_stmt(obj.body)
+      assert(self._depth == 0 and self._pushes == 0)
+
+      body, self._out = self._out, out
+      self._emit_function(obj.name, body, obj.stack_size)
+
+  def _emit_function(self, name : str, body : list, locals_size : int) -> None:
+    # wraps the body of a function with its prologue and epilogue, and writes it out
+    # locals_size is the number of bytes of the frame used by the body
+    out, self._out = self._out, _Lines()
+
+    # the callee-saved registers are kept right below the local variables
+    locals_size = align_to(locals_size, 8)
+    saved = [reg for reg in self._callee_saved if reg in self._saved]
+    slots = [-(locals_size + 8 * (i + 1)) for i in range(len(saved))]
+    frame_size = align_to(locals_size + 8 * len(saved), 16)
     
-      if obj.stack_size != 0:
-        obj.stack_size = cls._align_to(obj.stack_size, 16)
-        print("\tsubq $%d, %%rsp" %(obj.stack_size))
+    # a function that never moves %rsp keeps its frame in the red zone, addressed
+    # from %rsp, which stays where the frame pointer would be
+    frameless = self._leaf and locals_size + 8 * len(saved) <= self._red_zone \
+                           and self._is_leaf(body)
+    base = "%rbp"
+
+    if frameless :
+      base = "%rsp"
+      body = [self._rebase(instr) for instr in body]
+    else :
+      # Prologue
+      self._emit("pushq", "%rbp")
+      self._emit("movq", "%rsp", "%rbp")
 
-      # save passed-by-register arguments to the stack
-      for reg, var in zip(cls._argreg, obj.params) :
-        print("\tmovq %s, %d(%%rbp)" %(reg, var.offset))
+      if frame_size != 0:
+        self._emit("subq", "$%d" %(frame_size), "%rsp")
 
-      # emit code
-      cls._gen_stmt(obj.body)
-      assert(cls._depth == 0)
+    for reg, offset in zip(saved, slots) :
+      self._emit("movq", reg, "%d(%s)" %(offset, base))
    
-      print(".L.return.%s:" %(obj.name))
-      # Epilogue
-      print("\tleave") # movq %rbp, %rsp; popq %rbp
-      print("\tret\n")
-
-  @classmethod
-  def _request_label(cls) -> int:
-    cls._label_count += 1
-    return cls._label_count
-
-  @classmethod
-  def _push(cls) -> None:
+    # Epilogue, also run by each tail call, that then jumps to its callee
+    epilogue = [Instr("movq", "%d(%s)" %(offset, base), reg) for reg, offset in zip(saved, slots)]
+    if not frameless :
+      epilogue.append(Instr("leave")) # movq %rbp, %rsp; popq %rbp
+
+    for instr in body :
+      if instr.op == "tailcall" :
+        self._out.extend(epilogue)
+        self._emit("jmp", instr.args[0])
+      else :
+        self._out.emit(instr)
+
+    self._label(".L.return.%s" %(name))
+    self._out.extend(epilogue)
+    self._emit("ret")
+
+    code, self._out = self._out, out
+
+    if self._peephole is not None :
+      code = self._peephole.optimize(code)
+
+    self._out.emit("\t.globl %s" %(name))
+    self._out.emit("%s:" %(name))
+    self._out.extend(code)
+    self._out.emit("")
+
+  @staticmethod
+  def _is_leaf(body : list) -> bool:
+    # if body makes no calls and leaves %rsp alone, tail calls leave the frame first
+    return not any(not instr.is_label and (instr.op in ("call", "pushq", "popq")
+                                           or any("%rsp" in arg for arg in instr.args))
+                   for instr in body)
+
+  @staticmethod
+  def _rebase(instr : Instr) -> Instr:
+    # instr addressing the frame from %rsp instead of %rbp
+    if instr.is_label or not any("(%rbp)" in arg for arg in instr.args) :
+      return instr
+    return Instr(instr.op, *[arg.replace("(%rbp)", "(%rsp)") for arg in instr.args])
+
+  @staticmethod
+  def _register(reg : str, size : int) -> str:
+    # the name of the low size bytes of the 64-bit register reg
+    if size == 8 : return reg
+
+    name = reg[2:]
+    if name[0].isdigit() : # %r8 to %r15
+      return reg + {1 : "b", 2 : "w", 4 : "d"}[size]
+    elif size == 1 :
+      return "%" + (name[0] if name.endswith("x") else name) + "l" # %al, %sil
+    return "%" + ("e" if size == 4 else "") + name                 # %eax, %ax
+
+  def _extend(self, size : int, reg : str = "%rax") -> None:
+    # converts reg to a signed integer of size bytes, in place
+    if size < 8 :
+      self._emit(self._loads[size], self._register(reg, size), reg)
+
+  def _emit(self, op : str, *args : str) -> None:
+    self._out.emit(Instr(op, *args))
+
+  def _label(self, name : str) -> None:
+    self._out.emit(Label(name))
+
+  def _allocate_registers(self, fn : Object) -> None:
+    # local variables in callee-saved registers, and temporaries in the remaining ones
+    self._saved = set()
+
+    if not self._regalloc :
+      self._regs = dict()
+      self._temps = []
+      return
+
+    allocator = RegisterAllocator(self._callee_saved)
+    self._regs = allocator.allocate(fn)
+
+    if self._leaf and not allocator.has_calls and not allocator.address_taken :
+      # the parameters stay in the argument registers that nothing else writes to,
+      # and the other variables are allocated again without them
+      kept = {var : reg for reg, var in zip(self._argreg, fn.params) if reg in self._kept_argreg}
+      self._regs = allocator.allocate(fn, exclude = kept)
+      self._regs.update(kept)
+
+    self._saved.update(reg for reg in self._regs.values() if reg in self._callee_saved)
+
+    free = [reg for reg in self._callee_saved if reg not in self._saved]
+
+    if allocator.has_calls :
+      # temporaries in caller-saved registers must be saved around each call
+      self._temps = free + self._caller_saved
+    else :
+      # they are free to use in a leaf function
+      self._temps = self._caller_saved + free
+
+  def _request_label(self) -> int:
+    self._label_count += 1
+    return self._label_count
+
+  def _push(self) -> None:
+    # the temporaries form a stack, the first ones are kept in registers
+    # and the others overflow to the machine stack
+    if self._depth < len(self._temps) :
+      reg = self._temps[self._depth]
+      if reg in self._callee_saved : self._saved.add(reg)
+      self._emit("movq", "%rax", reg)
+    else :
+      self._emit("pushq", "%rax")
+      self._pushes += 1
     
-    print("\tpushq %rax")
-    cls._depth += 1
+    self._depth += 1
 
-  @classmethod
-  def _pop(cls, dest_reg : str) -> None:
+  def _pop(self, dest_reg : str) -> None:
     
-    print("\tpopq %s" %(dest_reg))
-    cls._depth -= 1
+    self._depth -= 1
+
+    if self._depth < len(self._temps) :
+      self._emit("movq", self._temps[self._depth], dest_reg)
+    else :
+      self._emit("popq", dest_reg)
+      self._pushes -= 1
+
+  def _pop_operand(self) -> str:
+    # the last temporary, used in place if it is in a register, or popped into %rdi
 
-  @classmethod
-  def _load(cls, data_type : DataType) -> None:
+    if self._depth - 1 < len(self._temps) :
+      self._depth -= 1
+      return self._temps[self._depth]
+
+    self._pop("%rdi")
+    return "%rdi"
+
+  def _operand(self, node : Expr) -> str:
+    # literals and scalar variables can be used directly by an instruction,
+    # without evaluating them into a temporary first
+    if not self._regalloc : return None
+
+    if node.is_literal and -(1 << 31) <= node.value < (1 << 31) :
+      return "$%d" %(node.value)
+
+    elif node.is_variable and not node.var_desc.data_type.is_array :
+      var = node.var_desc
+
+      if var in self._regs :
+        return self._regs[var] # kept sign-extended
+      elif var.data_type.size != 8 :
+        return None # loaded by _load, that sign-extends it
+      return self._var_address(var)
+
+    return None
+
+  def _load(self, data_type : DataType) -> None:
   
     if data_type.is_array:
       # cannot load an entire array into a register
@@ -91,191 +335,297 @@ class Asm_Generator :
       # this reference is already in the register, so it returns
       return
     else:
-      print("\tmovq (%rax), %rax")
+      self._emit(self._loads[data_type.size], "(%rax)", "%rax")
 
-  @classmethod
-  def _store(cls) -> None:
-    # store %rax into the address pointed by %rdi 
-    cls._pop("%rdi")
-    print("\tmovq %rax, (%rdi)")
-
-  @staticmethod
-  def _align_to(n : int, align : int) -> int: 
-    # round up n to the nearest multiple of align
-    # if n = 11 and align = 8, then it rounds to 16
-    # if n = 32 and align = 16, then n is aligned and it rounds to n
-    return int((n + align - 1) / align) * align
+  def _store(self, data_type : DataType) -> None:
+    # store %rax into the address held by the last temporary
+    size = data_type.size
+    self._emit(self._stores[size], self._register("%rax", size), "(%s)" %(self._pop_operand()))
 
-  @classmethod
-  def _gen_stmt(cls, stmt : Stmt) -> None:
+  def _gen_stmt(self, stmt : Stmt) -> None:
 
     if stmt.is_if_stmt:
-      lc = cls._request_label()
+      lc = self._request_label()
       
-      cls._gen_expr(stmt.condition)
-      print("\tcmpq $0, %rax")
-      print("\tje .L.else.%d" %(lc))
+      if self._branch :
+        self._gen_branch(stmt.condition, ".L.else.%d" %(lc), False)
+      else :
+        self._gen_expr(stmt.condition)
+        self._emit("cmpq", "$0", "%rax")
+        self._emit("je", ".L.else.%d" %(lc))
       
-      cls._gen_stmt(stmt.then_branch)
-      print("\tjmp .L.end.%d" %(lc))
+      self._gen_stmt(stmt.then_branch)
+      self._emit("jmp", ".L.end.%d" %(lc))
       
-      print(".L.else.%d:" %(lc))
+      self._label(".L.else.%d" %(lc))
       if stmt.else_branch is not None:
-        cls._gen_stmt(stmt.else_branch)
+        self._gen_stmt(stmt.else_branch)
       
-      print(".L.end.%d:" %(lc))
+      self._label(".L.end.%d" %(lc))
 
     elif stmt.is_for_stmt:
-      lc = cls._request_label()
+      lc = self._request_label()
 
       if stmt.init is not None: 
-        cls._gen_stmt(stmt.init)
+        self._gen_stmt(stmt.init)
       
-      print(".L.begin.%d:" %(lc))
-      if stmt.condition is not None:
-        cls._gen_expr(stmt.condition)
-        print("\tcmpq $0, %rax")
-        print("\tje .L.end.%d" %(lc))
+      # a rotated loop enters at the test of the condition, placed at the bottom,
+      # so each iteration takes a single branch
+      rotate = self._branch and stmt.condition is not None
 
-      cls._gen_stmt(stmt.body)
+      if rotate :
+        self._emit("jmp", ".L.cond.%d" %(lc))
+
+      self._label(".L.begin.%d" %(lc))
+      if stmt.condition is not None and not rotate:
+        self._gen_expr(stmt.condition)
+        self._emit("cmpq", "$0", "%rax")
+        self._emit("je", ".L.end.%d" %(lc))
+
+      self._gen_stmt(stmt.body)
       
       if stmt.inc is not None:
-        cls._gen_expr(stmt.inc)
+        self._gen_expr(stmt.inc)
 
-      print("\tjmp .L.begin.%d" %(lc))
-      print(".L.end.%d:" %(lc))
+      if rotate :
+        self._label(".L.cond.%d" %(lc))
+        self._gen_branch(stmt.condition, ".L.begin.%d" %(lc), True)
+      else :
+        self._emit("jmp", ".L.begin.%d" %(lc))
+      self._label(".L.end.%d" %(lc))
 
     elif stmt.is_compound_stmt:
       for statement in stmt.body:
-        cls._gen_stmt(statement)
+        self._gen_stmt(statement)
 
     elif stmt.is_expression_stmt:
       if stmt.expression is not None:
-        cls._gen_expr(stmt.expression)
+        self._gen_expr(stmt.expression)
     
     elif stmt.is_return_stmt:
       if stmt.ret_value is not None:
-        cls._gen_expr(stmt.ret_value)
-      print("\tjmp .L.return.%s" %(cls._current_fn.name))
+        self._gen_expr(stmt.ret_value)
+      self._emit("jmp", ".L.return.%s" %(self._current_fn.name))
+
+  def _var_address(self, var : Var) -> str:
+    if var.is_local :
+      return "%d(%%rbp)" %(var.offset)
+    return "%s(%%rip)" %(var.name)
 
-  @classmethod
-  def _gen_addr(cls, node : Expr) -> None:
+  def _gen_addr(self, node : Expr) -> None:
     
     if node.is_variable:
-      if node.var_desc.is_local :
-        print("\tleaq %d(%%rbp), %%rax" %(node.var_desc.offset))
-      else:
-        print("\tleaq %s(%%rip), %%rax" %(node.var_desc.name))
-        #print("\tmovq $%s, %%rax" %(node.var_desc.name))
+      self._emit("leaq", self._var_address(node.var_desc), "%rax")
       return
     
     elif node.is_unary and node.is_deref:
       # dereference expression
-      cls._gen_expr(node.lhs)
+      self._gen_expr(node.lhs)
       return
 
-  @classmethod
-  def _gen_expr_unary(cls, node : Expr) -> None:  
+  def _gen_expr_unary(self, node : Expr) -> None:  
 
     assert(node.is_unary)  
 
     if node.is_addressing :
       # address_of expression 
-      cls._gen_addr(node.lhs)
+      self._gen_addr(node.lhs)
       return
     else:
-      cls._gen_expr(node.lhs)
+      self._gen_expr(node.lhs)
 
       if node.is_neg:
         # negate expression
-        print("\tnegq %rax") 
+        self._emit("negq", "%rax") 
         return
 
       elif node.is_deref:
         # dereference expression
-        cls._load(node.operand_type)
+        self._load(node.operand_type)
         return    
 
-  @classmethod
-  def _gen_expr_binary(cls, node : Expr) -> None:
+  def _gen_expr_binary(self, node : Expr) -> None:
 
     assert(node.is_binary)
 
-    cls._gen_expr(node.rhs)
-    cls._push()      # pushq %rax
-    cls._gen_expr(node.lhs)
-    cls._pop("%rdi") # popq %rdi
+    reduced = self._reduction(node)
+
+    if reduced is not None :
+      self._gen_expr(node.lhs)
+      self._out.extend(reduced)
+      return
+
+    rhs = self._gen_operands(node)
 
     if node.is_add:
-      print("\taddq %rdi, %rax")
+      self._emit("addq", rhs, "%rax")
     
     elif node.is_sub:
-      print("\tsubq %rdi, %rax")
+      self._emit("subq", rhs, "%rax")
     
     elif node.is_mul:
-      print("\timulq %rdi, %rax")
+      self._emit("imulq", rhs, "%rax")
     
     elif node.is_div:
-      print("\tcqto") # extends signal %rax -> %rdx     
-      print("\tidivq %rdi")
+      if rhs.startswith('$') : # idivq doesn't take an immediate
+        self._emit("movq", rhs, "%rdi")
+        rhs = "%rdi"
+      self._emit("cqto") # extends signal %rax -> %rdx     
+      self._emit("idivq", rhs)
     
     else: # relational expression
-      print("\tcmpq %rdi, %rax")
+      self._emit("cmpq", rhs, "%rax")
 
       if node.is_cmp_eq:
-        print("\tsete %al")
+        self._emit("sete", "%al")
       
       elif node.is_cmp_ne:
-        print("\tsetne %al")
+        self._emit("setne", "%al")
       
       elif node.is_cmp_less:
-        print("\tsetl %al")
+        self._emit("setl", "%al")
       
       elif node.is_cmp_leq:
-        print("\tsetle %al")
+        self._emit("setle", "%al")
+
+      self._emit("movzbq", "%al", "%rax")
+
+  def _gen_operands(self, node : Expr) -> str:
+    # evaluates lhs of a binary node to %rax, and gives the operand holding rhs
+    rhs = self._operand(node.rhs)
+
+    if rhs is None :
+      self._gen_expr(node.rhs)
+      self._push()      # saves %rax in a temporary
+      self._gen_expr(node.lhs)
+      rhs = self._pop_operand()
+    else :
+      self._gen_expr(node.lhs)
+
+    return rhs
+
+  def _gen_branch(self, node : Expr, label : str, when : bool) -> None:
+    # jumps to label if the value of node is true (or false, if not when),
+    # without materializing it in %rax
+
+    if node.is_literal :
+      if (node.value != 0) == when :
+        self._emit("jmp", label)
+      return
+
+    if node.is_binary and node.is_relational :
+      rhs = self._gen_operands(node)
+      self._emit("cmpq", rhs, "%rax")
+      cc = self._cc[node.op]
+    else :
+      self._gen_expr(node)
+      self._emit("testq", "%rax", "%rax")
+      cc = "ne"
+
+    self._emit("j" + (cc if when else self._negated[cc]), label)
+
+  def _reduction(self, node : Expr) -> list:
+    # a cheaper sequence for the multiplication or division of %rax by the literal
+    # rhs of node, or None
+    if self._strength is None or not node.rhs.is_literal :
+      return None
+
+    if node.is_mul :
+      return self._strength.multiply("%rax", node.rhs.value)
+    elif node.is_div :
+      return self._strength.divide(node.rhs.value, "%rdi")
+    return None
+
+  def _gen_funcall(self, node : Expr) -> None:
 
-      print("\tmovzbq %al, %rax")
+    nargs = len(node.args)
 
-  @classmethod
-  def _gen_expr(cls, node : Expr) -> None:
+    # literals and variables are moved straight to their argument registers
+    operands = [self._operand(arg) for arg in node.args]
+
+    for arg, operand in zip(node.args, operands) :
+      if operand is None :
+        self._gen_expr(arg) # gen expression to %rax
+        self._push()        # saves %rax in a temporary
+
+    if nargs != 0 :
+      # iterate over the arg_reg list backwards
+      for reg, operand in reversed(list(zip(self._argreg, operands))) :
+        if operand is None :
+          self._pop(reg) # to arg register
+        else :
+          self._emit("movq", operand, reg)
+
+    # the temporaries still live in caller-saved registers would be clobbered by the call
+    live = [reg for reg in self._temps[:self._depth] if reg in self._caller_saved]
+
+    for reg in live :
+      self._emit("pushq", reg)
+    self._pushes += len(live)
+
+    # the stack must be 16 bytes aligned at the call
+    misaligned = self._pushes % 2 == 1
+
+    if misaligned :
+      self._emit("subq", "$8", "%rsp")
+
+    self._emit("movq", "$0", "%rax")
+    self._emit("call", node.callee)
+    self._extend(node.operand_type.size) # the callee only sets the bytes of its type
+
+    if misaligned :
+      self._emit("addq", "$8", "%rsp")
+
+    for reg in reversed(live) :
+      self._emit("popq", reg)
+    self._pushes -= len(live)
+
+  def _gen_expr(self, node : Expr) -> None:
 
     if node.is_literal:
-      print("\tmovq $%d, %%rax" %(node.value))
+      if -(1 << 31) <= node.value < (1 << 31) :
+        self._emit("movq", "$%d" %(node.value), "%rax")
+      else: # doesn't fit in a sign-extended 32 bits immediate
+        self._emit("movabsq", "$%d" %(node.value), "%rax")
       return
 
     elif node.is_variable:
-      cls._gen_addr(node)
-      cls._load(node.operand_type)
+      operand = self._operand(node)
+
+      if operand is not None :
+        self._emit("movq", operand, "%rax")
+      elif self._regalloc and not node.operand_type.is_array :
+        self._emit(self._loads[node.operand_type.size], self._var_address(node.var_desc), "%rax")
+      else :
+        self._gen_addr(node)
+        self._load(node.operand_type)
       return
 
     elif node.is_funcall:
-      
-      nargs = len(node.args)
-
-      for arg in node.args :
-        cls._gen_expr(arg) # gen expression to %rax
-        cls._push()        # pushq %rax
-
-      if nargs != 0 :
-        # iterate over the arg_reg list backwards
-        for reg in cls._argreg[nargs-1::-1] :
-          cls._pop(reg) # popq to arg register     
-
-      print("\tmovq $0, %rax")
-      print("\tcall %s" %(node.callee))
+      self._gen_funcall(node)
       return
 
     elif node.is_assignment:
-      cls._gen_addr(node.lhs)
-      cls._push()      # pushq %rax
-      cls._gen_expr(node.value)
-      cls._store()
+      # the value is converted to the type of lhs, which is also the value of the assignment
+      data_type = node.lhs.operand_type
+      target = self._operand(node.lhs) if node.lhs.is_variable else None
+
+      if target is not None :
+        # a scalar variable, stored without computing its address
+        self._gen_expr(node.value)
+        self._extend(data_type.size)
+        self._emit("movq", "%rax", target)
+        return
+
+      self._gen_addr(node.lhs)
+      self._push()      # saves the address in a temporary
+      self._gen_expr(node.value)
+      self._extend(data_type.size)
+      self._store(data_type)
       return
 
     elif node.is_unary:
-      cls._gen_expr_unary(node)
+      self._gen_expr_unary(node)
       
     elif node.is_binary:
-      cls._gen_expr_binary(node)
-
-
+      self._gen_expr_binary(node)
@@ -0,0 +1,168 @@
+
+import os
+import json
+import fcntl
+import hashlib
+import tempfile
+from functools import lru_cache
+
+__all__ = ["CompileCache", "compiler_version"]
+
+@lru_cache(maxsize = None)
+def compiler_version() -> str:
+  # a digest of the sources of the compiler, any change to them is a new version
+  digest = hashlib.sha256()
+  directory = os.path.dirname(os.path.abspath(__file__))
+
+  for name in sorted(os.listdir(directory)) :
+    if not name.endswith(".py") : continue
+    with open(os.path.join(directory, name), "rb") as source_file :
+      digest.update(name.encode() + b"\0" + source_file.read())
+
+  return digest.hexdigest()
+
+class CompileCache :
+  # the results of compilations, stored on disk like ccache does, the processes
+  # that compile with the same directory share them
+  #
+  # an entry is named by the sha256 of the compiler version, the settings of the
+  # compilation and the source, so a change to any of them misses, and holds the
+  # result as JSON in <directory>/<first 2 hex digits>/<the others>
+  # every entry is written to a temporary file first, that is renamed over it,
+  # so a concurrent reader finds either no entry or a whole one
+  # once the entries take more than max_bytes, the least recently used ones
+  # (by mtime, that each hit updates) are removed
+  # the sizes of the entries are added up in <directory>/size as they are written,
+  # so the entries are only scanned when that total goes over max_bytes
+
+  default_size = 64 << 20
+
+  def __init__(self, directory : str, max_bytes : int = default_size) :
+    self.directory = directory
+    self.max_bytes = max_bytes
+
+  def key(self, source : str, settings : str) -> str:
+    digest = hashlib.sha256()
+    for part in (compiler_version(), settings, source) :
+      digest.update(part.encode() + b"\0")
+    return digest.hexdigest()
+
+  def _path(self, key : str) -> str:
+    return os.path.join(self.directory, key[:2], key[2:])
+
+  def get(self, key : str) -> dict:
+    # the entry stored under key, None on a miss
+    path = self._path(key)
+
+    try :
+      with open(path, "r") as entry_file :
+        entry = json.load(entry_file)
+      os.utime(path) # the most recently used now
+    except (OSError, ValueError) : # missing, evicted meanwhile or unreadable
+      return None
+
+    return entry
+
+  def put(self, key : str, entry : dict) -> None:
+    # the compilation goes on without the cache if it can't be written
+    path = self._path(key)
+
+    try :
+      os.makedirs(os.path.dirname(path), exist_ok = True)
+      fd, temp_path = tempfile.mkstemp(dir = os.path.dirname(path), prefix = ".tmp")
+    except OSError :
+      return
+
+    try :
+      with os.fdopen(fd, "w") as temp_file :
+        json.dump(entry, temp_file)
+
+      size = os.stat(temp_path).st_size
+      replaced = os.stat(path).st_size if os.path.exists(path) else 0
+      os.replace(temp_path, path)
+    except OSError :
+      if os.path.exists(temp_path) : os.unlink(temp_path)
+      return
+
+    try :
+      self._update_size(size - replaced)
+    except OSError :
+      pass
+
+  def entries(self) -> list:
+    # (mtime, size, path) of every entry, the files being written are left out
+    entries = []
+
+    try :
+      subdirs = [subdir.path for subdir in os.scandir(self.directory) if subdir.is_dir()]
+    except OSError :
+      return entries
+
+    for subdir in subdirs :
+      try :
+        files = list(os.scandir(subdir))
+      except OSError : # removed meanwhile
+        continue
+
+      for entry in files :
+        if entry.name.startswith(".tmp") : continue
+        try :
+          info = entry.stat()
+        except OSError :
+          continue
+        entries.append((info.st_mtime, info.st_size, entry.path))
+
+    return entries
+
+  def evict(self) -> int:
+    # removes the least recently used entries until the rest fit in max_bytes,
+    # returns how many were removed
+    try :
+      return self._update_size(None)
+    except OSError : # no cache yet
+      return 0
+
+  def _update_size(self, delta : int) -> int:
+    # adds delta to the total size of the entries, locked against the other
+    # processes while it is updated, the entries are scanned for it (and evicted)
+    # if it goes over max_bytes, if it is unknown or damaged, or if delta is None
+    # returns how many entries were removed
+    with open(os.path.join(self.directory, "size"), "a+") as size_file :
+      fcntl.flock(size_file, fcntl.LOCK_EX)
+      size_file.seek(0)
+      text = size_file.read().strip()
+
+      removed = 0
+      total = int(text) + delta if text.isdigit() and delta is not None else None
+      if total is None or total > self.max_bytes :
+        removed, total = self._trim()
+
+      size_file.seek(0)
+      size_file.truncate()
+      size_file.write("%d\n" %(total))
+
+    return removed
+
+  def _trim(self) -> tuple:
+    # the scan of evict, returns how many entries it removed and the size of the rest
+    # once over max_bytes, the cache is trimmed to 90% of it, so the writes that
+    # follow don't have to scan it again right away
+    entries = self.entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+
+    if total <= self.max_bytes : return removed, total
+    target = self.max_bytes * 9 // 10
+
+    for _, size, path in sorted(entries) :
+      if total <= target : break
+
+      try :
+        os.unlink(path)
+      except FileNotFoundError : # another process removed it first
+        pass
+
+      total -= size
+      removed += 1
+
+    return removed, total
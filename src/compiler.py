@@ -0,0 +1,270 @@
+import sys
+from copy import copy
+
+from .scanner import Scanner
+from .regex_scanner import RegexScanner
+from .parser import Parser
+from .fold import ConstantFolder
+from .asm_gen import Asm_Generator
+from .peephole import PeepholeOptimizer
+from .strength import StrengthReducer
+from .ir import dump
+from .ir_builder import IRBuilder
+from .ir_opt import IROptimizer
+from .inliner import Inliner
+from .tailcall import TailCallOptimizer
+from .stack_layout import StackLayout
+from .ir_asm_gen import IR_Asm_Generator
+from .cache import CompileCache
+from .expr import Position
+from .errors import ErrorCollector, LexErr, SyntaxErr
+
+__all__ = ["Options", "Result", "compile", "compile_file", "read_source"]
+
+class Options :
+  # settings of one compilation
+
+  scanners = {
+    "regex"   : RegexScanner,
+    "classic" : Scanner,
+  }
+
+  # optimization passes enabled at each level (-O)
+  levels = {
+    0 : (),
+    1 : ("fold", "slots", "regalloc", "strength", "branch", "leaf", "peephole"),
+    2 : ("fold", "slots", "ir", "tailcall", "inline", "ssa", "licm", "strength", "branch", "leaf",
+         "peephole"),
+  }
+
+  # ir compiles through the three-address IR and its backend, instead of
+  # generating code straight from the AST, tailcall, inline, ssa and licm
+  # (along with ssa) work over that IR
+  passes = ("fold", "slots", "regalloc", "strength", "branch", "leaf", "peephole",
+            "ir", "tailcall", "inline", "ssa", "licm")
+
+  def __init__(self, filename : str = None, scanner : str = "regex", stream_tokens : bool = True,
+                     opt_level : int = 1, flags : dict = None, emit_ir : bool = False,
+                     inline_threshold : int = 16, cache_dir : str = None,
+                     cache_size : int = CompileCache.default_size) :
+    self.filename = filename           # used to prefix the diagnostics
+    self.scanner = scanner             # one of the scanners above
+    self.stream_tokens = stream_tokens # scan the tokens on demand, while parsing
+    self.opt_level = opt_level         # one of the levels above
+    self.flags = dict(flags or {})     # pass name -> enabled, overrides the level (-f/-fno-)
+    self.emit_ir = emit_ir             # stop at the IR, and give its textual form
+    self.inline_threshold = inline_threshold # size of the largest function inlined, in IR instructions
+    self.cache_dir = cache_dir         # directory of the compile cache, None to always compile
+    self.cache_size = cache_size       # bytes the cache may take, before evicting entries
+
+  def enabled(self, name : str) -> bool:
+    # if the optimization pass name runs in this compilation
+    return self.flags.get(name, name in Options.levels[self.opt_level])
+
+  def signature(self) -> str:
+    # the settings that change the result, part of the key of the cached results
+    # the filename only prefixes the diagnostics, and both scanners give the same tokens
+    passes = ",".join(name for name in Options.passes if self.enabled(name))
+    return "passes=%s emit_ir=%d inline_threshold=%d" %(passes, self.emit_ir, self.inline_threshold)
+
+class Result :
+  # outcome of compiling one translation unit
+
+  def __init__(self, asm : str, diagnostics : list, messages : str,
+                                          lines : int = 0, bytes : int = 0,
+                     peephole : dict = None, eliminated : int = 0, ir : str = None,
+                     ssa : dict = None, inlined : int = 0, tailcalls : dict = None,
+                     frames : dict = None, cached : bool = None) :
+    self.asm = asm                 # generated assembly, None on failure (or with emit_ir)
+    self.ir = ir                   # textual IR, only with emit_ir
+    self.diagnostics = diagnostics # list of CompileError (errors and warnings)
+    self.messages = messages       # diagnostics formatted as shown in stderr
+    self.lines = lines
+    self.bytes = bytes
+    self.peephole = peephole       # peephole rule name -> hits, None if the pass didn't run
+    self.eliminated = eliminated   # number of instructions removed by the peephole rules
+    self.ssa = ssa                 # "promoted" variables and the instructions removed by
+                                   # each IR pass, None if the passes didn't run
+    self.inlined = inlined         # number of calls replaced by the body of the callee
+    self.tailcalls = tailcalls     # self-recursive calls turned into "loops", and other tail
+                                   # calls into "jumps", None if the pass didn't run
+    self.frames = frames           # function name -> bytes of its local variables before and
+                                   # after sharing their stack slots, None if the pass didn't run
+    self.cached = cached           # if it was found in the compile cache, None without a cache
+
+  @property
+  def ok(self) -> bool:
+    return self.asm is not None or self.ir is not None
+
+  def to_dict(self) -> dict:
+    return {
+      "ok" : self.ok,
+      "asm" : self.asm,
+      "ir" : self.ir,
+      "diagnostics" : [
+        {
+          "row" : issue.row,
+          "col" : issue.col,
+          "severity" : "warning" if issue.warning else "error",
+          "message" : issue.message,
+        } for issue in self.diagnostics
+      ],
+      "messages" : self.messages,
+      "lines" : self.lines,
+      "bytes" : self.bytes,
+      "peephole" : self.peephole,
+      "eliminated" : self.eliminated,
+      "ssa" : self.ssa,
+      "inlined" : self.inlined,
+      "tailcalls" : self.tailcalls,
+      "frames" : self.frames,
+      "cached" : self.cached,
+    }
+
+  @staticmethod
+  def from_dict(data : dict, source : str, filename : str = None) -> "Result":
+    # the inverse of to_dict, for the results stored in the compile cache
+    # they compiled, so their diagnostics are warnings of the parser, rendered
+    # again for filename
+    errors = ErrorCollector()
+    errors.set_source(source, filename)
+
+    for issue in data["diagnostics"] :
+      errors.add(SyntaxErr(Position(issue["row"], issue["col"]), issue["message"],
+                           issue["severity"] == "warning"))
+
+    return Result(data["asm"], errors.issues, errors.render(), data["lines"], data["bytes"],
+                  peephole = data["peephole"], eliminated = data["eliminated"], ir = data["ir"],
+                  ssa = data["ssa"], inlined = data["inlined"], tailcalls = data["tailcalls"],
+                  frames = data["frames"], cached = data["cached"])
+
+def compile(source : str, options : Options = None) -> Result:
+  # runs all the stages over source, every call owns its own scanner, parser,
+  # code generator and diagnostics, so it is safe to compile concurrently
+  # with a cache, a result stored by an earlier compilation is given instead
+  if options is None :
+    options = Options()
+
+  if options.cache_dir is None :
+    return _compile(source, options)
+
+  cache = CompileCache(options.cache_dir, options.cache_size)
+  key = cache.key(source, options.signature())
+
+  entry = cache.get(key)
+  if entry is not None :
+    entry["cached"] = True
+    return Result.from_dict(entry, source, options.filename)
+
+  result = _compile(source, options)
+  result.cached = False
+
+  # the ones that failed are compiled again, to report their errors
+  if result.ok : cache.put(key, result.to_dict())
+
+  return result
+
+def _compile(source : str, options : Options) -> Result:
+
+  errors = ErrorCollector()
+  errors.set_source(source, options.filename)
+
+  scanner = Options.scanners[options.scanner](errors)
+
+  if options.stream_tokens :
+    prog = Parser(errors).parse(scanner.scan(source))
+
+    if any(isinstance(issue, LexErr) for issue in errors.issues) :
+      # the parser has seen the source without the unexpected characters,
+      # only report the lexical errors, as if scanning had stopped the compilation
+      errors.issues = [issue for issue in errors.issues if isinstance(issue, LexErr)]
+  else :
+    tk_list = scanner.tokenize(source)
+
+    if errors.ok() :
+      prog = Parser(errors).parse(tk_list)
+
+  if not errors.ok() :
+    return Result(None, errors.issues, errors.render())
+
+  if options.enabled("fold") :
+    ConstantFolder().fold(prog)
+
+  functions, ssa, inlined, tailcall_stats = None, None, 0, None
+  if options.enabled("ir") or options.emit_ir :
+    functions = IRBuilder(rotate = options.enabled("branch")).build(prog)
+
+    tailcalls = TailCallOptimizer(functions) if options.enabled("tailcall") else None
+    if tailcalls is not None :
+      for fn in functions :
+        tailcalls.to_loops(fn)
+
+    if options.enabled("inline") :
+      inliner = Inliner(options.inline_threshold)
+      inliner.inline(functions)
+      inlined = inliner.inlined
+
+    if options.enabled("ssa") :
+      passes = dict(IROptimizer.passes)
+      if not options.enabled("licm") :
+        del passes["licm"]
+
+      optimizer = IROptimizer(passes)
+      for fn in functions :
+        optimizer.optimize(fn)
+      ssa = dict(optimizer.removed, promoted = optimizer.promoted)
+
+    if tailcalls is not None :
+      for fn in functions :
+        tailcalls.to_jumps(fn)
+      tailcall_stats = {"loops" : tailcalls.loops, "jumps" : tailcalls.jumps}
+
+  frames = None
+  if options.enabled("slots") :
+    # over the IR, once its passes no longer need the variables in distinct slots
+    layout = StackLayout()
+    for fn in functions if functions is not None else [obj for obj in prog if obj.is_function] :
+      layout.layout(fn)
+    frames = layout.frames
+
+  if options.emit_ir :
+    return Result(None, errors.issues, errors.render(), ir = dump(functions), ssa = ssa,
+                  inlined = inlined, tailcalls = tailcall_stats, frames = frames)
+
+  peephole = None
+  if options.enabled("peephole") :
+    peephole = PeepholeOptimizer(functions = {obj.name for obj in prog if obj.is_function})
+
+  strength = StrengthReducer() if options.enabled("strength") else None
+  branch = options.enabled("branch")
+  leaf = options.enabled("leaf")
+
+  if functions is not None :
+    out = IR_Asm_Generator(functions, peephole = peephole, strength = strength,
+                           branch = branch, leaf = leaf).gen(prog)
+  else :
+    out = Asm_Generator(regalloc = options.enabled("regalloc"), peephole = peephole,
+                        strength = strength, branch = branch, leaf = leaf).gen(prog)
+
+  result = Result(out.getvalue(), errors.issues, errors.render(), out.lines, out.bytes,
+                  ssa = ssa, inlined = inlined, tailcalls = tailcall_stats, frames = frames)
+
+  if peephole is not None :
+    result.peephole, result.eliminated = peephole.hits, peephole.eliminated
+
+  return result
+
+def read_source(path : str) -> str:
+  # reads the whole input at once, '-' is stdin
+  if path == '-' :
+    return sys.stdin.read()
+
+  with open(path, "r") as input_file :
+    return input_file.read()
+
+def compile_file(path : str, options : Options = None) -> Result:
+  # entry point for the worker processes, it raises OSError if path can't be read
+  options = copy(options) if options is not None else Options()
+  options.filename = path
+
+  return compile(read_source(path), options)
@@ -7,6 +7,11 @@ class DataType:
   @property
   def is_integer(self) :
     return isinstance(self, Int)
+
+  @property
+  def align(self) -> int:
+    # objects of the type start at a multiple of align
+    return self.size
   
   @property
   def is_pointer(self) :
@@ -20,11 +25,17 @@ class DataType:
     return type(self) is type(other)
 
 class Int (DataType):
-  def __init__(self) :
-    self.size = 8 # don't differentiate for now
+  # signed integer of size bytes, kept sign-extended to 64 bits in the registers
+  _names = {1 : "char", 2 : "short", 4 : "int", 8 : "long"}
+
+  def __init__(self, size : int = 4) :
+    self.size = size
+
+  def __eq__(self, other) :
+    return type(self) is type(other) and self.size == other.size
 
   def __str__(self) :
-    return "int"
+    return self._names[self.size]
 
 class Pointer_to (DataType):
   def __init__(self, base : DataType) :
@@ -45,9 +56,20 @@ class Array_of (Pointer_to) :
     self.length = size
     self.size = base.size * self.length
 
+  @property
+  def align(self) -> int:
+    return self.base.align
+
 class Function_type (DataType):
   def __init__(self, ret_type : DataType) :
     self.ret_type = ret_type
 
-ty_int = Int()
+ty_char = Int(1)
+ty_short = Int(2)
+ty_int = Int(4)
+ty_long = Int(8)
+
+def align_to(n : int, align : int) -> int:
+  # round up n to the nearest multiple of align
+  return (n + align - 1) // align * align
 
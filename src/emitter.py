@@ -0,0 +1,50 @@
+
+__all__ = ["Emitter"]
+
+class Emitter :
+  # collects the emitted assembly in memory, instead of printing each line,
+  # and writes it in bulk chunks to the sink (any object with a write method)
+  # if no sink is given, the whole text is kept and can be read with getvalue()
+  # lines can be strings or any object that formats itself as one (e.g. Instr)
+
+  def __init__(self, sink = None, chunk_lines : int = 1 << 14) :
+    self.sink = sink
+    self.chunk_lines = chunk_lines
+    self.lines = 0 # number of lines emitted
+    self.bytes = 0 # number of bytes emitted (utf-8 encoded)
+    self._buffer = []
+    self._chunks = [] # already joined chunks, when there's no sink
+
+  def emit(self, line : str) -> None:
+    self._buffer.append(line)
+
+    if len(self._buffer) >= self.chunk_lines :
+      self._flush_buffer()
+
+  def extend(self, lines) -> None:
+    for line in lines :
+      self.emit(line)
+
+  def flush(self) -> None:
+    self._flush_buffer()
+
+    if self.sink is not None and hasattr(self.sink, "flush") :
+      self.sink.flush()
+
+  def getvalue(self) -> str:
+    self._flush_buffer()
+    return "".join(self._chunks)
+
+  def _flush_buffer(self) -> None:
+
+    if not self._buffer : return
+
+    self.lines += len(self._buffer)
+    text = "\n".join(map(str, self._buffer)) + "\n"
+    self.bytes += len(text.encode())
+    self._buffer = []
+
+    if self.sink is None :
+      self._chunks.append(text)
+    else :
+      self.sink.write(text)
@@ -16,6 +16,16 @@ class CompileError(Exception) :
   
   def __str__(self) : pass
 
+  def __reduce__(self) :
+    # subclasses take different constructor arguments, so issues are
+    # pickled by their attributes (e.g. to be sent back from a worker process)
+    return (_rebuild_issue, (type(self), self.__dict__))
+
+def _rebuild_issue(issue_type : type, state : dict) -> CompileError:
+  issue = issue_type.__new__(issue_type)
+  issue.__dict__.update(state)
+  return issue
+
 class LexErr(CompileError) :
   def __init__(self, message : str, row : int, col : int) :	
     super().__init__(message, row, col)
@@ -28,6 +38,7 @@ class LexErr(CompileError) :
 
 class SyntaxErr(CompileError) :
   def __init__(self, tk_info : Token, message : str, warning : bool=False) :
+    # tk_info is anything with a row and a col, e.g. a Token or an AST Position
     super().__init__(message, tk_info.row, tk_info.col, warning)
 
   def __str__(self) -> str:
@@ -44,9 +55,11 @@ class ErrorCollector :
   def __init__(self) :
     self.issues = []
     self.source = []	
+    self.filename = None
 
-  def set_source(self, source : str) :
+  def set_source(self, source : str, filename : str = None) :
     self.source = source.split('\n')
+    self.filename = filename
 
   def add(self, issue : CompileError) :
     self.issues.append(issue)
@@ -55,20 +68,28 @@ class ErrorCollector :
     # if no error (warning=False) occurred
     return not any(not issue.warning for issue in self.issues) 
 	
-  def show(self) :
+  def render(self) -> str:
+    # formats all the issues as they are shown in stderr
+    err_out = []
 
     for issue in self.issues :
 
       issue_color = warning_color if issue.warning else error_color
       indicator = ' ' * (issue.col + 4) + bold_color + issue_color + '^' + reset_color
 
-      err_out = str(issue) + (' ' * 4) + self.source[issue.row - 1] + '\n' + indicator
+      issue_out = str(issue) + (' ' * 4) + self.source[issue.row - 1] + '\n' + indicator
+
+      if self.filename is not None :
+        issue_out = bold_color + self.filename + ':' + reset_color + issue_out
 
-      print(err_out, file=sys.stderr)
+      err_out.append(issue_out + '\n')
+
+    return "".join(err_out)
+
+  def show(self) :
+    sys.stderr.write(self.render())
 
   def clear(self) :
     self.issues = []
 
-error_collector = ErrorCollector()
-
 
@@ -1,10 +1,32 @@
+
 from .token import *
 from .token_type import *
 from .object_type import Var
 
+class Operator :
+  ADD, SUB, MUL, DIV, \
+  \
+  EQ, NE, LT, LE, \
+  \
+  NEG, ADDR, DEREF = range(11)
+
+class Position :
+  # where a node starts in the source, used by the diagnostics
+  __slots__ = ("row", "col")
+
+  def __init__(self, row : int, col : int) :
+    self.row = row
+    self.col = col
+
+  @staticmethod
+  def of(token : Token) -> "Position":
+    return Position(token.row, token.col)
+
 class Expr(object) :
-  
-  operand_type = None
+  __slots__ = ("operand_type",)
+
+  def __init__(self) :
+    self.operand_type = None
 
   @property
   def is_unary(self) -> bool:
@@ -31,90 +53,104 @@ class Expr(object) :
     return isinstance(self, FunCallExpr)
 
 class UnaryExpr (Expr) :
-  def __init__(self, lhs : Expr, operator : Token) :
+  __slots__ = ("lhs", "op", "pos")
+
+  def __init__(self, lhs : Expr, operator : int, pos : Position) :
+    super().__init__()
     self.op = operator
     self.lhs = lhs
+    self.pos = pos
 
   @property
   def is_neg(self) -> bool:
-    return self.op.kind == TokenType.MINUS
+    return self.op == Operator.NEG
 
   @property
-  def is_addressing(self) -> bool: 
-    return self.op.kind == TokenType.AMPERSAND
+  def is_addressing(self) -> bool:
+    return self.op == Operator.ADDR
 
   @property
   def is_deref(self) -> bool:
-    return self.op.kind == TokenType.STAR
-	
+    return self.op == Operator.DEREF
+
 class BinaryExpr (Expr) :
-  def __init__(self, lhs : Expr, operator : Token, rhs : Expr) :
+  __slots__ = ("lhs", "op", "rhs", "pos")
+
+  def __init__(self, lhs : Expr, operator : int, rhs : Expr, pos : Position) :
+    super().__init__()
     self.lhs = lhs
     self.op = operator
     self.rhs = rhs
+    self.pos = pos
 
   @property
-  def is_cmp_eq(self) -> bool: 
-    return self.op.kind == TokenType.EQUAL_EQUAL
+  def is_cmp_eq(self) -> bool:
+    return self.op == Operator.EQ
 
   @property
-  def is_cmp_ne(self) -> bool: 
-    return self.op.kind == TokenType.BANG_EQUAL
+  def is_cmp_ne(self) -> bool:
+    return self.op == Operator.NE
 
   @property
-  def is_cmp_less(self) -> bool: 
-    return self.op.kind == TokenType.LESS or \
-           self.op.kind == TokenType.GREATER
+  def is_cmp_less(self) -> bool:
+    return self.op == Operator.LT
 
   @property
   def is_cmp_leq(self) -> bool:
-    return self.op.kind == TokenType.LESS_EQUAL or \
-           self.op.kind == TokenType.GREATER_EQUAL
+    return self.op == Operator.LE
 
   @property
   def is_relational(self) -> bool:
-    return self.is_cmp_eq or self.is_cmp_ne or \
-           self.is_cmp_less or self.is_cmp_leq
+    return Operator.EQ <= self.op <= Operator.LE
 
   @property
-  def is_add(self) -> bool: 
-    return self.op.kind == TokenType.PLUS
+  def is_add(self) -> bool:
+    return self.op == Operator.ADD
 
   @property
-  def is_sub(self) -> bool: 
-    return self.op.kind == TokenType.MINUS
+  def is_sub(self) -> bool:
+    return self.op == Operator.SUB
 
   @property
-  def is_mul(self) -> bool: 
-    return self.op.kind == TokenType.STAR
+  def is_mul(self) -> bool:
+    return self.op == Operator.MUL
 
   @property
-  def is_div(self) -> bool: 
-    return self.op.kind == TokenType.SLASH
+  def is_div(self) -> bool:
+    return self.op == Operator.DIV
 
   @property
   def is_arithmetic(self) -> bool:
-    return self.is_add or self.is_sub or \
-           self.is_mul or self.is_div
+    return Operator.ADD <= self.op <= Operator.DIV
 
 
 class LiteralExpr (Expr) :
+  __slots__ = ("value",)
+
   def __init__(self, value : int) :
+    super().__init__()
     self.value = value
 
 class VariableExpr (Expr) :
+  __slots__ = ("var_desc",)
+
   def __init__(self, var_desc : Var) :
+    super().__init__()
     self.var_desc = var_desc
 
 class AssignExpr (Expr) :
-  def __init__(self, expr : Expr, equals : Token, value : Expr) :
+  __slots__ = ("lhs", "value", "pos")
+
+  def __init__(self, expr : Expr, value : Expr, pos : Position) :
+    super().__init__()
     self.lhs = expr
-    self.equals = equals
     self.value = value
+    self.pos = pos
 
 class FunCallExpr (Expr) :
+  __slots__ = ("callee", "args")
+
   def __init__(self, callee : str, args : list = []) :
+    super().__init__()
     self.callee = callee
     self.args = args
-
-
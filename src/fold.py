@@ -0,0 +1,121 @@
+
+from .expr import *
+from .stmt import *
+
+__all__ = ["ConstantFolder"]
+
+_INT_MIN = -(1 << 63)
+
+def _wrap(value : int) -> int:
+  # ints are 64 bits wide, the arithmetic wraps around like in the generated code
+  value &= (1 << 64) - 1
+  return value - (1 << 64) if value >= (1 << 63) else value
+
+def _div(a : int, b : int) -> int:
+  # C division truncates toward zero, python's // rounds toward -inf
+  # x/0 and INT_MIN/-1 trap in idivq, so they are left to happen at run time
+  if b == 0 or (a == _INT_MIN and b == -1) :
+    return None
+
+  quotient = abs(a) // abs(b)
+  return -quotient if (a < 0) != (b < 0) else quotient
+
+class ConstantFolder :
+  # collapses the operations over literals into a single literal, before the
+  # code generation, and drops the additions of 0 and multiplications by 1 that
+  # the pointer arithmetic produces
+
+  _binary = {
+    Operator.ADD : lambda a, b : _wrap(a + b),
+    Operator.SUB : lambda a, b : _wrap(a - b),
+    Operator.MUL : lambda a, b : _wrap(a * b),
+    Operator.DIV : _div,
+    Operator.EQ  : lambda a, b : int(a == b),
+    Operator.NE  : lambda a, b : int(a != b),
+    Operator.LT  : lambda a, b : int(a < b),
+    Operator.LE  : lambda a, b : int(a <= b),
+  }
+
+  def __init__(self) :
+    self.folded = 0 # number of nodes removed from the tree
+
+  def fold(self, prog : list) -> list:
+    # the functions are folded in place, prog is returned for convenience
+    for obj in prog :
+      if obj.is_function : self._fold_stmt(obj.body)
+
+    return prog
+
+  def evaluate(self, node : Expr) -> int:
+    # the value of node if it folds to a literal, else None
+    node = self._fold_expr(node)
+    return node.value if node.is_literal else None
+
+  def _fold_stmt(self, stmt : Stmt) -> None:
+
+    if stmt is None : return
+
+    if stmt.is_compound_stmt:
+      for s in stmt.body :
+        self._fold_stmt(s)
+
+    elif stmt.is_expression_stmt:
+      stmt.expression = self._fold_expr(stmt.expression)
+
+    elif stmt.is_return_stmt:
+      stmt.ret_value = self._fold_expr(stmt.ret_value)
+
+    elif stmt.is_if_stmt:
+      stmt.condition = self._fold_expr(stmt.condition)
+      self._fold_stmt(stmt.then_branch)
+      self._fold_stmt(stmt.else_branch)
+
+    elif stmt.is_for_stmt:
+      self._fold_stmt(stmt.init)
+      stmt.condition = self._fold_expr(stmt.condition)
+      stmt.inc = self._fold_expr(stmt.inc)
+      self._fold_stmt(stmt.body)
+
+  def _fold_expr(self, node : Expr) -> Expr:
+    # returns the folded node, that replaces node in its parent
+
+    if node is None : return None
+
+    if node.is_binary:
+      node.lhs = self._fold_expr(node.lhs)
+      node.rhs = self._fold_expr(node.rhs)
+
+      if node.lhs.is_literal and node.rhs.is_literal :
+        value = self._binary[node.op](node.lhs.value, node.rhs.value)
+        if value is not None :
+          return self._literal(node, value, 2)
+
+      elif node.rhs.is_literal and node.op != Operator.DIV :
+        # x + 0, x - 0 and x * 1, the type of the node is the one of x
+        if (node.rhs.value == 0 and node.op in (Operator.ADD, Operator.SUB)) or \
+           (node.rhs.value == 1 and node.op == Operator.MUL) :
+          self.folded += 2
+          return node.lhs
+
+    elif node.is_unary:
+      node.lhs = self._fold_expr(node.lhs)
+
+      if node.is_neg and node.lhs.is_literal :
+        return self._literal(node, _wrap(-node.lhs.value), 1)
+
+    elif node.is_assignment:
+      node.lhs = self._fold_expr(node.lhs)
+      node.value = self._fold_expr(node.value)
+
+    elif node.is_funcall:
+      node.args = [self._fold_expr(arg) for arg in node.args]
+
+    return node
+
+  def _literal(self, node : Expr, value : int, removed : int) -> Expr:
+
+    self.folded += removed
+
+    literal = LiteralExpr(value)
+    literal.operand_type = node.operand_type
+    return literal
@@ -0,0 +1,153 @@
+
+from .object_type import *
+from .data_type import align_to
+from .ir import *
+
+__all__ = ["Inliner"]
+
+class Inliner :
+  # replaces the calls to small functions of the translation unit by a copy of
+  # their body, over the IR before SSA, so the copy is optimized along with the caller
+  #
+  # the blocks of the copy take labels of the caller, its local variables get
+  # new slots in the frame of the caller, and each ret stores the value to a
+  # slot of its own, that the code after the call loads
+
+  def __init__(self, threshold : int = 16) :
+    self.threshold = threshold # the most IR instructions of a function to inline
+    self.inlined = 0           # call sites replaced
+
+  def inline(self, functions : list) -> None:
+
+    self._functions = {fn.name : fn for fn in functions}
+    self._calls = {fn.name : self._callees(fn) for fn in functions}
+
+    # the callees are done first, so their bodies are copied with their own
+    # calls already inlined
+    for fn in self._bottom_up(functions) :
+      self._inline_calls(fn)
+
+  def _callees(self, fn : IRFunction) -> set:
+    return {ins.args[0] for ins in fn.instructions()
+            if ins.op == "call" and ins.args[0] in self._functions}
+
+  def _bottom_up(self, functions : list) -> list:
+    # postorder of the call graph
+    order, visited = [], set()
+
+    for fn in functions :
+      if fn.name in visited : continue
+      visited.add(fn.name)
+      stack = [(fn.name, iter(sorted(self._calls[fn.name])))]
+
+      while stack :
+        name, callees = stack[-1]
+        for callee in callees :
+          if callee not in visited :
+            visited.add(callee)
+            stack.append((callee, iter(sorted(self._calls[callee]))))
+            break
+        else :
+          stack.pop()
+          order.append(self._functions[name])
+
+    return order
+
+  def _recursive(self, name : str) -> bool:
+    # if name can call itself, directly or through other functions
+    seen, work = set(), list(self._calls[name])
+
+    while work :
+      callee = work.pop()
+      if callee == name : return True
+      if callee in seen : continue
+      seen.add(callee)
+      work.extend(self._calls[callee])
+
+    return False
+
+  def _inlinable(self, callee : IRFunction, nargs : int) -> bool:
+
+    if len(callee.params) != nargs or self._recursive(callee.name) :
+      return False
+
+    size = 0
+    for ins in callee.instructions() :
+      if ins.op == "addr" and ins.args[0].exposes_frame :
+        # the caller would keep all its variables in memory
+        return False
+      size += 1
+
+    return size <= self.threshold
+
+  def _inline_calls(self, fn : IRFunction) -> None:
+
+    i = 0
+    while i < len(fn.blocks) :
+      block = fn.blocks[i]
+
+      for j, ins in enumerate(block.instrs) :
+        if ins.op != "call" or ins.args[0] not in self._functions : continue
+        callee = self._functions[ins.args[0]]
+        if callee is fn or not self._inlinable(callee, len(ins.args) - 1) : continue
+
+        self._inline_call(fn, block, j, callee)
+        self.inlined += 1
+        break
+
+      i += 1
+
+    # the blocks split around each call are joined back
+    fn.merge_blocks()
+    self._calls[fn.name] = self._callees(fn)
+
+  def _new_slot(self, fn : IRFunction, var : LVar, name : str) -> LVar:
+    # a slot for var in the frame of fn
+    fn.stack_size = align_to(fn.stack_size + var.data_type.size, var.data_type.align)
+    slot = LVar(var.data_type, -fn.stack_size, name)
+    fn.lvars.append(slot)
+    return slot
+
+  def _inline_call(self, fn : IRFunction, block : BasicBlock, index : int, callee : IRFunction) -> None:
+    # replaces the call at block.instrs[index] by a copy of callee, the
+    # instructions after it move to a new block, reached when the copy returns
+    call = block.instrs[index]
+    first = len(fn.blocks)
+
+    # the values of the vregs, blocks and variables of the callee in the copy
+    values = {param.id : arg for param, arg in zip(callee.params, call.args[1:])}
+    blocks = {other.id : fn.new_block() for other in callee.blocks}
+    slots = {id(var) : self._new_slot(fn, var, "%s.%s" %(callee.name, var.name)) for var in callee.lvars}
+
+    result = self._new_slot(fn, LVar(callee.ret_type, 0), "%s.ret" %(callee.name))
+    after = fn.new_block()
+
+    def value(arg) :
+      if isinstance(arg, VReg) :
+        if arg.id not in values :
+          values[arg.id] = fn.new_vreg()
+        return values[arg.id]
+      elif isinstance(arg, BasicBlock) :
+        return blocks[arg.id]
+      elif isinstance(arg, LVar) :
+        return slots[id(arg)]
+      return arg
+
+    for other in callee.blocks :
+      copy = blocks[other.id]
+      for ins in other.instrs :
+        if ins.op == "ret" :
+          copy.instrs.append(Ins("store", None, result, value(ins.args[0]) if ins.args else 0))
+          copy.instrs.append(Ins("jmp", None, after))
+        else :
+          dest = value(ins.dest) if ins.dest is not None else None
+          copy.instrs.append(Ins(ins.op, dest, *[value(arg) for arg in ins.args]))
+
+    after.instrs = [Ins("load", call.dest, result)] + block.instrs[index + 1:]
+    block.instrs[index:] = [Ins("jmp", None, blocks[callee.blocks[0].id])]
+
+    # the copy is laid out right after the block of the call, then the rest of it
+    new_blocks = fn.blocks[first:]
+    del fn.blocks[first:]
+    at = fn.blocks.index(block) + 1
+    fn.blocks[at:at] = new_blocks
@@ -0,0 +1,37 @@
+
+__all__ = ["Instr", "Label"]
+
+class Instr :
+  # an assembly instruction, its opcode and the operands in AT&T order (source first)
+  # it is only formatted as text when written out
+  __slots__ = ("op", "args")
+
+  def __init__(self, op : str, *args : str) :
+    self.op = op
+    self.args = args
+
+  @property
+  def is_label(self) -> bool:
+    return False
+
+  def __str__(self) -> str:
+    if self.args :
+      return "\t%s %s" %(self.op, ", ".join(self.args))
+    return "\t%s" %(self.op)
+
+class Label (Instr) :
+  __slots__ = ()
+
+  def __init__(self, name : str) :
+    super().__init__(None, name)
+
+  @property
+  def name(self) -> str:
+    return self.args[0]
+
+  @property
+  def is_label(self) -> bool:
+    return True
+
+  def __str__(self) -> str:
+    return "%s:" %(self.name)
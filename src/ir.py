@@ -0,0 +1,216 @@
+
+from .object_type import *
+from .data_type import DataType, ty_int
+
+__all__ = ["VReg", "Ins", "BasicBlock", "IRFunction", "dump", "truncate"]
+
+# three-address intermediate representation
+#
+# a function is a list of basic blocks, the first one is the entry, and each
+# block ends with a terminator (jmp, br, ret or tailcall) that gives its successors
+# values are virtual registers (VReg), unlimited in number, or int constants
+# local and global variables stay in memory, and are only reached by
+# load, store and addr
+#
+#   %d = add %a, %b        add sub mul div eq ne lt le (signed, 64 bits)
+#   %d = neg %a
+#   %d = copy %a
+#   %d = ext %a, 4         sign-extends the low 1, 2 or 4 bytes of %a
+#   %d = addr x            address of the variable x
+#   %d = load x            loads the variable x, sign-extended from its size
+#   %d = load %p, 4        loads 1, 2, 4 or 8 bytes from the address in %p, sign-extended
+#   store x, %a            stores the low bytes of %a, as many as the size of x
+#   store %p, %a, 4        stores the low 1, 2, 4 or 8 bytes of %a to the address in %p
+#   %d = call f, %a, %b    at most 6 arguments
+#   %d = phi %a, %b        the value from each predecessor of the block, in
+#                          order, only in SSA form (see ssa.py)
+#   jmp .L1
+#   br %c, .L1, .L2        to .L1 if %c != 0, else to .L2
+#   ret %a                 (or ret, without a value)
+#   tailcall f, %a, %b     returns what f returns, called without a frame (see tailcall.py)
+
+def truncate(value : int, size : int) -> int:
+  # the signed integer of size bytes with the same low bytes as value
+  bits = 8 * size
+  value &= (1 << bits) - 1
+  return value - (1 << bits) if value >= (1 << (bits - 1)) else value
+
+class VReg :
+  __slots__ = ("id",)
+
+  def __init__(self, id : int) :
+    self.id = id
+
+  def __str__(self) -> str:
+    return "%%%d" %(self.id)
+
+  __repr__ = __str__
+
+class Ins :
+  # dest is the VReg defined by the instruction, or None
+  __slots__ = ("op", "dest", "args")
+
+  binary = ("add", "sub", "mul", "div", "eq", "ne", "lt", "le")
+  terminators = ("jmp", "br", "ret", "tailcall")
+
+  def __init__(self, op : str, dest : VReg, *args) :
+    self.op = op
+    self.dest = dest
+    self.args = list(args)
+
+  @property
+  def is_terminator(self) -> bool:
+    return self.op in Ins.terminators
+
+  @property
+  def targets(self) -> list:
+    # successors of a terminator
+    if self.op == "jmp" :
+      return [self.args[0]]
+    elif self.op == "br" :
+      return [self.args[1], self.args[2]]
+    return []
+
+  def uses(self) -> list:
+    # the VRegs read by the instruction
+    return [arg for arg in self.args if isinstance(arg, VReg)]
+
+  def __str__(self) -> str:
+    args = ", ".join(_operand(arg) for arg in self.args)
+    text = "%s %s" %(self.op, args) if args else self.op
+
+    if self.dest is not None :
+      return "%s = %s" %(self.dest, text)
+    return text
+
+def _operand(arg) -> str:
+
+  if isinstance(arg, BasicBlock) :
+    return arg.label
+  elif isinstance(arg, LVar) :
+    return "%s[%d]" %(arg.name, arg.offset)
+  elif isinstance(arg, GVar) :
+    return "@" + arg.name
+  return str(arg)
+
+class BasicBlock :
+  __slots__ = ("id", "label", "instrs", "preds")
+
+  def __init__(self, id : int, label : str) :
+    self.id = id
+    self.label = label
+    self.instrs = []
+    self.preds = [] # filled by IRFunction.compute_cfg
+
+  @property
+  def terminator(self) -> Ins:
+    if self.instrs and self.instrs[-1].is_terminator :
+      return self.instrs[-1]
+    return None
+
+  @property
+  def succs(self) -> list:
+    return self.terminator.targets if self.terminator is not None else []
+
+class IRFunction :
+
+  def __init__(self, name : str, lvars : list, stack_size : int, ret_type : DataType = ty_int) :
+    self.name = name
+    self.ret_type = ret_type
+    self.params = []             # VRegs holding the arguments at the entry
+    self.blocks = []             # blocks[0] is the entry
+    self.lvars = lvars           # local variables (LVar), in their stack slots
+    self.stack_size = stack_size # bytes taken by the local variables
+    self._vregs = 0
+    self._labels = 0
+
+  def new_vreg(self) -> VReg:
+    self._vregs += 1
+    return VReg(self._vregs)
+
+  def new_block(self) -> BasicBlock:
+    self._labels += 1
+    block = BasicBlock(self._labels, ".L.%s.%d" %(self.name, self._labels))
+    self.blocks.append(block)
+    return block
+
+  def compute_cfg(self) -> None:
+    # removes the blocks that can't be reached from the entry, and fills the predecessors
+    reachable = set()
+    stack = [self.blocks[0]]
+
+    while stack :
+      block = stack.pop()
+      if block.id in reachable : continue
+      reachable.add(block.id)
+      stack.extend(block.succs)
+
+    self.blocks = [block for block in self.blocks if block.id in reachable]
+
+    for block in self.blocks :
+      block.preds = []
+    for block in self.blocks :
+      for succ in block.succs :
+        succ.preds.append(block)
+
+  def merge_blocks(self) -> None:
+    # joins each block to its only predecessor, when that one just jumps to it
+    self.compute_cfg()
+    entry = self.blocks[0]
+    merged = set()
+
+    for block in self.blocks :
+      if block.id in merged : continue
+
+      while block.terminator is not None and block.terminator.op == "jmp" :
+        succ = block.terminator.args[0]
+        if succ is block or succ is entry or len(succ.preds) != 1 : break
+
+        block.instrs[-1:] = succ.instrs
+        merged.add(succ.id)
+        for other in succ.succs :
+          other.preds = [block if pred is succ else pred for pred in other.preds]
+
+    self.blocks = [block for block in self.blocks if block.id not in merged]
+
+  def reverse_postorder(self) -> list:
+
+    # iterative depth-first search, functions can have many blocks
+    entry = self.blocks[0]
+    order = []
+    visited = {entry.id}
+    stack = [(entry, iter(entry.succs))]
+
+    while stack :
+      block, succs = stack[-1]
+
+      for succ in succs :
+        if succ.id not in visited :
+          visited.add(succ.id)
+          stack.append((succ, iter(succ.succs)))
+          break
+      else :
+        stack.pop()
+        order.append(block)
+
+    order.reverse()
+    return order
+
+  def instructions(self) :
+    for block in self.blocks :
+      yield from block.instrs
+
+  def __str__(self) -> str:
+    lines = ["function %s(%s) {" %(self.name, ", ".join(map(str, self.params)))]
+
+    for block in self.blocks :
+      preds = ", ".join(pred.label for pred in block.preds)
+      lines.append("%s:%s" %(block.label, "  ; preds: " + preds if preds else ""))
+      lines += ["  %s" %(ins) for ins in block.instrs]
+
+    lines.append("}")
+    return "\n".join(lines)
+
+def dump(functions : list) -> str:
+  # textual form of the IR, as written by --emit-ir
+  return "\n\n".join(str(fn) for fn in functions) + "\n"
@@ -0,0 +1,461 @@
+from bisect import bisect_right
+
+from .ir import *
+from .object_type import *
+from .data_type import ty_int, align_to
+from .asm_gen import Asm_Generator, _Lines
+from .peephole import PeepholeOptimizer
+from .strength import StrengthReducer
+
+__all__ = ["IR_Asm_Generator"]
+
+def _is_register(loc) -> bool:
+  return isinstance(loc, str) and loc.startswith("%")
+
+def _is_memory(loc) -> bool:
+  return isinstance(loc, str) and "(" in loc
+
+def _fits_imm32(value : int) -> bool:
+  return -(1 << 31) <= value < (1 << 31)
+
+class IR_Asm_Generator(Asm_Generator) :
+  # x86-64 backend over the IR
+  # the virtual registers are assigned to machine registers by a linear scan over
+  # their live intervals, and the ones that don't fit are spilled to the frame
+  # a virtual register live across a call only gets a callee-saved register
+
+  # given to the virtual registers, %rax, %rdx and %r11 are kept as scratch
+  _allocatable = ["%rdi", "%rsi", "%rcx", "%r8", "%r9", "%r10"]
+
+  _setcc = {"eq" : "sete", "ne" : "setne", "lt" : "setl", "le" : "setle"}
+  _arith = {"add" : "addq", "sub" : "subq", "mul" : "imulq"}
+
+  _cc = {"eq" : "e", "ne" : "ne", "lt" : "l", "le" : "le"}
+
+  def __init__(self, functions : list, peephole : PeepholeOptimizer = None,
+                     strength : StrengthReducer = None, branch : bool = False,
+                     leaf : bool = False) :
+    super().__init__(peephole = peephole, strength = strength, branch = branch, leaf = leaf)
+    self._functions = {fn.name : fn for fn in functions} # IRFunction of each function
+    self._loc = dict()   # VReg id -> register or stack slot
+    self._uses = dict()  # VReg id -> number of instructions reading it
+    self._next = None    # block laid out right after the current one
+
+  def _emit_text(self, prog : list) :
+
+    self._out.emit(".text")
+
+    for obj in prog :
+      if obj.is_function :
+        self._gen_function(self._functions[obj.name])
+
+  def _gen_function(self, fn : IRFunction) -> None:
+
+    self._saved = set()
+    locals_size = self._allocate(fn)
+
+    out, self._out = self._out, _Lines()
+
+    # the arguments to the locations of the parameters
+    self._parallel_move([(reg, self._loc[param.id]) for reg, param in zip(self._argreg, fn.params)])
+
+    self._uses = dict()
+    for ins in fn.instructions() :
+      for v in ins.uses() :
+        self._uses[v.id] = self._uses.get(v.id, 0) + 1
+
+    for i, block in enumerate(fn.blocks) :
+      self._next = fn.blocks[i + 1] if i + 1 < len(fn.blocks) else None
+      self._label(block.label)
+
+      instrs = block.instrs
+      if self._branch and self._fuses(instrs) :
+        # the comparison only feeds the branch, that jumps on its flags
+        for ins in instrs[:-2] :
+          self._gen_ins(fn, ins)
+        self._gen_compare_branch(instrs[-2], instrs[-1])
+      else :
+        for ins in instrs :
+          self._gen_ins(fn, ins)
+
+    body, self._out = self._out, out
+    self._emit_function(fn.name, body, locals_size)
+
+  def _liveness(self, fn : IRFunction) -> tuple:
+    # VReg ids live at the entry and at the exit of each block
+    uses, defs = dict(), dict()
+
+    for block in fn.blocks :
+      used, defined = set(), set()
+      for ins in block.instrs :
+        used.update(v.id for v in ins.uses() if v.id not in defined)
+        if ins.dest is not None : defined.add(ins.dest.id)
+      uses[block.id], defs[block.id] = used, defined
+
+    live_in = {block.id : set() for block in fn.blocks}
+    live_out = {block.id : set() for block in fn.blocks}
+
+    changed = True
+    while changed :
+      changed = False
+      for block in reversed(fn.blocks) :
+        out = set()
+        for succ in block.succs :
+          out |= live_in[succ.id]
+
+        new_in = uses[block.id] | (out - defs[block.id])
+        if new_in != live_in[block.id] or out != live_out[block.id] :
+          live_in[block.id], live_out[block.id] = new_in, out
+          changed = True
+
+    return live_in, live_out
+
+  def _intervals(self, fn : IRFunction) -> tuple:
+    # numbers the instructions in the order of the blocks, and gives every VReg
+    # the interval from its first definition to its last use, including the
+    # blocks it is live through
+    live_in, live_out = self._liveness(fn)
+
+    intervals = dict() # VReg id -> [start, end]
+    calls = []         # positions of the calls
+
+    def extend(vid : int, pos : int) :
+      if vid in intervals :
+        interval = intervals[vid]
+        if pos < interval[0] : interval[0] = pos
+        if pos > interval[1] : interval[1] = pos
+      else :
+        intervals[vid] = [pos, pos]
+
+    for param in fn.params :
+      extend(param.id, 0)
+
+    pos = 0
+    for block in fn.blocks :
+      start = pos + 1
+      for vid in live_in[block.id] :
+        extend(vid, start)
+
+      for ins in block.instrs :
+        pos += 2
+        for v in ins.uses() :
+          extend(v.id, pos)
+        if ins.dest is not None :
+          extend(ins.dest.id, pos)
+        if ins.op == "call" :
+          calls.append(pos)
+
+      for vid in live_out[block.id] :
+        extend(vid, pos + 1)
+
+    return intervals, calls
+
+  def _allocate(self, fn : IRFunction) -> int:
+    # linear scan, returns the bytes of the frame taken by the variables and spills
+    intervals, calls = self._intervals(fn)
+
+    def crosses_call(start : int, end : int) -> bool:
+      i = bisect_right(calls, start)
+      return i < len(calls) and calls[i] < end
+
+    self._loc = dict()
+    spills = 0
+    locals_size = align_to(fn.stack_size, 8)
+
+    # a parameter takes the register it is passed in when it is free, so it isn't moved
+    hints = {param.id : reg for reg, param in zip(self._argreg, fn.params)}
+
+    free_caller = list(reversed(self._allocatable))
+    free_callee = list(reversed(self._callee_saved))
+    active = [] # VReg ids in registers, sorted by the end of their intervals
+
+    for vid, (start, end) in sorted(intervals.items(), key = lambda item : item[1][0]) :
+
+      while active and intervals[active[0]][1] < start :
+        reg = self._loc[active.pop(0)]
+        (free_callee if reg in self._callee_saved else free_caller).append(reg)
+
+      crosses = crosses_call(start, end)
+
+      if free_callee and (crosses or not free_caller) :
+        self._loc[vid] = free_callee.pop()
+      elif free_caller and not crosses :
+        hint = hints.get(vid)
+        self._loc[vid] = free_caller.pop(free_caller.index(hint) if hint in free_caller else -1)
+      else :
+        # spill the interval that ends last, among the ones whose register fits
+        candidates = [other for other in active
+                      if intervals[other][1] > end and (not crosses or self._loc[other] in self._callee_saved)]
+
+        spills += 1
+        slot = "%d(%%rbp)" %(-(locals_size + 8 * spills))
+
+        if candidates :
+          spilled = candidates[-1]
+          self._loc[vid] = self._loc[spilled]
+          self._loc[spilled] = slot
+          active.remove(spilled)
+        else :
+          self._loc[vid] = slot
+          continue
+
+      active.append(vid)
+      active.sort(key = lambda other : intervals[other][1])
+
+    self._saved.update(reg for reg in self._loc.values() if reg in self._callee_saved)
+
+    return locals_size + 8 * spills
+
+  def _operand(self, arg) :
+    # location of a value: a register, a stack slot or an int constant
+    if isinstance(arg, VReg) :
+      return self._loc[arg.id]
+    return arg
+
+  def _source(self, loc, scratch : str = "%r11") -> str:
+    # loc as the source operand of an instruction, constants that don't fit
+    # in an immediate are loaded to scratch first
+    if isinstance(loc, int) :
+      if _fits_imm32(loc) : return "$%d" %(loc)
+      self._emit("movabsq", "$%d" %(loc), scratch)
+      return scratch
+    return loc
+
+  def _move(self, src, dest : str) -> None:
+
+    if src == dest : return
+
+    if isinstance(src, int) :
+      if _fits_imm32(src) :
+        self._emit("movq", "$%d" %(src), dest)
+      elif _is_register(dest) :
+        self._emit("movabsq", "$%d" %(src), dest)
+      else :
+        self._emit("movabsq", "$%d" %(src), "%r11")
+        self._emit("movq", "%r11", dest)
+
+    elif _is_memory(src) and _is_memory(dest) : # no memory to memory moves
+      self._emit("movq", src, "%r11")
+      self._emit("movq", "%r11", dest)
+
+    else :
+      self._emit("movq", src, dest)
+
+  def _parallel_move(self, moves : list) -> None:
+    # performs all the moves (src, dest) as if at once, the destinations are distinct
+    pending = [(src, dest) for src, dest in moves if src != dest]
+
+    while pending :
+      for i, (src, dest) in enumerate(pending) :
+        # a destination can be written once no other move reads it
+        if not any(other == dest for j, (other, _) in enumerate(pending) if j != i) :
+          self._move(src, dest)
+          pending.pop(i)
+          break
+
+      else :
+        # a cycle, the value of one destination is moved away first
+        dest = pending[0][1]
+        self._move(dest, "%r11")
+        pending = [("%r11" if src == dest else src, d) for src, d in pending]
+
+  def _gen_ins(self, fn : IRFunction, ins : Ins) -> None:
+
+    op = ins.op
+    dest = self._loc[ins.dest.id] if ins.dest is not None else None
+    args = [self._operand(arg) for arg in ins.args]
+
+    if op == "mul" and isinstance(args[0], int) :
+      args.reverse() # the multiplication is commutative, the constant goes on the right
+
+    if op in ("mul", "div") and self._reduce(op, args[0], args[1], dest) :
+      return
+
+    if op in self._arith :
+      lhs, rhs = args
+      rhs = self._source(rhs)
+
+      if _is_register(dest) and dest != rhs :
+        self._move(lhs, dest)
+        self._emit(self._arith[op], rhs, dest)
+      else :
+        self._move(lhs, "%rax")
+        self._emit(self._arith[op], rhs, "%rax")
+        self._move("%rax", dest)
+
+    elif op == "div" :
+      lhs, rhs = args
+      if isinstance(rhs, int) : # idivq doesn't take an immediate
+        self._move(rhs, "%r11")
+        rhs = "%r11"
+      self._move(lhs, "%rax")
+      self._emit("cqto") # extends signal %rax -> %rdx
+      self._emit("idivq", rhs)
+      self._move("%rax", dest)
+
+    elif op in self._setcc :
+      lhs, rhs = args
+      rhs = self._source(rhs)
+      self._move(lhs, "%rax")
+      self._emit("cmpq", rhs, "%rax")
+      self._emit(self._setcc[op], "%al")
+      self._emit("movzbq", "%al", "%rax")
+      self._move("%rax", dest)
+
+    elif op == "neg" :
+      self._move(args[0], dest)
+      self._emit("negq", dest)
+
+    elif op == "copy" :
+      self._move(args[0], dest)
+
+    elif op == "addr" :
+      reg = dest if _is_register(dest) else "%rax"
+      self._emit("leaq", self._var_address(ins.args[0]), reg)
+      self._move(reg, dest)
+
+    elif op == "ext" :
+      value, size = args
+      if isinstance(value, int) :
+        self._move(truncate(value, size), dest)
+      else :
+        reg = dest if _is_register(dest) else "%rax"
+        self._emit(self._loads[size], self._register(value, size) if _is_register(value) else value, reg)
+        self._move(reg, dest)
+
+    elif op == "load" :
+      if isinstance(ins.args[0], Var) :
+        address, size = self._var_address(ins.args[0]), ins.args[0].data_type.size
+      else :
+        address, size = "(%s)" %(self._address(args[0])), args[1]
+
+      if size == 8 :
+        self._move(address, dest)
+      else :
+        reg = dest if _is_register(dest) else "%rax"
+        self._emit(self._loads[size], address, reg)
+        self._move(reg, dest)
+
+    elif op == "store" :
+      if isinstance(ins.args[0], Var) :
+        address, size = self._var_address(ins.args[0]), ins.args[0].data_type.size
+      else :
+        address, size = "(%s)" %(self._address(args[0])), args[2]
+
+      value = args[1]
+      if isinstance(value, int) :
+        value = truncate(value, size)
+      if _is_memory(value) or (isinstance(value, int) and not _fits_imm32(value)) :
+        self._move(value, "%r11")
+        value = "%r11"
+
+      if isinstance(value, int) :
+        self._emit(self._stores[size], "$%d" %(value), address)
+      else :
+        self._emit(self._stores[size], self._register(value, size), address)
+
+    elif op == "call" :
+      callee = ins.args[0]
+      self._parallel_move(list(zip(args[1:], self._argreg)))
+      self._emit("movq", "$0", "%rax")
+      self._emit("call", callee)
+      if dest is not None :
+        # the callee only sets the bytes of its type, functions of other files return int
+        self._extend(self._functions[callee].ret_type.size if callee in self._functions else ty_int.size)
+        self._move("%rax", dest)
+
+    elif op == "tailcall" :
+      callee = ins.args[0]
+      self._parallel_move(list(zip(args[1:], self._argreg)))
+      if callee not in self._functions : # may be variadic, see the call-rax peephole rule
+        self._emit("movq", "$0", "%rax")
+      self._emit("tailcall", callee)
+
+    elif op == "jmp" :
+      self._jump(ins.args[0])
+
+    elif op == "br" :
+      cond, then_block, else_block = args
+
+      if isinstance(cond, int) :
+        self._jump(then_block if cond != 0 else else_block)
+      elif not self._branch :
+        self._emit("cmpq", "$0", cond)
+        self._emit("je", else_block.label)
+        self._emit("jmp", then_block.label)
+      else :
+        if _is_register(cond) :
+          self._emit("testq", cond, cond)
+        else :
+          self._emit("cmpq", "$0", cond)
+        self._branch_on("ne", then_block, else_block)
+
+    elif op == "ret" :
+      if args :
+        self._move(args[0], "%rax")
+      self._emit("jmp", ".L.return.%s" %(fn.name))
+
+  def _jump(self, block : BasicBlock) -> None:
+    if not self._branch or block is not self._next :
+      self._emit("jmp", block.label)
+
+  def _fuses(self, instrs : list) -> bool:
+    # if the block ends with a comparison whose only use is the branch right after it
+    if len(instrs) < 2 : return False
+    compare, br = instrs[-2], instrs[-1]
+
+    return compare.op in self._cc and br.op == "br" and br.args[0] is compare.dest \
+           and self._uses[compare.dest.id] == 1
+
+  def _gen_compare_branch(self, compare : Ins, br : Ins) -> None:
+    lhs, rhs = [self._operand(arg) for arg in compare.args]
+    cc = self._cc[compare.op]
+
+    if isinstance(lhs, int) and not isinstance(rhs, int) :
+      # the constant goes to the source side, the condition reads the other way
+      lhs, rhs = rhs, lhs
+      cc = {"l" : "g", "le" : "ge"}.get(cc, cc)
+
+    rhs = self._source(rhs)
+    if isinstance(lhs, int) or (_is_memory(lhs) and _is_memory(rhs)) :
+      self._move(lhs, "%rax")
+      lhs = "%rax"
+
+    self._emit("cmpq", rhs, lhs)
+    self._branch_on(cc, br.args[1], br.args[2])
+
+  def _branch_on(self, cc : str, then_block : BasicBlock, else_block : BasicBlock) -> None:
+    # jumps to then_block if the flags satisfy cc, else to else_block, the
+    # block laid out next is reached by falling through
+    if then_block is self._next :
+      self._emit("j" + self._negated[cc], else_block.label)
+    else :
+      self._emit("j" + cc, then_block.label)
+      self._jump(else_block)
+
+  def _reduce(self, op : str, lhs, rhs, dest : str) -> bool:
+    # emits a cheaper sequence for the multiplication or division by the constant rhs, if any
+    if self._strength is None or not isinstance(rhs, int) :
+      return False
+
+    if op == "mul" :
+      reg = dest if _is_register(dest) else "%rax"
+      code = self._strength.multiply(reg, rhs)
+    else :
+      reg = "%rax"
+      code = self._strength.divide(rhs, "%r11")
+
+    if code is None :
+      return False
+
+    self._move(lhs, reg)
+    self._out.extend(code)
+    self._move(reg, dest)
+    return True
+
+  def _address(self, loc) -> str:
+    # a register holding the address in loc
+    if _is_register(loc) :
+      return loc
+    self._move(loc, "%rax")
+    return "%rax"
@@ -0,0 +1,216 @@
+
+from .expr import *
+from .stmt import *
+from .ir import *
+
+__all__ = ["IRBuilder"]
+
+class IRBuilder :
+  # lowers the body of each function from the AST to the three-address IR
+
+  _binary = {
+    Operator.ADD : "add",
+    Operator.SUB : "sub",
+    Operator.MUL : "mul",
+    Operator.DIV : "div",
+    Operator.EQ  : "eq",
+    Operator.NE  : "ne",
+    Operator.LT  : "lt",
+    Operator.LE  : "le",
+  }
+
+  def __init__(self, rotate : bool = False) :
+    # with rotate, loops test their condition at the bottom, right after the body
+    self._rotate = rotate
+
+  def build(self, prog : list) -> list:
+    # one IRFunction for each function of prog, in the same order
+    return [self._function(obj) for obj in prog if obj.is_function]
+
+  def _function(self, fn) -> IRFunction:
+
+    self._fn = IRFunction(fn.name, list(fn.lvars), fn.stack_size, fn.data_type.ret_type)
+    self._block = self._fn.new_block()
+    self._last = None # value of the last expression statement of the current block
+
+    # the arguments are stored to the stack slots of the parameters
+    for var in fn.params :
+      arg = self._fn.new_vreg()
+      self._fn.params.append(arg)
+      self._emit("store", None, var, arg)
+
+    self._stmt(fn.body)
+
+    if self._block.terminator is None :
+      # falls off the end of the function, with the value of the last expression
+      # in %rax as the code generated from the AST does
+      if self._last is not None :
+        self._emit("ret", None, self._last)
+      else :
+        self._emit("ret", None)
+
+    self._fn.compute_cfg()
+    return self._fn
+
+  def _emit(self, op : str, dest : VReg, *args) -> None:
+    self._block.instrs.append(Ins(op, dest, *args))
+
+  def _value(self, op : str, *args) -> VReg:
+    # emits an instruction that defines a new VReg
+    dest = self._fn.new_vreg()
+    self._emit(op, dest, *args)
+    return dest
+
+  def _terminate(self, op : str, *args) -> None:
+    # ends the current block, the code that follows (if any) is unreachable
+    # until a label starts a new block
+    self._emit(op, None, *args)
+    self._block = self._fn.new_block()
+    self._last = None
+
+  def _start(self, block : BasicBlock) -> None:
+    # falls through to block, that becomes the current one
+    if self._block.terminator is None :
+      self._emit("jmp", None, block)
+    self._block = block
+    self._last = None
+
+  def _stmt(self, stmt : Stmt) -> None:
+
+    if stmt.is_if_stmt:
+      then_block = self._fn.new_block()
+      else_block = self._fn.new_block()
+      end_block = self._fn.new_block()
+
+      cond = self._expr(stmt.condition)
+      self._terminate("br", cond, then_block, else_block)
+
+      self._start(then_block)
+      self._stmt(stmt.then_branch)
+      self._terminate("jmp", end_block)
+
+      self._start(else_block)
+      if stmt.else_branch is not None:
+        self._stmt(stmt.else_branch)
+
+      self._start(end_block)
+
+    elif stmt.is_for_stmt:
+      if stmt.init is not None:
+        self._stmt(stmt.init)
+
+      if self._rotate and stmt.condition is not None:
+        # the condition is laid out after all the blocks of the body, that
+        # falls through to it, and the loop is entered by a jump to the condition
+        body_block = self._fn.new_block()
+        cond_block = self._fn.new_block()
+        end_block = self._fn.new_block()
+
+        self._emit("jmp", None, cond_block)
+        self._start(body_block)
+        self._stmt(stmt.body)
+
+        if stmt.inc is not None:
+          self._expr(stmt.inc)
+
+        for block in (cond_block, end_block) :
+          self._fn.blocks.remove(block)
+          self._fn.blocks.append(block)
+
+        self._start(cond_block)
+        cond = self._expr(stmt.condition)
+        self._terminate("br", cond, body_block, end_block)
+        self._start(end_block)
+        return
+
+      cond_block = self._fn.new_block()
+      body_block = self._fn.new_block()
+      end_block = self._fn.new_block()
+
+      self._start(cond_block)
+      if stmt.condition is not None:
+        cond = self._expr(stmt.condition)
+        self._terminate("br", cond, body_block, end_block)
+
+      self._start(body_block)
+      self._stmt(stmt.body)
+
+      if stmt.inc is not None:
+        self._expr(stmt.inc)
+
+      self._terminate("jmp", cond_block)
+      self._start(end_block)
+
+    elif stmt.is_compound_stmt:
+      for statement in stmt.body:
+        self._stmt(statement)
+
+    elif stmt.is_expression_stmt:
+      if stmt.expression is not None:
+        self._last = self._expr(stmt.expression)
+
+    elif stmt.is_return_stmt:
+      if stmt.ret_value is not None:
+        self._terminate("ret", self._expr(stmt.ret_value))
+      else :
+        self._terminate("ret")
+
+  def _addr(self, node : Expr) :
+    # the address of an lvalue, as a variable (for the variables themselves) or a VReg
+
+    if node.is_variable:
+      return node.var_desc
+
+    elif node.is_unary and node.is_deref:
+      return self._expr(node.lhs)
+
+  def _expr(self, node : Expr) :
+    # returns the value of node, as a VReg or an int constant
+
+    if node.is_literal:
+      return node.value
+
+    elif node.is_variable:
+      if node.operand_type.is_array :
+        # an array is used as the address of its first element
+        return self._value("addr", node.var_desc)
+      return self._value("load", node.var_desc)
+
+    elif node.is_funcall:
+      args = [self._expr(arg) for arg in node.args]
+      return self._value("call", node.callee, *args)
+
+    elif node.is_assignment:
+      addr = self._addr(node.lhs)
+      value = self._expr(node.value)
+      size = node.lhs.operand_type.size
+
+      if isinstance(addr, Var) :
+        self._emit("store", None, addr, value)
+      else :
+        self._emit("store", None, addr, value, size)
+
+      # the value of the assignment is the one converted to the type of lhs
+      if isinstance(value, int) :
+        return truncate(value, size)
+      return self._value("ext", value, size) if size < 8 else value
+
+    elif node.is_unary:
+      if node.is_addressing :
+        addr = self._addr(node.lhs)
+        return self._value("addr", addr) if not isinstance(addr, (VReg, int)) else addr
+
+      value = self._expr(node.lhs)
+
+      if node.is_neg:
+        return self._value("neg", value)
+
+      elif node.is_deref:
+        if node.operand_type.is_array :
+          return value
+        return self._value("load", value, node.operand_type.size)
+
+    elif node.is_binary:
+      rhs = self._expr(node.rhs)
+      lhs = self._expr(node.lhs)
+      return self._value(self._binary[node.op], lhs, rhs)
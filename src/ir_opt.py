@@ -0,0 +1,192 @@
+
+from .object_type import *
+from .ir import *
+from .ssa import dominators, natural_loops, to_ssa, from_ssa
+
+__all__ = ["IROptimizer"]
+
+# a pass rewrites a function in SSA form, and returns how many instructions it
+# removed (or moved, for licm)
+
+# instructions that must run even if their value is unused
+_effects = ("store", "call") + Ins.terminators
+
+def _copy_propagation(fn : IRFunction) -> int:
+  # the uses of a copy, or of a phi whose incoming values are all the same
+  # (besides the phi itself), are replaced by that value
+  replace = dict() # VReg id -> value
+
+  def resolve(arg) :
+    while isinstance(arg, VReg) and arg.id in replace :
+      arg = replace[arg.id]
+    return arg
+
+  changed = True
+  while changed :
+    changed = False
+    for ins in fn.instructions() :
+      if ins.dest is None or ins.dest.id in replace : continue
+
+      if ins.op == "copy" :
+        replace[ins.dest.id] = resolve(ins.args[0])
+        changed = True
+
+      elif ins.op == "phi" :
+        values = {resolve(arg) for arg in ins.args} - {ins.dest}
+        if len(values) == 1 :
+          replace[ins.dest.id] = values.pop()
+          changed = True
+
+  removed = 0
+  for block in fn.blocks :
+    instrs = []
+    for ins in block.instrs :
+      if ins.dest is not None and ins.dest.id in replace :
+        removed += 1
+        continue
+      ins.args = [resolve(arg) for arg in ins.args]
+      instrs.append(ins)
+    block.instrs = instrs
+
+  return removed
+
+def _dead_stores(fn : IRFunction) -> int:
+  # a store to a variable is dead if the variable is stored again, or the
+  # function returns, before anything may read it, within the same block
+  removed = 0
+
+  for block in fn.blocks :
+    dead = set()    # ids of the variables overwritten before being read
+    instrs = []
+
+    for ins in reversed(block.instrs) :
+      if ins.op == "ret" :
+        # the local variables end with the function
+        dead = {id(var) for var in fn.lvars}
+
+      elif ins.op == "store" and isinstance(ins.args[0], Var) :
+        if id(ins.args[0]) in dead :
+          removed += 1
+          continue
+        dead.add(id(ins.args[0]))
+
+      elif ins.op == "load" :
+        if isinstance(ins.args[0], Var) :
+          dead.discard(id(ins.args[0]))
+        else :
+          dead = set() # through a pointer, may read any of them
+
+      elif ins.op == "call" :
+        dead = set()
+
+      instrs.append(ins)
+
+    instrs.reverse()
+    block.instrs = instrs
+
+  return removed
+
+# instructions without side effects, that can't trap either
+_pure = ("add", "sub", "mul", "eq", "ne", "lt", "le", "neg", "copy", "ext", "addr")
+
+def _loop_invariants(fn : IRFunction) -> int:
+  # moves the instructions of a loop whose operands don't change across its
+  # iterations to its preheader, the block the loop is entered from
+  moved = 0
+
+  for header, body in natural_loops(fn, dominators(fn)) :
+    outside = [pred for pred in header.preds if pred.id not in body]
+    if len(outside) != 1 or len(outside[0].succs) != 1 : continue
+    preheader = outside[0]
+
+    blocks = [block for block in fn.blocks if block.id in body]
+    instrs = [ins for block in blocks for ins in block.instrs]
+
+    # what the loop may write to memory, a call or a store through a pointer
+    # can write to any variable
+    calls = any(ins.op == "call" for ins in instrs)
+    stores = [ins.args[0] for ins in instrs if ins.op == "store"]
+    stored = {id(var) for var in stores if isinstance(var, Var)}
+    through_pointer = any(not isinstance(var, Var) for var in stores)
+
+    defined = {ins.dest.id for ins in instrs if ins.dest is not None}
+
+    def invariant(ins : Ins, block : BasicBlock) -> bool:
+      if any(v.id in defined for v in ins.uses()) :
+        return False
+
+      if ins.op in _pure :
+        return True
+      elif ins.op == "div" :
+        return isinstance(ins.args[1], int) and ins.args[1] not in (0, -1)
+      elif ins.op == "load" and isinstance(ins.args[0], Var) :
+        return not calls and not through_pointer and id(ins.args[0]) not in stored
+      elif ins.op == "load" :
+        # the pointer may only be valid where the loop checks it, the header runs
+        # every time the loop is entered
+        return block is header and not calls and not stores
+      return False
+
+    hoisted = []
+    changed = True
+    while changed :
+      changed = False
+      for block in blocks :
+        for ins in list(block.instrs) :
+          if ins.dest is None or not invariant(ins, block) : continue
+          block.instrs.remove(ins)
+          hoisted.append(ins)
+          defined.discard(ins.dest.id)
+          changed = True
+
+    # in the order they were found, each one after the ones it uses
+    preheader.instrs[-1:-1] = hoisted
+    moved += len(hoisted)
+
+  return moved
+
+def _dead_code(fn : IRFunction) -> int:
+  # removes the instructions whose values are never used, starting from the
+  # ones with side effects, everything they use (transitively) is kept
+  defs = {ins.dest.id : ins for ins in fn.instructions() if ins.dest is not None}
+
+  live = set()
+  work = [ins for ins in fn.instructions() if ins.op in _effects]
+  while work :
+    ins = work.pop()
+    if id(ins) in live : continue
+    live.add(id(ins))
+    work.extend(defs[v.id] for v in ins.uses() if v.id in defs)
+
+  removed = 0
+  for block in fn.blocks :
+    kept = [ins for ins in block.instrs if id(ins) in live]
+    removed += len(block.instrs) - len(kept)
+    block.instrs = kept
+
+  return removed
+
+class IROptimizer :
+  # promotes the local variables to SSA form, runs the passes over each function,
+  # and lowers it back to copies for the backend
+
+  passes = {
+    "copyprop" : _copy_propagation,
+    "dse"      : _dead_stores,
+    "licm"     : _loop_invariants,
+    "dce"      : _dead_code,
+  }
+
+  def __init__(self, passes : dict = None) :
+    self.passes = dict(passes if passes is not None else IROptimizer.passes)
+    self.removed = dict.fromkeys(self.passes, 0) # pass name -> instructions removed (or moved)
+    self.promoted = 0                            # local variables moved to registers
+
+  def optimize(self, fn : IRFunction) -> None:
+
+    self.promoted += len(to_ssa(fn))
+
+    for name, run in self.passes.items() :
+      self.removed[name] += run(fn)
+
+    from_ssa(fn)
@@ -16,16 +16,30 @@ class Var(Object) :
   def is_local(self) -> bool:
     return isinstance(self, LVar)
 
+  @property
+  def exposes_frame(self) -> bool:
+    # if taking its address exposes the frame of its function: the address of a
+    # local may be used to reach its neighbours in the frame (e.g. *(&x-1)), so
+    # once it is taken all of them are kept in memory
+    # arrays always live in memory, and their address is taken wherever they decay
+    return self.is_local and not self.data_type.is_array
+
 class GVar(Var) :
   def __init__(self, data_type, name : str) :
     super().__init__(data_type, name)
+    # the values of its elements (of an array, in memory order), the ones
+    # missing are 0, None if it has no initializer
+    self.init = None
 
 class LVar(Var) :
-  def __init__(self, data_type, offset : int) :
+  def __init__(self, data_type, offset : int, name : str = "") :
     # doesn't need of the name to describe a local variable 
-    # only their offset from RBP is enough
-    super().__init__(data_type, "")
+    # only their offset from RBP is enough, the name is kept for the IR dumps
+    super().__init__(data_type, name)
     self.offset = offset
+    # (first, last) token positions where it is in scope, from its declaration to
+    # the end of its block, None if unknown
+    self.lifetime = None
 
 class Fn(Object) :
   def __init__(self, fname : str, ret_type, params, body, lvars, stack_size) :
@@ -33,6 +47,6 @@ class Fn(Object) :
     self.params = params # a list of parameters
     self.arity = len(self.params)
     self.stack_size = stack_size
-    self.lvars = lvars # a dict of local variables
+    self.lvars = lvars # a list of local variables, of all its blocks
     self.body = body # a list of statements
 
@@ -1,595 +1,683 @@
 
-from copy import copy
-
 from .token import *
 from .token_type import *
 from .data_type import *
 from .object_type import *
 from .expr import *
 from .stmt import *
-from .errors import SyntaxErr, error_collector
+from .errors import SyntaxErr, ErrorCollector
+from .token_stream import TokenStream
+from .token_buffer import TokenBuffer
+from .symtab import SymbolTable
+from .fold import ConstantFolder
 
 class Parser :
-  
-  @classmethod
-  def parse(cls, tokens : list) -> list:
+
+  # operators of the expressions, '>' and '>=' are parsed as '<' and '<=' with swapped operands
+  _operators = {
+    TokenType.PLUS          : Operator.ADD,
+    TokenType.MINUS         : Operator.SUB,
+    TokenType.STAR          : Operator.MUL,
+    TokenType.SLASH         : Operator.DIV,
+    TokenType.EQUAL_EQUAL   : Operator.EQ,
+    TokenType.BANG_EQUAL    : Operator.NE,
+    TokenType.LESS          : Operator.LT,
+    TokenType.LESS_EQUAL    : Operator.LE,
+    TokenType.GREATER       : Operator.LT,
+    TokenType.GREATER_EQUAL : Operator.LE,
+  }
+
+  _unary_operators = {
+    TokenType.MINUS     : Operator.NEG,
+    TokenType.AMPERSAND : Operator.ADDR,
+    TokenType.STAR      : Operator.DEREF,
+  }
+
+  # the type named by each type specifier
+  _specifiers = {
+    TokenType.CHAR  : ty_char,
+    TokenType.SHORT : ty_short,
+    TokenType.INT   : ty_int,
+    TokenType.LONG  : ty_long,
+  }
+
+  def __init__(self, errors : ErrorCollector) :
+    self._errors = errors # syntax errors and warnings are reported here
+
+  def parse(self, tokens) -> list:
     """
        <program> -> declaration*
     """
-    cls._tokens = tokens
-    cls._current = 0
+    # tokens is a compact TokenBuffer, or a list or any iterator of tokens (e.g. a scanner
+    # generator) whose tokens are pulled on demand, and released once the parser
+    # can't backtrack to them
+    self._tokens = tokens if isinstance(tokens, TokenBuffer) else TokenStream(tokens)
+    self._current = 0
 
-    cls._globals = []
+    self._globals = []             # global variables and functions, in program order
+    self._symbols = SymbolTable()  # and indexed by name, with the scopes of local variables
 
-    while not cls._is_at_end():
+    while not self._is_at_end():
+      self._tokens.release(self._current - 1)
+      start = self._current
       try:
-        cls._declaration()
+        self._declaration()
       except SyntaxErr as err:
-        error_collector.add(err)
-        cls._syncronize()
+        self._errors.add(err)
+        self._syncronize()
+        # a statement keyword can't start a declaration, skip it or it loops forever
+        if self._current == start : self._consume_current()
 
-    return cls._globals
+    return self._globals
 
-  @classmethod
-  def _declspec(cls) -> DataType:
+  def _declspec(self) -> DataType:
     """
-       <declspec> -> "int"
+       <declspec> -> "char" | "short" | "int" | "long"
     """
-    cls._expect(TokenType.INT, err_msg = "expected specifier or declaration")
-    return ty_int
+    if self._match(*self._specifiers) :
+      return self._specifiers[self._consume_current().kind]
+
+    err_msg = "expected specifier or declaration"
+    if self._is_at_end() :
+      raise SyntaxErr(self._previous(), err_msg + " at end of input")
+    raise SyntaxErr(self._peek(), err_msg)
 
-  @classmethod
-  def _type_suffix(cls, data_type : DataType) -> DataType:
+  def _type_suffix(self, data_type : DataType) -> DataType:
     """
        <type_suffix> -> "[" NUMBER "]" <type_suffix> | ε
     """
-    if cls._match(TokenType.LEFT_BRACKET) :
-      cls._consume_current() # consumes '['
-      size = cls._expect(TokenType.NUM, err_msg = "expected a number").literal
-      cls._expect(TokenType.RIGHT_BRACKET, err_msg = "expected ']'")
+    if self._match(TokenType.LEFT_BRACKET) :
+      self._consume_current() # consumes '['
+      size = self._expect(TokenType.NUM, err_msg = "expected a number").literal
+      self._expect(TokenType.RIGHT_BRACKET, err_msg = "expected ']'")
       # it evaluates from right to left, 
       # declare int x[2][3]; is array_of(array_of(3, int), 2)
-      data_type = cls._type_suffix(data_type)
+      data_type = self._type_suffix(data_type)
       return Array_of(data_type, size)
 
     else : return data_type
 
-  @classmethod
-  def _declarator(cls, basetype : DataType) -> tuple:
+  def _declarator(self, basetype : DataType) -> tuple:
     """
        <declarator> -> "*"* IDENTIFIER
     """
     data_type = basetype
 
-    while cls._match(TokenType.STAR) :
+    while self._match(TokenType.STAR) :
       data_type = Pointer_to(data_type)
-      cls._consume_current()
+      self._consume_current()
 
     try:
-      var_name = cls._expect(TokenType.IDENTIFIER, err_msg = "expected a identifier")
+      var_name = self._expect(TokenType.IDENTIFIER, err_msg = "expected a identifier")
     
     except SyntaxErr : raise
     else : 
       return data_type, var_name
 
-  @classmethod
-  def _new_lvar(cls, var_name : str, data_type : DataType) :
+  def _new_lvar(self, var_name : str, data_type : DataType) :
     
-    cls._offset += data_type.size
-    var_desc = LVar(data_type, -(cls._offset))
-    cls._locals[var_name] = var_desc
+    self._offset = align_to(self._offset + data_type.size, data_type.align)
+    var_desc = LVar(data_type, -(self._offset), var_name)
+    var_desc.lifetime = (self._current, self._current) # until the end of its scope
+    self._symbols.add_local(var_name, var_desc)
+    self._locals.append(var_desc)
     return var_desc
 
-  @classmethod
-  def _new_gvar(cls, var_name : str, data_type : DataType) :
+  def _new_gvar(self, var_name : str, data_type : DataType) :
   
     var_desc = GVar(data_type, var_name)
-    cls._globals.append(var_desc)
+    self._globals.append(var_desc)
+    self._symbols.add_global(var_desc)
     return var_desc
 
-  @classmethod
-  def _func_params(cls) -> list:
+  def _func_params(self) -> list:
     """
        <func_params> -> <param> ("," <param>)*
     """
     params = []
       
-    while not cls._is_at_end() :
+    while not self._is_at_end() :
       try:
-        if cls._match(TokenType.RIGHT_PAREN) : break
+        if self._match(TokenType.RIGHT_PAREN) : break
 
         # <param> -> <declspec> <declarator>
-        basetype = cls._declspec()
-        data_type, var_name = cls._declarator(basetype)
-        param = cls._new_lvar(var_name.lexeme, data_type)
+        basetype = self._declspec()
+        data_type, var_name = self._declarator(basetype)
+        param = self._new_lvar(var_name.lexeme, data_type)
 
       except SyntaxErr as err: raise
       else :
         params.append(param)
 
-        if not cls._match(TokenType.COMMA) : break
-        cls._consume_current() # consumes ','
+        if not self._match(TokenType.COMMA) : break
+        self._consume_current() # consumes ','
 
     return params 
 
-  @classmethod
-  def _function(cls, basetype : DataType) -> Fn:
+  def _function(self, basetype : DataType) -> Fn:
     """
        <function-definition> -> <declspec> <declarator> IDENTIFIER "(" <func-params> ")" "{" <block> "}"
     """
-    cls._locals = dict() # map of local variables
-    cls._offset = 0      # offset of each local variable
+    self._locals = []     # all local variables, of every block
+    self._offset = 0      # offset of each local variable
+
+    # parameters share the scope of the function's outermost block
+    self._symbols.enter_scope()
 
     try:
       e_brace = 1
-      ret_type, fname = cls._declarator(basetype)
+      ret_type, fname = self._declarator(basetype)
       ret_type = Function_type(ret_type)
 
-      cls._expect(TokenType.LEFT_PAREN, err_msg = "expected '('")
+      self._expect(TokenType.LEFT_PAREN, err_msg = "expected '('")
       
-      params = cls._func_params()
+      params = self._func_params()
 
-      cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
-      cls._expect(TokenType.LEFT_BRACE, err_msg = "expected '{'")
+      self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
+      self._expect(TokenType.LEFT_BRACE, err_msg = "expected '{'")
 
-      body = cls._compoundStmt()
+      body = self._compoundStmt(new_scope = False)
       e_brace = 0
 
     except SyntaxErr as err:
-      cls._consume_current()
+      self._consume_current()
       # exit from function's block
-      cls._syncronize(e_brace); raise
+      self._syncronize(e_brace); raise
     else:
-      fn = Fn(fname.lexeme, ret_type, params, body, cls._locals, stack_size=cls._offset)
-      cls._globals.append(fn)
+      fn = Fn(fname.lexeme, ret_type, params, body, self._locals, stack_size=self._offset)
+      self._globals.append(fn)
+      self._symbols.add_function(fn)
+    finally:
+      self._exit_scope()
   
-  @classmethod
-  def _global_variable(cls, basetype : DataType) :
+  def _global_variable(self, basetype : DataType) :
     # parse declaration of global variables     
 
-    while not cls._match(TokenType.SEMICOLON) :
-      data_type, var_name = cls._declarator(basetype)     
-      data_type = cls._type_suffix(data_type)
+    while not self._match(TokenType.SEMICOLON) :
+      data_type, var_name = self._declarator(basetype)     
+      data_type = self._type_suffix(data_type)
+
+      var_desc = self._new_gvar(var_name.lexeme, data_type)
 
-      cls._new_gvar(var_name.lexeme, data_type)
+      if self._match(TokenType.EQUAL) :
+        self._consume_current() # consumes '='
+        var_desc.init = self._initializer(data_type)
       
-      if not cls._match(TokenType.COMMA) : break
-      cls._consume_current() # consumes ',' and continue
+      if not self._match(TokenType.COMMA) : break
+      self._consume_current() # consumes ',' and continue
+
+    self._expect(TokenType.SEMICOLON, "expected ';'")
+
+  def _initializer(self, data_type : DataType) -> list:
+    """
+       <initializer> -> <assignment> | "{" (<assignment> ("," <assignment>)* ","?)? "}"
+    """
+    # the elements of an array are given in memory order, a int x[2][2] takes
+    # {1, 2, 3, 4}, and the ones left out are 0
+    length, elem_type = 1, data_type
+    while elem_type.is_array :
+      length *= elem_type.length
+      elem_type = elem_type.base
+
+    if not self._match(TokenType.LEFT_BRACE) :
+      if data_type.is_array :
+        raise SyntaxErr(self._peek(), "invalid initializer")
+      return [self._constant()]
+
+    brace = self._consume_current() # consumes '{'
+    values = []
+
+    while not self._match(TokenType.RIGHT_BRACE) :
+      values.append(self._constant())
+      if not self._match(TokenType.COMMA) : break
+      self._consume_current() # consumes ',' and continue
+
+    self._expect(TokenType.RIGHT_BRACE, err_msg = "expected '}'")
+
+    if len(values) > length : # non-critical, the excess is dropped
+      kind = "array" if data_type.is_array else "scalar"
+      self._errors.add(SyntaxErr(brace, "excess elements in %s initializer" %(kind), True))
+      del values[length:]
 
-    cls._expect(TokenType.SEMICOLON, "expected ';'")
+    return values
 
-  @classmethod
-  def _declaration(cls) -> Object:
+  def _constant(self) -> int:
+    # the value of an expression known at compile time, e.g. 2*sizeof(long)
+    start = self._peek()
+    value = ConstantFolder().evaluate(self._assignment())
+
+    if value is None :
+      raise SyntaxErr(start, "initializer element is not constant")
+    return value
+
+  def _declaration(self) -> Object:
     """
        declaration -> (<function-definition> | <global-variable>)*
     """
-    basetype = cls._declspec()
+    basetype = self._declspec()
 
-    start = cls._current
-    cls._declarator(basetype) # lookahead to check if it is a function/var declaration
+    start = self._current
+    self._declarator(basetype) # lookahead to check if it is a function/var declaration
     
-    if cls._match(TokenType.LEFT_PAREN) :
-      cls._current = start
-      return cls._function(basetype)
+    if self._match(TokenType.LEFT_PAREN) :
+      self._current = start
+      return self._function(basetype)
     else :
-      cls._current = start
-      return cls._global_variable(basetype)
+      self._current = start
+      return self._global_variable(basetype)
 
-  @classmethod
-  def _var_declaration(cls) -> Stmt:
+  def _var_declaration(self) -> Stmt:
     """
        <var-declaration> -> <declspec> (<declarator>("=" <expression>)?("," <declarator>("="<expression>)?)*)? ";"
     """
-    basetype = cls._declspec()
+    basetype = self._declspec()
 
     declarations = []
 
-    while not cls._is_at_end():
+    while not self._is_at_end():
 
-      if cls._match(TokenType.SEMICOLON) : break
+      if self._match(TokenType.SEMICOLON) : break
 
-      data_type, var_name = cls._declarator(basetype)
-      data_type = cls._type_suffix(data_type)
+      data_type, var_name = self._declarator(basetype)
+      data_type = self._type_suffix(data_type)
 
-      if var_name.lexeme in cls._locals:
+      if self._symbols.declared_in_scope(var_name.lexeme):
         raise SyntaxErr(var_name, "'%s' redeclared" %(var_name.lexeme))
       else:
-        var_desc = cls._new_lvar(var_name.lexeme, data_type)
+        var_desc = self._new_lvar(var_name.lexeme, data_type)
         
-      if cls._match(TokenType.EQUAL) :
-        equals = cls._consume_current() # consumes '='
+      if self._match(TokenType.EQUAL) :
+        equals = self._consume_current() # consumes '='
         left  = VariableExpr(var_desc)
-        right = cls._assignment()
-        decl = ExpressionStmt(AssignExpr(left, equals, right))
+        left.operand_type = data_type
+        right = self._assignment()
+        assign = AssignExpr(left, right, Position.of(equals))
+        assign.operand_type = self._add_type(assign)
+        decl = ExpressionStmt(assign)
         declarations.append(decl)
 
-      if not cls._match(TokenType.COMMA) : break
-      cls._consume_current() # consumes ',' and continue
+      if not self._match(TokenType.COMMA) : break
+      self._consume_current() # consumes ',' and continue
 
-    cls._expect(TokenType.SEMICOLON, "expected ';'")
+    self._expect(TokenType.SEMICOLON, "expected ';'")
 
     return Block(declarations)
 
-  @classmethod
-  def _statement(cls) -> Stmt:
+  def _statement(self) -> Stmt:
     """
        statement -> ifStmt | forStmt | whileStmt | block | returnStmt | exprStmt
     """
-    if cls._match(TokenType.IF) :
-      return cls._ifStmt()
-    elif cls._match(TokenType.FOR) :
-      return cls._forStmt()
-    elif cls._match(TokenType.WHILE) :
-      return cls._whileStmt()
-    elif cls._match(TokenType.LEFT_BRACE) :
-      cls._consume_current()
-      return cls._compoundStmt()
-    elif cls._match(TokenType.RETURN) :
-      return cls._returnStmt()
+    if self._match(TokenType.IF) :
+      return self._ifStmt()
+    elif self._match(TokenType.FOR) :
+      return self._forStmt()
+    elif self._match(TokenType.WHILE) :
+      return self._whileStmt()
+    elif self._match(TokenType.LEFT_BRACE) :
+      self._consume_current()
+      return self._compoundStmt()
+    elif self._match(TokenType.RETURN) :
+      return self._returnStmt()
     else : 
-      return cls._exprStmt()
+      return self._exprStmt()
   
-  @classmethod
-  def _compoundStmt(cls) -> Stmt:
+  def _compoundStmt(self, new_scope : bool = True) -> Stmt:
     """
        <block> -> "{" (<var-declaration> | <statement>)* "}"
     """
+    # a block opens a scope, unless it is a function's body
+    if new_scope : self._symbols.enter_scope()
+
+    try:
+      return self._block()
+    finally:
+      if new_scope : self._exit_scope()
+
+  def _exit_scope(self) -> None:
+    # the variables of the scope end here
+    for var in self._symbols.exit_scope() :
+      var.lifetime = (var.lifetime[0], self._current)
+
+  def _block(self) -> Stmt:
+
     statements = []
 
     # '{' was previously consumed
 
-    while not cls._match(TokenType.RIGHT_BRACE) :
+    while not self._match(TokenType.RIGHT_BRACE) :
       
-      if cls._is_at_end() : break
+      if self._is_at_end() : break
 
+      self._tokens.release(self._current - 1)
       try :
-        if cls._match(TokenType.INT) :
-          stmt = cls._var_declaration()
+        if self._match(*self._specifiers) :
+          stmt = self._var_declaration()
         else : 
-          stmt = cls._statement()
+          stmt = self._statement()
       except SyntaxErr as err:
-        error_collector.add(err)
-        cls._syncronize(); continue
+        self._errors.add(err)
+        self._syncronize(); continue
       else:
         # it only appends if no errors occurred during parsing
         # it's a valid statement
         statements.append(stmt)
     
     # it will consume correspondents '}' until EOF
-    cls._expect(TokenType.RIGHT_BRACE, err_msg = "expected '}'")
+    self._expect(TokenType.RIGHT_BRACE, err_msg = "expected '}'")
 
     return Block(statements)
 
-  @classmethod
-  def _ifStmt(cls) -> Stmt:
+  def _ifStmt(self) -> Stmt:
     """
        <ifStmt> -> "if" "(" <expression> ")" <statement> ("else" <statement>)?
     """
-    cls._consume_current()
-    cls._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'if'")
-    condition = cls._expression()
-    cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after if condition")
+    self._consume_current()
+    self._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'if'")
+    condition = self._expression()
+    self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after if condition")
         
-    then_branch = cls._statement()
+    then_branch = self._statement()
     
     else_branch = None
-    if cls._match(TokenType.ELSE) :
-      cls._consume_current()
-      else_branch = cls._statement()
+    if self._match(TokenType.ELSE) :
+      self._consume_current()
+      else_branch = self._statement()
     
     return IfStmt(condition, then_branch, else_branch) 
 
-  @classmethod 
-  def _forStmt(cls) -> Stmt:
+  def _forStmt(self) -> Stmt:
     """
        <forStmt> -> "for" "(" <exprStmt> <expression>? ";" <expression>? ")" <statement>
     """
-    cls._consume_current()
-    cls._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'for'")
-    initializer = cls._exprStmt()
+    self._consume_current()
+    self._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'for'")
+    initializer = self._exprStmt()
 
-    condition = cls._expression() if not cls._match(TokenType.SEMICOLON) else None
-    cls._consume_current() # consumes ';'
+    condition = self._expression() if not self._match(TokenType.SEMICOLON) else None
+    self._consume_current() # consumes ';'
 
-    increment = cls._expression() if not cls._match(TokenType.RIGHT_PAREN) else None
-    cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
+    increment = self._expression() if not self._match(TokenType.RIGHT_PAREN) else None
+    self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
 
-    body = cls._statement()
+    body = self._statement()
  
     return ForStmt(initializer, condition, increment, body)  
 
-  @classmethod
-  def _whileStmt(cls) -> Stmt:
+  def _whileStmt(self) -> Stmt:
     """
        <whileStmt> -> "while" "(" <expression> ")" <statement>
     """
-    cls._consume_current()
-    cls._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'while'")
-    condition = cls._expression()
-    cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after condition")
+    self._consume_current()
+    self._expect(TokenType.LEFT_PAREN, err_msg = "expected '(' after 'while'")
+    condition = self._expression()
+    self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after condition")
 
-    body = cls._statement()
+    body = self._statement()
 
     # init = None, increment = None
     return ForStmt(None, condition, None, body)
 
-  @classmethod
-  def _returnStmt(cls) -> Stmt:    
+  def _returnStmt(self) -> Stmt:    
     """
        <returnStmt> -> "return" <expression>? ";"
     """
-    cls._consume_current()
-    value = cls._expression() if not cls._match(TokenType.SEMICOLON) else None
+    self._consume_current()
+    value = self._expression() if not self._match(TokenType.SEMICOLON) else None
 
-    cls._expect(TokenType.SEMICOLON, err_msg = "expected ';' after expression")
+    self._expect(TokenType.SEMICOLON, err_msg = "expected ';' after expression")
   
     return ReturnStmt(value)
 
-  @classmethod
-  def _exprStmt(cls) -> Stmt:
+  def _exprStmt(self) -> Stmt:
     """
        <exprStmt> -> <expression>? ";"
     """
-    expr = cls._expression() if not cls._match(TokenType.SEMICOLON) else None
+    expr = self._expression() if not self._match(TokenType.SEMICOLON) else None
 
-    cls._expect(TokenType.SEMICOLON, err_msg = "expected ';' after expression")
+    self._expect(TokenType.SEMICOLON, err_msg = "expected ';' after expression")
     
     return ExpressionStmt(expr) 
 
-  @classmethod
-  def _expression(cls) -> Expr:
+  def _expression(self) -> Expr:
     """
        <expression> -> <assignment>
     """
-    return cls._assignment()
+    return self._assignment()
 
-  @classmethod
-  def _assignment(cls) -> Expr:
+  def _assignment(self) -> Expr:
     """ 
        <assignment> -> <equality> ("=" <assignment>)?
     """
-    left = cls._equality()
+    left = self._equality()
 
-    if cls._match(TokenType.EQUAL) :
+    if self._match(TokenType.EQUAL) :
 
-      equals = cls._consume_current()
+      equals = self._consume_current()
 
       if not (left.is_variable or (left.is_unary and left.is_deref)) :  
         # can only cascade variables and dereferences in an assignment
         raise SyntaxErr(equals, "not an lvalue")
       else: 
-        right = cls._assignment()
-        left = AssignExpr(left, equals, right)
-        left.operand_type = cls._add_type(left)
+        right = self._assignment()
+        left = AssignExpr(left, right, Position.of(equals))
+        left.operand_type = self._add_type(left)
 
     return left
 
-  @classmethod
-  def _equality(cls) -> Expr:
+  def _equality(self) -> Expr:
     """
        <equality> -> <comparison> ("==" <comparison> | "!=" <comparison>)*
     """
-    left = cls._comparison()
+    left = self._comparison()
 
-    while cls._match(TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL) :
-      operator = cls._consume_current()
-      right = cls._comparison()
+    while self._match(TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL) :
+      operator = self._consume_current()
+      right = self._comparison()
 
-      left = BinaryExpr(left, operator, right)
-      left.operand_type = cls._add_type(left)
+      left = BinaryExpr(left, self._operators[operator.kind], right, Position.of(operator))
+      left.operand_type = self._add_type(left)
 
     return left
   
-  @classmethod
-  def _comparison(cls) -> Expr:
+  def _comparison(self) -> Expr:
     """
        <comparison> -> <addition> ("<" <addition> | "<=" <addition> | ">" <addition> | ">=" <addition>)*
     """
-    left = cls._addition()
+    left = self._addition()
 
-    while cls._match(TokenType.LESS, TokenType.LESS_EQUAL, 
+    while self._match(TokenType.LESS, TokenType.LESS_EQUAL, 
                      TokenType.GREATER, TokenType.GREATER_EQUAL) :
       
-      operator = cls._consume_current()
+      operator = self._consume_current()
 
-      right = cls._addition()
+      right = self._addition()
 
       if operator.kind in {TokenType.GREATER, TokenType.GREATER_EQUAL} :
         # don't need to support > and >= Assembly instructions, so A >= B will be translated to B <= A
-        left = BinaryExpr(right, operator, left)  
+        left = BinaryExpr(right, self._operators[operator.kind], left, Position.of(operator))
       else:
-        left = BinaryExpr(left, operator, right)
+        left = BinaryExpr(left, self._operators[operator.kind], right, Position.of(operator))
 
-      left.operand_type = cls._add_type(left)
+      left.operand_type = self._add_type(left)
 
     return left
 
-  @classmethod
-  def _new_add(cls, left : Expr, operator : Token, right : Expr) -> Expr:
+  def _new_add(self, left : Expr, pos : Position, right : Expr) -> Expr:
 
-    left.operand_type  = cls._add_type(left)
-    right.operand_type = cls._add_type(right)
+    left.operand_type  = self._add_type(left)
+    right.operand_type = self._add_type(right)
 
     # num + num
     if left.operand_type.is_integer and right.operand_type.is_integer:
-      left = BinaryExpr(left, operator, right)
+      left = BinaryExpr(left, Operator.ADD, right, pos)
     
     else:
       # parse pointer arithmetic
 
       # ptr + ptr, not defined behaviour
       if left.operand_type.is_pointer and right.operand_type.is_pointer:
-        raise SyntaxErr(operator, "invalid operands")
+        raise SyntaxErr(pos, "invalid operands")
 
       if left.operand_type.is_integer and right.operand_type.is_pointer:
         # convert 'num + ptr' to 'ptr + num'
         left, right = right, left
 
       # convert 'ptr + num' to 'ptr + (num * sizeof(basetype))'
-      mul_op = copy(operator); mul_op.kind = TokenType.STAR
-      right = BinaryExpr(right, mul_op, LiteralExpr(left.operand_type.base.size))
-      left = BinaryExpr(left, operator, right)
+      right = BinaryExpr(right, Operator.MUL, LiteralExpr(left.operand_type.base.size), pos)
+      left = BinaryExpr(left, Operator.ADD, right, pos)
 
-    left.operand_type = cls._add_type(left)
+    left.operand_type = self._add_type(left)
     return left
 
-  @classmethod
-  def _new_sub(cls, left : Expr, operator : Token, right : Expr) -> Expr:
+  def _new_sub(self, left : Expr, pos : Position, right : Expr) -> Expr:
 
-    left.operand_type  = cls._add_type(left)
-    right.operand_type = cls._add_type(right)
+    left.operand_type  = self._add_type(left)
+    right.operand_type = self._add_type(right)
 
     # num - num
     if left.operand_type.is_integer and right.operand_type.is_integer:
-      left = BinaryExpr(left, operator, right)
+      left = BinaryExpr(left, Operator.SUB, right, pos)
 
     else:
       # ptr - num
       if left.operand_type.is_pointer and right.operand_type.is_integer:
-        mul_op = copy(operator); mul_op.kind = TokenType.STAR
-        right = BinaryExpr(right, mul_op, LiteralExpr(left.operand_type.base.size))
-        left = BinaryExpr(left, operator, right)
+        right = BinaryExpr(right, Operator.MUL, LiteralExpr(left.operand_type.base.size), pos)
+        left = BinaryExpr(left, Operator.SUB, right, pos)
         
       # ptr - ptr, how many elements are between the two  
       elif left.operand_type.is_pointer and right.operand_type.is_pointer:
-        left = BinaryExpr(left, operator, right)
-        left.operand_type = ty_int
-        div_op = copy(operator); div_op.kind = TokenType.SLASH
-        left = BinaryExpr(left, div_op, LiteralExpr(left.operand_type.size))
+        size = left.operand_type.base.size
+        left = BinaryExpr(left, Operator.SUB, right, pos)
+        left.operand_type = ty_long
+        left = BinaryExpr(left, Operator.DIV, LiteralExpr(size), pos)
 
       else:
-        raise SyntaxErr(operator, "invalid operands")
+        raise SyntaxErr(pos, "invalid operands")
 
-    left.operand_type = cls._add_type(left)
+    left.operand_type = self._add_type(left)
     return left
 
-  @classmethod
-  def _addition(cls) -> Expr:
+  def _addition(self) -> Expr:
     """
        <addition> -> <multiplication> ("+" <multiplication> | "-" <multiplication>)*
     """
-    left = cls._multiplication()
+    left = self._multiplication()
     
-    while cls._match(TokenType.PLUS, TokenType.MINUS) :
-      operator = cls._consume_current()
-      right = cls._multiplication()
+    while self._match(TokenType.PLUS, TokenType.MINUS) :
+      operator = self._consume_current()
+      right = self._multiplication()
 
       try:
         if operator.kind == TokenType.PLUS :
-          left = cls._new_add(left, operator, right)  
+          left = self._new_add(left, Position.of(operator), right)
         else:
-          left = cls._new_sub(left, operator, right)
+          left = self._new_sub(left, Position.of(operator), right)
 
       except SyntaxErr as err: raise
       
     return left
 
-  @classmethod
-  def _multiplication(cls) -> Expr:
+  def _multiplication(self) -> Expr:
     """
        <multiplication> -> <unary> ("*" <unary> | "/" <unary>)*
     """
-    left = cls._unary()
+    left = self._unary()
         
-    while cls._match(TokenType.SLASH, TokenType.STAR) :
-      operator = cls._consume_current()
-      right = cls._unary()
+    while self._match(TokenType.SLASH, TokenType.STAR) :
+      operator = self._consume_current()
+      right = self._unary()
      
-      left = BinaryExpr(left, operator, right)
-      left.operand_type = cls._add_type(left)
+      left = BinaryExpr(left, self._operators[operator.kind], right, Position.of(operator))
+      left.operand_type = self._add_type(left)
 
     return left
 
-  @classmethod
-  def _unary(cls) -> Expr :
+  def _unary(self) -> Expr :
     """
        <unary> -> ("+" | "-" | "&" | "*") <unary> | <postfix>
     """
-    if cls._match(TokenType.PLUS) : # ignores it
-      cls._consume_current()
-      return cls._unary()
+    if self._match(TokenType.PLUS) : # ignores it
+      self._consume_current()
+      return self._unary()
 
-    elif cls._match(TokenType.MINUS, TokenType.AMPERSAND, TokenType.STAR) :
-      operator = cls._consume_current()
-      left = cls._unary()
-      left = UnaryExpr(left, operator)
-      left.operand_type = cls._add_type(left)
+    elif self._match(TokenType.MINUS, TokenType.AMPERSAND, TokenType.STAR) :
+      operator = self._consume_current()
+      left = self._unary()
+      left = UnaryExpr(left, self._unary_operators[operator.kind], Position.of(operator))
+      left.operand_type = self._add_type(left)
       return left
 
-    return cls._postfix()
+    return self._postfix()
 
-  @classmethod
-  def _postfix(cls) -> Expr:
+  def _postfix(self) -> Expr:
     """
        <postfix> -> <primary> ("[" <expression> "]")*
     """
-    left = cls._primary()
+    left = self._primary()
 
-    while cls._match(TokenType.LEFT_BRACKET) :
-      operator = cls._consume_current() # consumes '['
-      operator.kind = TokenType.STAR # dereference operator
+    while self._match(TokenType.LEFT_BRACKET) :
+      pos = Position.of(self._consume_current()) # consumes '['
       
-      idx = cls._expression()
+      idx = self._expression()
       
-      cls._expect(TokenType.RIGHT_BRACKET, err_msg = "expected ']'")
+      self._expect(TokenType.RIGHT_BRACKET, err_msg = "expected ']'")
       
       # x[y] is short for *(x+y) or *(&x + sizeof(basetype) * y)
-      add_op = copy(operator); add_op.kind = TokenType.PLUS
-      left = cls._new_add(left, add_op, idx)
-      left = UnaryExpr(left, operator)
-      left.operand_type = cls._add_type(left)
+      left = self._new_add(left, pos, idx)
+      left = UnaryExpr(left, Operator.DEREF, pos)
+      left.operand_type = self._add_type(left)
 
     return left
 
-  @classmethod
-  def _resolve_function(cls, fname : Token) -> Fn:
+  def _resolve_function(self, fname : Token) -> Fn:
     
-    for fn in cls._globals :
-      if not fn.is_function : continue
-      if fn.name == fname.lexeme : return fn  
+    fn = self._symbols.find_function(fname.lexeme)
+    if fn is not None : return fn
 
     # warning: function undeclared
     raise SyntaxErr(fname, "implicit declaration of function '%s'" %(fname.lexeme), True)
 
-  @classmethod
-  def _funcall(cls, fname : Token) -> Expr:
+  def _funcall(self, fname : Token) -> Expr:
     """
        <funcall> -> IDENTIFIER "(" ( <assignment> ("," <assignment>)*)? ")"
     """
-    cls._consume_current() # consumes '('
+    self._consume_current() # consumes '('
 
     arg_list = []
 
-    while not cls._match(TokenType.RIGHT_PAREN) :
+    while not self._match(TokenType.RIGHT_PAREN) :
       try: # parse args
-        arg = cls._assignment()
+        arg = self._assignment()
 
       except SyntaxErr: raise
       else:
-        arg.operand_type = cls._add_type(arg)
+        arg.operand_type = self._add_type(arg)
         arg_list.append(arg) # if no errors
 
-      if not cls._match(TokenType.COMMA) : break 
+      if not self._match(TokenType.COMMA) : break 
         
-      cls._consume_current() # consumes ',' 
+      self._consume_current() # consumes ',' 
 
-    cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
+    self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')'")
 
     try:
-      fn = cls._resolve_function(fname)
+      fn = self._resolve_function(fname)
     except SyntaxErr as err:
-      error_collector.add(err) # non-critical
+      self._errors.add(err) # non-critical
       # if function not defined, don't try to evaluate arg_list
-      return FunCallExpr(fname.lexeme, arg_list)
+      call = FunCallExpr(fname.lexeme, arg_list)
+      call.operand_type = ty_int # as if declared int fname()
+      return call
     else:  
       i = 0 # iterate over the arguments list and check for type mismatches
       while i < min(len(arg_list), fn.arity) :
-        try: # report all type mismatches
-          if arg_list[i].operand_type != fn.params[i].data_type :
+        try: # report all type mismatches, integers are converted to the type of the parameter
+          arg_type, param_type = arg_list[i].operand_type, fn.params[i].data_type
+          if arg_type != param_type and not (arg_type.is_integer and param_type.is_integer) :
             raise SyntaxErr(fname, "expected '%s' but argument %d is of type '%s'"
                           %(str(fn.params[i].data_type), i+1, str(arg_list[i].operand_type)))
         except SyntaxErr as err :
-          error_collector.add(err) # non-critical ?
+          self._errors.add(err) # non-critical ?
         finally: i += 1
 
       try:
@@ -600,109 +688,97 @@ class Parser :
 
       except SyntaxErr : raise
 
-      else : return FunCallExpr(fname.lexeme, arg_list)
+      else :
+        call = FunCallExpr(fname.lexeme, arg_list)
+        call.operand_type = fn.data_type.ret_type
+        return call
 
-  @classmethod
-  def _find_var(cls, obj_name : Token) :
+  def _find_var(self, obj_name : Token) :
     
     var_name = obj_name.lexeme
 
-    if var_name in cls._locals : # try to find as a local variable
-      return cls._locals[var_name]
-    else:
-      for obj in cls._globals : # try to find as a global variable
-        if not obj.is_function and obj.name == var_name : 
-          return obj
-      
-      raise SyntaxErr(obj_name, "%s undeclared" %(var_name)) 
+    # the innermost local variable, or else a global one
+    var_desc = self._symbols.find_var(var_name)
+    if var_desc is not None : return var_desc
 
-  @classmethod
-  def _primary(cls) -> Expr:
+    raise SyntaxErr(obj_name, "%s undeclared" %(var_name)) 
+
+  def _primary(self) -> Expr:
     """
        <primary> -> NUMBER | IDENTIFIER | <funcall> | "sizeof" <unary> | "(" <expression> ")"
     """
-    if cls._match(TokenType.NUM) :
-      curr_token = cls._consume_current()
+    if self._match(TokenType.NUM) :
+      curr_token = self._consume_current()
       return LiteralExpr(curr_token.literal)
 
-    elif cls._match(TokenType.IDENTIFIER) :
+    elif self._match(TokenType.IDENTIFIER) :
 
-      obj_name = cls._consume_current()
+      obj_name = self._consume_current()
 
-      if cls._match(TokenType.LEFT_PAREN) :
-        return cls._funcall(obj_name)
+      if self._match(TokenType.LEFT_PAREN) :
+        return self._funcall(obj_name)
 
       else :
         # variable
-        var_desc = cls._find_var(obj_name)
+        var_desc = self._find_var(obj_name)
         left = VariableExpr(var_desc)
         left.operand_type = var_desc.data_type
         return left
 
-    elif cls._match(TokenType.SIZEOF) :
-      cls._consume_current()
-      expr = cls._unary() # parse and add type to operand
+    elif self._match(TokenType.SIZEOF) :
+      self._consume_current()
+      expr = self._unary() # parse and add type to operand
       return LiteralExpr(expr.operand_type.size)
 
-    elif cls._match(TokenType.LEFT_PAREN) :
+    elif self._match(TokenType.LEFT_PAREN) :
       # grouping expression
-      cls._consume_current()
-      left = cls._expression()
-      cls._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after expression")
+      self._consume_current()
+      left = self._expression()
+      self._expect(TokenType.RIGHT_PAREN, err_msg = "expected ')' after expression")
       
       return left
 
     else :
-      raise SyntaxErr(cls._peek(), "invalid expression")
+      raise SyntaxErr(self._peek(), "invalid expression")
 
-  @classmethod
-  def _peek(cls) -> Token:
-    return cls._tokens[cls._current]
+  def _peek(self) -> Token:
+    return self._tokens[self._current]
 
-  @classmethod
   def _previous(self) -> Token :
     #returns the last consumed Token from _tokens
     return self._tokens[self._current - 1]
 
-  @classmethod 
-  def _is_at_end(cls) -> bool:
-    if cls._current >= len(cls._tokens) : return True
-    else : return cls._peek().kind == TokenType.EOF
+  def _is_at_end(self) -> bool:
+    # past the end, the tokens keep answering with EOF
+    return self._tokens.kind(self._current) == TokenType.EOF
 
-  @classmethod
-  def _match(cls, *args : tuple) -> bool:
-    if cls._is_at_end() : 
+  def _match(self, *args : tuple) -> bool:
+    if self._is_at_end() : 
       return False
     else : 
-      for token_kind in args :
-        if cls._peek().kind == token_kind:
-          return True
-      return False
+      return self._tokens.kind(self._current) in args
 
-  @classmethod
-  def _consume_current(cls) -> Token:
-    cls._current += 1
-    return cls._previous()
+  def _consume_current(self) -> Token:
+    self._current += 1
+    return self._previous()
 
-  @classmethod
-  def _expect(cls, expected : TokenType, err_msg : str) -> Token:
+  def _expect(self, expected : TokenType, err_msg : str) -> Token:
 
-    if cls._is_at_end() :
-      raise SyntaxErr(cls._previous(), err_msg + " at end of input")
-    elif cls._peek().kind == expected:
-      return cls._consume_current()
+    if self._is_at_end() :
+      raise SyntaxErr(self._previous(), err_msg + " at end of input")
+    elif self._peek().kind == expected:
+      return self._consume_current()
     else:
-      raise SyntaxErr(cls._peek(), err_msg)
+      raise SyntaxErr(self._peek(), err_msg)
     
-  @classmethod
-  def _syncronize(cls, e_brace : int = 0) -> None :
+  def _syncronize(self, e_brace : int = 0) -> None :
     # enter in panic mode
     # discard tokens until a valid statement or expression is found
 
     if e_brace : # panicked at function definition
       
-      while not cls._is_at_end() :
-        tk = cls._consume_current()
+      while not self._is_at_end() :
+        tk = self._consume_current()
 
         if tk.kind == TokenType.RIGHT_BRACE :
           if e_brace == 1 : break
@@ -713,22 +789,21 @@ class Parser :
 
     else : # panicked inside some function
 
-      while not cls._is_at_end() :
-        if cls._previous().kind in {
+      while not self._is_at_end() :
+        if self._previous().kind in {
           TokenType.SEMICOLON, 
           TokenType.RIGHT_BRACE
         } : return # end of a statement
 
-        elif cls._peek().kind in {
-          TokenType.IF, TokenType.INT,
+        elif self._peek().kind in {
+          TokenType.IF, TokenType.CHAR, TokenType.SHORT, TokenType.INT, TokenType.LONG,
           TokenType.FOR, TokenType.LEFT_BRACE,
           TokenType.RETURN, TokenType.WHILE
         } : return # beginning of a statement
         
-        else : cls._current += 1
+        else : self._current += 1
 
-  @classmethod
-  def _add_type(cls, node : Expr) -> DataType:
+  def _add_type(self, node : Expr) -> DataType:
 
     if node.operand_type is not None:
       return node.operand_type
@@ -736,20 +811,28 @@ class Parser :
     elif node.is_variable:
       return node.operand_type
 
-    elif node.is_literal or (node.is_binary and node.is_relational) or node.is_funcall:
+    elif node.is_literal :
+      # int, unless the value needs more bits
+      return ty_int if -(1 << 31) <= node.value < (1 << 31) else ty_long
+
+    elif (node.is_binary and node.is_relational) or node.is_funcall:
       return ty_int
 
-    elif (node.is_unary and node.is_neg) or (node.is_binary and node.is_arithmetic):
-      return cls._add_type(node.lhs)
+    elif node.is_unary and node.is_neg :
+      return self._arith_type(self._add_type(node.lhs), ty_int)
+
+    elif node.is_binary and node.is_arithmetic :
+      lhs, rhs = self._add_type(node.lhs), self._add_type(node.rhs)
+      return lhs if lhs.is_pointer else self._arith_type(lhs, rhs)
 
     elif node.is_assignment:
-      operand_type = cls._add_type(node.lhs)
+      operand_type = self._add_type(node.lhs)
       if operand_type.is_array :
-        raise SyntaxErr(node.equals, "not an lvalue")
+        raise SyntaxErr(node.pos, "not an lvalue")
       return operand_type
 
     elif (node.is_unary and node.is_addressing):
-      operand_type = cls._add_type(node.lhs)
+      operand_type = self._add_type(node.lhs)
       if operand_type.is_array :
         # array of something -> pointer to something
         return Pointer_to(operand_type.base)
@@ -757,11 +840,15 @@ class Parser :
         return Pointer_to(operand_type)
 
     elif node.is_deref:
-      operand_type = cls._add_type(node.lhs)
+      operand_type = self._add_type(node.lhs)
 
       if not operand_type.is_pointer:
-        raise SyntaxErr(node.op, "invalid pointer dereference")
+        raise SyntaxErr(node.pos, "invalid pointer dereference")
 
       return operand_type.base
-      
 
+  @staticmethod
+  def _arith_type(lhs : DataType, rhs : DataType) -> DataType:
+    # the integers narrower than int are promoted to int, and the result is
+    # as wide as the widest operand
+    return ty_long if ty_long in (lhs, rhs) else ty_int
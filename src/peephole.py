@@ -0,0 +1,129 @@
+
+from .instr import *
+
+__all__ = ["PeepholeOptimizer"]
+
+# a rule looks at the instructions starting at code[i], and returns how many
+# of them it matched along with their replacement, or None if it doesn't apply
+
+def _at(code : list, i : int) -> Instr:
+  return code[i] if i < len(code) else None
+
+def _is_memory(operand : str) -> bool:
+  return "(" in operand
+
+def _kills_rax(instr : Instr) -> bool:
+  # if instr overwrites %rax without reading it, so its previous value is dead
+  return instr is not None and not instr.is_label \
+     and instr.op in ("movq", "movabsq", "leaq") \
+     and instr.args[1] == "%rax" and "%rax" not in instr.args[0]
+
+def _push_pop(opt, code : list, i : int) -> tuple:
+  # pushq X; popq Y -> movq X, Y
+  push, pop = code[i], _at(code, i + 1)
+
+  if push.op == "pushq" and pop is not None and pop.op == "popq" :
+    if push.args[0] == pop.args[0] :
+      return 2, []
+    return 2, [Instr("movq", push.args[0], pop.args[0])]
+
+def _forward_rax(opt, code : list, i : int) -> tuple:
+  # movq X, %rax; movq %rax, Y (or pushq %rax) -> movq X, Y (or pushq X)
+  # when %rax is overwritten right after
+  mov, use = code[i], _at(code, i + 1)
+
+  if mov.op != "movq" or mov.args[1] != "%rax" : return None
+  if use is None or use.is_label or not _kills_rax(_at(code, i + 2)) : return None
+
+  source = mov.args[0]
+
+  if use.op == "pushq" and use.args[0] == "%rax" :
+    return 2, [Instr("pushq", source)]
+
+  elif use.op == "movq" and use.args[0] == "%rax" and "%rax" not in use.args[1] :
+    dest = use.args[1]
+    if _is_memory(source) and _is_memory(dest) : return None # no memory to memory moves
+    return 2, [Instr("movq", source, dest)]
+
+def _self_move(opt, code : list, i : int) -> tuple:
+  # movq X, X
+  mov = code[i]
+
+  if mov.op == "movq" and mov.args[0] == mov.args[1] and not _is_memory(mov.args[0]) :
+    return 1, []
+
+def _jump_next(opt, code : list, i : int) -> tuple:
+  # jmp L; L: -> L:, even if other labels are in between
+  jmp = code[i]
+
+  if jmp.op != "jmp" : return None
+
+  j = i + 1
+  while j < len(code) and code[j].is_label :
+    if code[j].name == jmp.args[0] :
+      return 1, []
+    j += 1
+
+def _call_rax(opt, code : list, i : int) -> tuple:
+  # movq $0, %rax; call f -> call f
+  # %al holds the number of vector registers of a variadic call, the functions
+  # defined in this translation unit aren't variadic, so they don't read it
+  mov, call = code[i], _at(code, i + 1)
+
+  if mov.op == "movq" and mov.args == ("$0", "%rax") and call is not None \
+     and call.op == "call" and call.args[0] in opt.functions :
+    return 2, [call]
+
+class PeepholeOptimizer :
+  # rewrites short sequences of instructions of a function into cheaper ones
+  # the rules are tried in order at every instruction, and the whole function is
+  # scanned again until no rule applies
+
+  rules = {
+    "push-pop"    : _push_pop,
+    "forward-rax" : _forward_rax,
+    "self-move"   : _self_move,
+    "jump-next"   : _jump_next,
+    "call-rax"    : _call_rax,
+  }
+
+  def __init__(self, functions : set = frozenset(), rules : dict = None) :
+    self.functions = functions # names of the functions defined in the translation unit
+    self.rules = dict(rules if rules is not None else PeepholeOptimizer.rules)
+    self.hits = dict.fromkeys(self.rules, 0) # rule name -> times it was applied
+    self.eliminated = 0                      # number of instructions removed
+
+  def optimize(self, code : list) -> list:
+
+    changed = True
+
+    while changed :
+      changed = False
+      result = []
+      i = 0
+
+      while i < len(code) :
+        if not code[i].is_label :
+          for name, rule in self.rules.items() :
+            match = rule(self, code, i)
+            if match is None : continue
+
+            matched, replacement = match
+            result.extend(replacement)
+            self.hits[name] += 1
+            self.eliminated += matched - len(replacement)
+            i += matched
+            changed = True
+            break
+
+          else :
+            result.append(code[i])
+            i += 1
+
+        else :
+          result.append(code[i])
+          i += 1
+
+      code = result
+
+    return code
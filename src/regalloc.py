@@ -0,0 +1,135 @@
+
+from .expr import *
+from .stmt import *
+
+__all__ = ["RegisterAllocator"]
+
+class RegisterAllocator :
+  # linear scan allocation of the scalar local variables of a function
+  # the body is numbered in program order, every variable lives from its first to
+  # its last reference, and a variable referenced inside a loop lives through the
+  # whole loop, since its value may be needed in the next iteration
+  # the intervals are then scanned by their start, and when there are more live
+  # variables than registers, the one whose interval ends last stays in memory
+
+  def __init__(self, registers : list) :
+    self.registers = registers
+
+  def allocate(self, fn, exclude = ()) -> dict:
+    # returns a map of LVar -> register, the other variables stay in their stack slots
+    # the variables in exclude are left out, they live somewhere else
+    self._clock = 0
+    self._intervals = dict() # LVar -> [start, end]
+    self._loops = []         # [start, end] of each loop, the inner ones first
+    self.address_taken = False
+    self.has_calls = False
+
+    for var in fn.params :
+      self._intervals[var] = [0, 0]
+
+    self._walk_stmt(fn.body)
+
+    for var in exclude :
+      del self._intervals[var]
+
+    if self.address_taken : # see Var.exposes_frame
+      return dict()
+
+    for loop_start, loop_end in self._loops :
+      for interval in self._intervals.values() :
+        if interval[0] <= loop_end and interval[1] >= loop_start :
+          interval[0] = min(interval[0], loop_start)
+          interval[1] = max(interval[1], loop_end)
+
+    return self._scan()
+
+  def _scan(self) -> dict:
+
+    assigned = dict()
+    free = list(reversed(self.registers))
+    active = [] # variables in registers, by the end of their intervals
+
+    for var, (start, end) in sorted(self._intervals.items(), key = lambda item : item[1][0]) :
+
+      # registers of the intervals that ended are free again
+      while active and self._intervals[active[0]][1] < start :
+        free.append(assigned[active.pop(0)])
+
+      if free :
+        assigned[var] = free.pop()
+        active.append(var)
+
+      elif active and self._intervals[active[-1]][1] > end :
+        # spill the one that lives longer
+        spilled = active.pop()
+        assigned[var] = assigned.pop(spilled)
+        active.append(var)
+
+      else : continue
+
+      active.sort(key = lambda v : self._intervals[v][1])
+
+    return assigned
+
+  def _walk_stmt(self, stmt : Stmt) -> None:
+
+    if stmt is None : return
+
+    if stmt.is_compound_stmt:
+      for s in stmt.body :
+        self._walk_stmt(s)
+
+    elif stmt.is_expression_stmt:
+      self._walk_expr(stmt.expression)
+
+    elif stmt.is_return_stmt:
+      self._walk_expr(stmt.ret_value)
+
+    elif stmt.is_if_stmt:
+      self._walk_expr(stmt.condition)
+      self._walk_stmt(stmt.then_branch)
+      self._walk_stmt(stmt.else_branch)
+
+    elif stmt.is_for_stmt:
+      self._walk_stmt(stmt.init)
+      start = self._tick()
+      self._walk_expr(stmt.condition)
+      self._walk_stmt(stmt.body)
+      self._walk_expr(stmt.inc)
+      self._loops.append([start, self._tick()])
+
+  def _walk_expr(self, node : Expr) -> None:
+
+    if node is None : return
+
+    if node.is_variable:
+      var = node.var_desc
+
+      if var.is_local and not var.data_type.is_array :
+        now = self._tick()
+        if var in self._intervals :
+          self._intervals[var][1] = now
+        else :
+          self._intervals[var] = [now, now]
+
+    elif node.is_binary:
+      self._walk_expr(node.lhs)
+      self._walk_expr(node.rhs)
+
+    elif node.is_unary:
+      if node.is_addressing and node.lhs.is_variable and node.lhs.var_desc.exposes_frame :
+        self.address_taken = True
+      self._walk_expr(node.lhs)
+
+    elif node.is_assignment:
+      self._walk_expr(node.lhs)
+      self._walk_expr(node.value)
+
+    elif node.is_funcall:
+      self.has_calls = True
+      for arg in node.args :
+        self._walk_expr(arg)
+
+  def _tick(self) -> int:
+    self._clock += 1
+    return self._clock
@@ -0,0 +1,146 @@
+import re
+
+from .token import *
+from .token_type import *
+from .scanner import Scanner
+from .token_buffer import TokenBuffer
+from .errors import LexErr
+
+__all__ = ["RegexScanner"]
+
+class RegexScanner(Scanner) :
+  # the same tokenizer as Scanner, but driven by a single compiled master regex
+  # instead of a few method calls per character
+
+  # every match is a token with the whitespace that precedes it
+  _master = re.compile(r"""
+    [ \t\r\n]*
+    (?:
+        ([0-9]+)                             # number
+      | ([A-Za-z_][A-Za-z0-9_]*)             # identifier or keyword
+      | ([!=<>]=|[(){}\[\];,+\-*/!=<>&])     # punctuator
+      | ([^ \t\r\n])                          # unexpected character
+    )
+  """, re.VERBOSE)
+
+  _punct_kind = {
+    '('  : TokenType.LEFT_PAREN,
+    ')'  : TokenType.RIGHT_PAREN,
+    '{'  : TokenType.LEFT_BRACE,
+    '}'  : TokenType.RIGHT_BRACE,
+    '['  : TokenType.LEFT_BRACKET,
+    ']'  : TokenType.RIGHT_BRACKET,
+    ';'  : TokenType.SEMICOLON,
+    ','  : TokenType.COMMA,
+    '-'  : TokenType.MINUS,
+    '+'  : TokenType.PLUS,
+    '*'  : TokenType.STAR,
+    '/'  : TokenType.SLASH,
+    '!'  : TokenType.BANG,
+    '!=' : TokenType.BANG_EQUAL,
+    '='  : TokenType.EQUAL,
+    '==' : TokenType.EQUAL_EQUAL,
+    '>'  : TokenType.GREATER,
+    '>=' : TokenType.GREATER_EQUAL,
+    '<'  : TokenType.LESS,
+    '<=' : TokenType.LESS_EQUAL,
+    '&'  : TokenType.AMPERSAND,
+  }
+
+  def scan(self, source : str) :
+
+    if not source.isascii() :
+      # digits and identifiers follow str.isdigit/str.isalnum, that accept
+      # unicode characters the regex can't express, so use the classic scanner
+      yield from super().scan(source)
+      return
+
+    keywords = self._keywords
+    punct_kind = self._punct_kind
+
+    for group, start, end, line, line_start in self._matches(source) :
+      lexeme = source[start:end]
+
+      if group == 3 :
+        yield Token(punct_kind[lexeme], lexeme, None, line, start - line_start)
+
+      elif group == 2 :
+        if lexeme in keywords :
+          yield Token(keywords[lexeme], lexeme, None, line, start - line_start)
+        else :
+          yield Token(TokenType.IDENTIFIER, lexeme, lexeme, line, start - line_start)
+
+      elif group == 1 :
+        yield Token(TokenType.NUM, lexeme, int(lexeme), line, start - line_start)
+
+      else :
+        yield Token(TokenType.EOF, lexeme, None, line, start - line_start)
+
+  def tokenize(self, source : str) -> TokenBuffer:
+    # stores the tokens compactly, without creating a Token object for each one
+
+    if not source.isascii() :
+      return super().tokenize(source)
+
+    keywords = self._keywords
+    punct_kind = self._punct_kind
+
+    buffer = TokenBuffer(source)
+    kinds, starts, lengths, rows = buffer.kinds, buffer.starts, buffer.lengths, buffer.rows
+
+    for group, start, end, line, line_start in self._matches(source) :
+
+      if group == 3 :
+        kinds.append(punct_kind[source[start:end]])
+      elif group == 2 :
+        kinds.append(keywords.get(source[start:end], TokenType.IDENTIFIER))
+      elif group == 1 :
+        kinds.append(TokenType.NUM)
+      else :
+        kinds.append(TokenType.EOF)
+
+      starts.append(start)
+      lengths.append(end - start)
+      rows.append(line)
+
+    return buffer
+
+  def _matches(self, source : str) :
+    # generates (group, start, end, line, line_start) for each token, group being
+    # 1: number, 2: identifier, 3: punctuator or 0: EOF
+    # unexpected characters are reported as they are found
+
+    line = 1
+    line_start = 0 # offset of the first character of the current line
+
+    end = 0 # end of the last match
+
+    for m in self._master.finditer(source) :
+      group = m.lastindex # 1: number, 2: identifier, 3: punctuator, 4: unexpected
+      start = m.start(group)
+
+      if start != end : # skipped whitespace
+        newlines = source.count('\n', end, start)
+        if newlines :
+          line += newlines
+          line_start = source.rindex('\n', end, start) + 1
+
+      end = m.end()
+
+      if group != 4 :
+        yield group, start, end, line, line_start
+      else :
+        self._errors.add(LexErr(f"unexpected character '{source[start]}'", line, start - line_start))
+
+    if end != len(source) :
+      # only whitespace is left, the classic scanner emits an EOF token for it
+      # with the lexeme starting at the last token (or at 0 if there's none)
+      last = start if end else 0
+      newlines = source.count('\n', end)
+      if newlines :
+        line += newlines
+        line_start = source.rindex('\n', end) + 1
+
+      yield 0, last, len(source), line, line_start
+
+    yield 0, len(source), len(source), line, line_start
@@ -1,6 +1,6 @@
 from .token import *
 from .token_type import *
-from .errors import LexErr, error_collector
+from .errors import LexErr, ErrorCollector
 
 __all__ = ["Scanner"]
 
@@ -14,145 +14,146 @@ class Scanner(object) :
     "for"    : TokenType.FOR,
     "sizeof" : TokenType.SIZEOF,
     "return" : TokenType.RETURN,
+    "char"   : TokenType.CHAR,
+    "short"  : TokenType.SHORT,
     "int"    : TokenType.INT,
+    "long"   : TokenType.LONG,
   }
 
   # punctuators characters
   _punct = {
-    '('  : (lambda : Scanner._make_token(TokenType.LEFT_PAREN)),
-    ')'  : (lambda : Scanner._make_token(TokenType.RIGHT_PAREN)),
-    '{'  : (lambda : Scanner._make_token(TokenType.LEFT_BRACE)),
-    '}'  : (lambda : Scanner._make_token(TokenType.RIGHT_BRACE)),
-    '['  : (lambda : Scanner._make_token(TokenType.LEFT_BRACKET)),
-    ']'  : (lambda : Scanner._make_token(TokenType.RIGHT_BRACKET)),
-    ';'  : (lambda : Scanner._make_token(TokenType.SEMICOLON)),
-    ','  : (lambda : Scanner._make_token(TokenType.COMMA)),
-    '-'  : (lambda : Scanner._make_token(TokenType.MINUS)),
-    '+'  : (lambda : Scanner._make_token(TokenType.PLUS)),
-    '*'  : (lambda : Scanner._make_token(TokenType.STAR)),
-    '/'  : (lambda : Scanner._make_token(TokenType.SLASH)),
-    '!'  : (lambda : Scanner._make_token(TokenType.BANG_EQUAL if Scanner._match("=") else TokenType.BANG)),
-    '='  : (lambda : Scanner._make_token(TokenType.EQUAL_EQUAL if Scanner._match('=') else TokenType.EQUAL)),
-    '>'  : (lambda : Scanner._make_token(TokenType.GREATER_EQUAL if Scanner._match('=') else TokenType.GREATER)),
-    '<'  : (lambda : Scanner._make_token(TokenType.LESS_EQUAL if Scanner._match('=') else TokenType.LESS)),
-    '&'  : (lambda : Scanner._make_token(TokenType.AMPERSAND)),
+    '('  : (lambda s : s._make_token(TokenType.LEFT_PAREN)),
+    ')'  : (lambda s : s._make_token(TokenType.RIGHT_PAREN)),
+    '{'  : (lambda s : s._make_token(TokenType.LEFT_BRACE)),
+    '}'  : (lambda s : s._make_token(TokenType.RIGHT_BRACE)),
+    '['  : (lambda s : s._make_token(TokenType.LEFT_BRACKET)),
+    ']'  : (lambda s : s._make_token(TokenType.RIGHT_BRACKET)),
+    ';'  : (lambda s : s._make_token(TokenType.SEMICOLON)),
+    ','  : (lambda s : s._make_token(TokenType.COMMA)),
+    '-'  : (lambda s : s._make_token(TokenType.MINUS)),
+    '+'  : (lambda s : s._make_token(TokenType.PLUS)),
+    '*'  : (lambda s : s._make_token(TokenType.STAR)),
+    '/'  : (lambda s : s._make_token(TokenType.SLASH)),
+    '!'  : (lambda s : s._make_token(TokenType.BANG_EQUAL if s._match("=") else TokenType.BANG)),
+    '='  : (lambda s : s._make_token(TokenType.EQUAL_EQUAL if s._match('=') else TokenType.EQUAL)),
+    '>'  : (lambda s : s._make_token(TokenType.GREATER_EQUAL if s._match('=') else TokenType.GREATER)),
+    '<'  : (lambda s : s._make_token(TokenType.LESS_EQUAL if s._match('=') else TokenType.LESS)),
+    '&'  : (lambda s : s._make_token(TokenType.AMPERSAND)),
   }
 
-  @classmethod
-  def tokenize(cls, source : str) -> list:	
-    
-    cls._source = source  # character buffer to be tokenized
-    cls._start = 0        # works as a pointer to the beginning of a token 
-    cls._current = 0      # works as a pointer to the end of a token              
-    cls._line = 1
+  def __init__(self, errors : ErrorCollector) :
+    self._errors = errors # lexical errors are reported here
+
+  def tokenize(self, source : str) -> list:	
+    return list(self.scan(source))
 
-    tk_list = []
+  def scan(self, source : str) :
+    # generates the tokens on demand, the last one is always EOF
+    
+    self._source = source  # character buffer to be tokenized
+    self._start = 0        # works as a pointer to the beginning of a token 
+    self._current = 0      # works as a pointer to the end of a token              
+    self._line = 1
+    self._line_start = 0   # offset of the first character of the current line
     	
-    while not cls._eof() :                
+    while not self._eof() :                
       try :			
-        token = cls._scan_token()
+        token = self._scan_token()
       except LexErr as err :
-        error_collector.add(err)	
+        self._errors.add(err)	
       else :
-        tk_list.append(token)
+        yield token
     
-    cls._start = cls._current     
-    tk_list.append(cls._make_token(TokenType.EOF))
-        
-    return tk_list  
+    self._start = self._current     
+    yield self._make_token(TokenType.EOF)
       
-  @classmethod
-  def _scan_token(cls) -> Token:
-    cls._skipws()
+  def _scan_token(self) -> Token:
+    self._skipws()
     
-    if cls._eof() : 
-      return cls._make_token(TokenType.EOF)
+    if self._eof() : 
+      return self._make_token(TokenType.EOF)
 
-    cls._start = cls._current
+    self._start = self._current
         
-    c = cls._advance()
+    c = self._advance()
     
-    if c in cls._punct :
-      return cls._punct[c]()
+    if c in self._punct :
+      return self._punct[c](self)
         
     elif str.isdigit(c) : 
-      return cls._number()
+      return self._number()
 
-    elif cls._is_ident(c):
-      return cls._identifier() 
+    elif self._is_ident(c):
+      return self._identifier() 
     
     else : 
-      raise LexErr(f"unexpected character '{c}'", cls._line, cls._current - 1)
+      raise LexErr(f"unexpected character '{c}'", self._line, self._current - 1 - self._line_start)
             
-  @classmethod
-  def _make_token(cls, kind : TokenType, literal : object = None) -> Token :
+  def _make_token(self, kind : TokenType, literal : object = None) -> Token :
     # creates a token, with lexeme at _source from _start until _current - 1
 
-    lexeme = cls._source[cls._start : cls._current]
-    return Token(kind, lexeme, literal, cls._line, cls._start)
+    lexeme = self._source[self._start : self._current]
+    return Token(kind, lexeme, literal, self._line, self._start - self._line_start)
   
-  @classmethod          
-  def _number(cls) -> Token :
+  def _number(self) -> Token :
 
-    while str.isdigit(cls._peek()) :
-      cls._current += 1
+    while str.isdigit(self._peek()) :
+      self._current += 1
       	
-    return cls._make_token(TokenType.NUM, int(cls._source[cls._start : cls._current]))
+    return self._make_token(TokenType.NUM, int(self._source[self._start : self._current]))
 
   @staticmethod
   def _is_ident(c : str) -> bool:
 
     return str.isalnum(c) or c == '_'  
 
-  @classmethod
-  def _identifier(cls) -> Token :
+  def _identifier(self) -> Token :
 
-    while cls._is_ident(cls._peek()) :
-      cls._current += 1
+    while self._is_ident(self._peek()) :
+      self._current += 1
 
-    lexeme = cls._source[cls._start : cls._current]
+    lexeme = self._source[self._start : self._current]
 
-    if lexeme not in cls._keywords : 
-      return cls._make_token(TokenType.IDENTIFIER, lexeme)
+    if lexeme not in self._keywords : 
+      return self._make_token(TokenType.IDENTIFIER, lexeme)
     else :
-      return cls._make_token(cls._keywords[lexeme])    
+      return self._make_token(self._keywords[lexeme])    
 
-  @classmethod
-  def _eof(cls) -> bool :
+  def _eof(self) -> bool :
     # checks if there is any character still to be processed from the buffer
-    return cls._current >= len(cls._source)
+    return self._current >= len(self._source)
 
-  @classmethod
-  def _match(cls, expected : str) -> bool :
+  def _match(self, expected : str) -> bool :
 
-    if cls._peek() != expected : return False
+    if self._peek() != expected : return False
 
-    cls._current += 1
+    self._current += 1
     return True
   
-  @classmethod
-  def _advance(cls, offset : int = 1) -> str :    
+  def _advance(self, offset : int = 1) -> str :    
     
-    if cls._eof() : return ''
+    if self._eof() : return ''
         
-    cls._current += offset
-    return cls._source[cls._current - offset]
+    self._current += offset
+    return self._source[self._current - offset]
     
-  @classmethod
-  def _peek(cls) -> str:
+  def _peek(self) -> str:
     # get the current character in the buffer
-    if cls._eof() : return '\0'
+    if self._eof() : return '\0'
     
-    return cls._source[cls._current]
+    return self._source[self._current]
 
-  @classmethod        
-  def _skipws(cls) -> None :
+  def _skipws(self) -> None :
     	
-    while not cls._eof() :
-      c = cls._peek()
+    while not self._eof() :
+      c = self._peek()
             
       if c not in {' ', '\n', '\r', '\t'} : 
         break
         		
-      cls._current += 1
+      self._current += 1
+
+      if c == '\n' :
+        self._line += 1
+        self._line_start = self._current
 
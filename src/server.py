@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import asyncio
+from functools import partial
+
+from .compiler import Options, compile
+from .cache import CompileCache
+
+__all__ = ["serve"]
+
+# protocol: one JSON object per line in both directions
+#   request  -> {"id": <any>, "source": <str>, "filename": <str, optional>,
+#                "options": <object, optional>}
+#   response -> {"id": <same id>, "ok": <bool>, "asm": <str or null>, "ir": <str or null>,
+#                "diagnostics": [...], "messages": <str>, "lines": <int>, "bytes": <int>}
+# options takes any of "scanner", "stream_tokens", "opt_level", "flags" ({pass
+# name: bool}), "inline_threshold" and "emit_ir", as the arguments of Options
+# a malformed request is answered with {"id": ..., "ok": false, "error": <str>}
+# settings are the keyword arguments of the Options of every compilation, besides
+# the filename (e.g. the compile cache)
+
+# the checks of the values of each field of options
+_option_checks = {
+  "scanner"          : lambda value : isinstance(value, str) and value in Options.scanners,
+  "stream_tokens"    : lambda value : isinstance(value, bool),
+  "opt_level"        : lambda value : type(value) is int and value in Options.levels,
+  "flags"            : lambda value : isinstance(value, dict) and
+                                      all(name in Options.passes and isinstance(enabled, bool)
+                                          for name, enabled in value.items()),
+  "inline_threshold" : lambda value : type(value) is int and value >= 0,
+  "emit_ir"          : lambda value : isinstance(value, bool),
+}
+
+def _options(filename : str, fields : dict, settings : dict) -> Options:
+  # the Options of a request, it raises ValueError if a field is unknown or invalid
+  if not isinstance(fields, dict) :
+    raise ValueError("'options' must be an object")
+
+  for name, value in fields.items() :
+    if name not in _option_checks :
+      raise ValueError("unknown option '%s'" %(name))
+    if not _option_checks[name](value) :
+      raise ValueError("invalid value of option '%s': %s" %(name, json.dumps(value)))
+
+  return Options(filename, **fields, **settings)
+
+async def _handle_request(line : bytes, settings : dict) -> bytes:
+
+  req_id = None
+
+  try :
+    request = json.loads(line)
+    req_id = request.get("id")
+    source = request["source"]
+    filename = request.get("filename")
+
+    if not isinstance(source, str) :
+      raise ValueError("'source' must be a string")
+    if filename is not None and not isinstance(filename, str) :
+      raise ValueError("'filename' must be a string")
+
+    options = _options(filename, request.get("options", {}), settings)
+
+  except (ValueError, KeyError, AttributeError) as err :
+    response = {"id" : req_id, "ok" : False, "error" : "bad request: %s" %(err)}
+
+  else :
+    # every compilation owns its own state, so requests from concurrent clients
+    # are compiled in the default thread pool, without blocking the event loop
+    loop = asyncio.get_running_loop()
+
+    try :
+      result = await loop.run_in_executor(None, compile, source, options)
+    except Exception as err : # the server keeps serving the other requests
+      response = {"id" : req_id, "ok" : False, "error" : "internal error: %s: %s" %(type(err).__name__, err)}
+    else :
+      response = result.to_dict()
+      response["id"] = req_id
+
+  return json.dumps(response).encode() + b"\n"
+
+async def _serve_connection(settings : dict, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) :
+
+  try :
+    while True :
+      line = await reader.readline()
+      if not line : break
+      if not line.strip() : continue
+
+      writer.write(await _handle_request(line, settings))
+      await writer.drain()
+
+  except ConnectionError : pass
+
+  finally :
+    writer.close()
+
+async def _serve_unix(path : str, settings : dict) :
+
+  if os.path.exists(path) :
+    os.unlink(path) # stale socket from a previous server
+
+  # requests can be as large as the sources, so don't limit the line length
+  server = await asyncio.start_unix_server(partial(_serve_connection, settings), path, limit=1 << 30)
+
+  try :
+    async with server :
+      await server.serve_forever()
+  finally :
+    if os.path.exists(path) : os.unlink(path)
+
+async def _serve_stdio(settings : dict) :
+
+  loop = asyncio.get_running_loop()
+
+  reader = asyncio.StreamReader(limit=1 << 30)
+  await loop.connect_read_pipe(lambda : asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+  transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+  writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+
+  await _serve_connection(settings, reader, writer)
+
+def serve(address : str, cache_dir : str = None, cache_size : int = CompileCache.default_size) -> None:
+  # listens on the unix domain socket at address, or on stdin/stdout if address is '-'
+  # the compilations share the compile cache at cache_dir, if given
+  settings = {"cache_dir" : cache_dir, "cache_size" : cache_size}
+
+  try :
+    if address == '-' :
+      asyncio.run(_serve_stdio(settings))
+    else :
+      asyncio.run(_serve_unix(address, settings))
+
+  except KeyboardInterrupt : pass
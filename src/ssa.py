@@ -0,0 +1,261 @@
+
+from .object_type import *
+from .data_type import align_to
+from .ir import *
+
+__all__ = ["dominators", "natural_loops", "to_ssa", "from_ssa"]
+
+# static single assignment form of the IR
+#
+# the scalar local variables are promoted to virtual registers, unless the
+# function takes the address of one, each load of such a variable is replaced
+# by the value last stored to it, and a phi is placed where the values of
+# different paths meet (at the dominance frontiers of its stores)
+# from_ssa turns the phis back into copies at the end of the predecessors
+
+def dominators(fn : IRFunction) -> dict:
+  # immediate dominator of each block (block id -> block), the entry is its own
+  # (Cooper, Harvey and Kennedy, "A Simple, Fast Dominance Algorithm")
+  order = fn.reverse_postorder()
+  index = {block.id : i for i, block in enumerate(order)}
+  entry = order[0]
+  idom = {entry.id : entry}
+
+  def intersect(a : BasicBlock, b : BasicBlock) -> BasicBlock:
+    while a is not b :
+      while index[a.id] > index[b.id] : a = idom[a.id]
+      while index[b.id] > index[a.id] : b = idom[b.id]
+    return a
+
+  changed = True
+  while changed :
+    changed = False
+    for block in order[1:] :
+      new_idom = None
+      for pred in block.preds :
+        if pred.id not in idom : continue
+        new_idom = pred if new_idom is None else intersect(pred, new_idom)
+
+      if idom.get(block.id) is not new_idom :
+        idom[block.id] = new_idom
+        changed = True
+
+  return idom
+
+def natural_loops(fn : IRFunction, idom : dict) -> list:
+  # the loops of fn as (header, ids of the blocks of the loop), the inner ones first
+  # a loop is made of the blocks reaching a back edge, one to a block (the
+  # header) that dominates its source, without going through the header
+
+  def dominates(a : BasicBlock, b : BasicBlock) -> bool:
+    while b is not a :
+      if idom[b.id] is b : return False # the entry
+      b = idom[b.id]
+    return True
+
+  loops = dict() # header id -> (header, ids of the blocks)
+
+  for block in fn.blocks :
+    for succ in block.succs :
+      if not dominates(succ, block) : continue
+
+      header, body = loops.setdefault(succ.id, (succ, {succ.id}))
+      work = [block]
+      while work :
+        other = work.pop()
+        if other.id in body : continue
+        body.add(other.id)
+        work.extend(other.preds)
+
+  return sorted(loops.values(), key = lambda loop : len(loop[1]))
+
+def _frontiers(fn : IRFunction, idom : dict) -> dict:
+  # dominance frontier of each block (block id -> set of blocks)
+  frontier = {block.id : set() for block in fn.blocks}
+
+  for block in fn.blocks :
+    if len(block.preds) < 2 : continue
+    for pred in block.preds :
+      runner = pred
+      while runner is not idom[block.id] :
+        frontier[runner.id].add(block)
+        runner = idom[runner.id]
+
+  return frontier
+
+def _promotable(fn : IRFunction) -> list:
+  # the local variables only reached by load and store, in the order of fn.lvars
+  for ins in fn.instructions() :
+    if ins.op == "addr" and ins.args[0].exposes_frame :
+      return []
+
+  return [var for var in fn.lvars if not var.data_type.is_array]
+
+def to_ssa(fn : IRFunction) -> list:
+  # promotes the local variables that can live in registers, returns them
+  promoted = _promotable(fn)
+  if not promoted : return []
+
+  variables = {id(var) for var in promoted}
+  idom = dominators(fn)
+  frontier = _frontiers(fn, idom)
+
+  # phi placement, at the iterated dominance frontier of the blocks storing to each variable
+  phis = dict() # id of phi Ins -> variable
+  for var in promoted :
+    stores = [block for block in fn.blocks
+              if any(ins.op == "store" and ins.args[0] is var for ins in block.instrs)]
+    placed = set()
+
+    while stores :
+      block = stores.pop()
+      for target in frontier[block.id] :
+        if target.id in placed : continue
+        placed.add(target.id)
+
+        phi = Ins("phi", fn.new_vreg(), *[0] * len(target.preds))
+        target.instrs.insert(0, phi)
+        phis[id(phi)] = var
+        stores.append(target)
+
+  # renaming, in a preorder of the dominator tree
+  children = {block.id : [] for block in fn.blocks}
+  for block in fn.blocks[1:] :
+    children[idom[block.id].id].append(block)
+
+  values = {id(var) : [] for var in promoted} # variable -> stack of its reaching values
+  replace = dict()                            # VReg id of a removed load -> its value
+
+  def current(var : LVar) :
+    # a variable read before any store is undefined, 0 is as good as any value
+    stack = values[id(var)]
+    return stack[-1] if stack else 0
+
+  def resolve(arg) :
+    if isinstance(arg, VReg) :
+      return replace.get(arg.id, arg)
+    return arg
+
+  work = [(fn.blocks[0], None)]
+  while work :
+    block, pushed = work.pop()
+
+    if pushed is not None :
+      # all the blocks dominated by block are done
+      for var in pushed : values[id(var)].pop()
+      continue
+
+    pushed = []
+    instrs = []
+
+    for ins in block.instrs :
+      if ins.op == "phi" and id(ins) in phis :
+        var = phis[id(ins)]
+        values[id(var)].append(ins.dest)
+        pushed.append(var)
+        instrs.append(ins)
+        continue
+
+      ins.args = [resolve(arg) for arg in ins.args]
+
+      if ins.op == "load" and id(ins.args[0]) in variables :
+        replace[ins.dest.id] = current(ins.args[0])
+      elif ins.op == "store" and id(ins.args[0]) in variables :
+        var, value = ins.args
+        size = var.data_type.size
+
+        # the value the store would have left in memory
+        if isinstance(value, int) :
+          value = truncate(value, size)
+        elif size < 8 :
+          dest = fn.new_vreg()
+          instrs.append(Ins("ext", dest, value, size))
+          value = dest
+
+        values[id(var)].append(value)
+        pushed.append(var)
+      else :
+        instrs.append(ins)
+
+    block.instrs = instrs
+
+    for succ in set(block.succs) :
+      for ins in succ.instrs :
+        if ins.op != "phi" : break
+        if id(ins) not in phis : continue
+        for j, pred in enumerate(succ.preds) :
+          if pred is block :
+            ins.args[j] = current(phis[id(ins)])
+
+    work.append((block, pushed))
+    work.extend((child, None) for child in reversed(children[block.id]))
+
+  # the promoted variables don't need their stack slots anymore
+  fn.lvars = [var for var in fn.lvars if id(var) not in variables]
+  offset = 0
+  for var in fn.lvars :
+    offset = align_to(offset + var.data_type.size, var.data_type.align)
+    var.offset = -offset
+  fn.stack_size = offset
+
+  return promoted
+
+def _sequentialize(fn : IRFunction, moves : list) -> list:
+  # copies performing the moves (dest, src) as if at once, the destinations are distinct
+  pending = [(dest, src) for dest, src in moves if src is not dest]
+  copies = []
+
+  def reads(src, dest : VReg) -> bool:
+    return isinstance(src, VReg) and src.id == dest.id
+
+  while pending :
+    for i, (dest, src) in enumerate(pending) :
+      # a destination can be written once no other move reads it
+      if not any(reads(other, dest) for j, (_, other) in enumerate(pending) if j != i) :
+        copies.append(Ins("copy", dest, src))
+        pending.pop(i)
+        break
+
+    else :
+      # a cycle, the value of one destination is saved first
+      dest = pending[0][0]
+      saved = fn.new_vreg()
+      copies.append(Ins("copy", saved, dest))
+      pending = [(d, saved if reads(src, dest) else src) for d, src in pending]
+
+  return copies
+
+def _split_edge(fn : IRFunction, pred : BasicBlock, block : BasicBlock) -> BasicBlock:
+  # a new block on the edge pred -> block, placed right before block
+  edge = fn.new_block()
+  edge.instrs.append(Ins("jmp", None, block))
+
+  fn.blocks.remove(edge)
+  fn.blocks.insert(fn.blocks.index(block), edge)
+
+  terminator = pred.terminator
+  terminator.args = [edge if arg is block else arg for arg in terminator.args]
+  return edge
+
+def from_ssa(fn : IRFunction) -> None:
+  # replaces the phis by copies in the predecessors, the edges from a block with
+  # other successors are split, so the copies only run on the way to the phi
+
+  for block in list(fn.blocks) :
+    phis = [ins for ins in block.instrs if ins.op == "phi"]
+    if not phis : continue
+
+    done = set()
+    for j, pred in enumerate(block.preds) :
+      if pred.id in done : continue
+      done.add(pred.id)
+
+      moves = [(phi.dest, phi.args[j]) for phi in phis]
+      if len(pred.succs) > 1 :
+        pred = _split_edge(fn, pred, block)
+
+      pred.instrs[-1:-1] = _sequentialize(fn, moves)
+
+    block.instrs = [ins for ins in block.instrs if ins.op != "phi"]
+
+  fn.compute_cfg()
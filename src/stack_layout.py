@@ -0,0 +1,45 @@
+
+from .object_type import *
+from .data_type import align_to
+
+__all__ = ["StackLayout"]
+
+class StackLayout :
+  # gives the local variables that are never live at the same time the same
+  # stack slots
+  # a variable lives from its declaration to the end of its block (its lifetime,
+  # in token positions, recorded by the parser), so the variables of sibling
+  # blocks, or of a block and the code after it, don't overlap
+  #
+  # the variables are stacked in the order they are declared, and the ones whose
+  # lifetime ended before the next one begins are popped first, so the
+  # variables live together keep the layout they had (e.g. for *(&x-1))
+
+  def __init__(self) :
+    self.frames = dict() # function name -> (bytes of the variables before, after)
+
+  def layout(self, fn) -> None:
+    # fn is a Fn or an IRFunction, its offsets and stack_size are rewritten
+    # variables without a lifetime (e.g. the slots of inlined functions) live
+    # through the whole function
+    def lifetime(var : LVar) -> tuple:
+      return var.lifetime if var.lifetime is not None else (-1, float("inf"))
+
+    before = fn.stack_size
+    active = [] # variables taking the top of the frame, the last one below the others
+    top = size = 0
+
+    for var in sorted(fn.lvars, key = lambda var : lifetime(var)[0]) :
+      start = lifetime(var)[0]
+
+      while active and lifetime(active[-1])[1] < start :
+        active.pop()
+        top = -active[-1].offset if active else 0
+
+      top = align_to(top + var.data_type.size, var.data_type.align)
+      var.offset = -top
+      active.append(var)
+      size = max(size, top)
+
+    fn.stack_size = size
+    self.frames[fn.name] = (before, size)
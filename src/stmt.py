@@ -2,6 +2,8 @@
 from .expr import *
 
 class Stmt(object) :
+  __slots__ = ()
+
   def __init__(self) : pass
   
   @property
@@ -25,28 +27,36 @@ class Stmt(object) :
     return isinstance(self, ForStmt)
 
 class ExpressionStmt(Stmt) :
+  __slots__ = ("expression",)
+
   def __init__(self, expr : Expr) :
     self.expression = expr
 
 class ReturnStmt(Stmt) :
+  __slots__ = ("ret_value",)
+
   def __init__(self, value : Expr) :
     self.ret_value = value
 
 class Block(Stmt) :
+  __slots__ = ("body",)
+
   def __init__(self, statements : list) :
     self.body = statements
 
 class IfStmt(Stmt) :
+  __slots__ = ("condition", "then_branch", "else_branch")
+
   def __init__(self, condition : Expr, then_branch : Stmt, else_branch : Stmt) :
     self.condition = condition
     self.then_branch = then_branch
     self.else_branch = else_branch
 
 class ForStmt(Stmt) :
+  __slots__ = ("init", "condition", "body", "inc")
+
   def __init__(self, init : Stmt, cond : Expr, inc : Expr, body : Stmt) :
     self.init = init
     self.condition = cond
     self.body = body
     self.inc = inc
-
-
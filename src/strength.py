@@ -0,0 +1,108 @@
+
+from functools import lru_cache
+
+from .instr import *
+
+__all__ = ["StrengthReducer"]
+
+# the factors that leaq computes from a register and itself, x + x * (f-1)
+_lea_factors = (3, 5, 9)
+
+def _imm(value : int) -> tuple:
+  # the instruction that loads value to a register
+  if -(1 << 31) <= value < (1 << 31) :
+    return "movq", "$%d" %(value)
+  return "movabsq", "$%d" %(value)
+
+@lru_cache(maxsize = None)
+def _magic(divisor : int) -> tuple:
+  # multiplier m and shift s, such that n / divisor is (n * m) >> (64 + s), rounded
+  # toward zero, for every signed 64-bit n (Granlund and Montgomery, "Division by
+  # Invariant Integers using Multiplication"), divisor isn't a power of 2
+  log = divisor.bit_length() # ceil(log2(divisor))
+  shift = log
+  low = (1 << (64 + log)) // divisor
+  high = ((1 << (64 + log)) + (1 << (log + 1))) // divisor
+
+  while low // 2 < high // 2 and shift > 0 :
+    low, high = low // 2, high // 2
+    shift -= 1
+
+  return high, shift
+
+class StrengthReducer :
+  # replaces the multiplications and signed divisions by constants with
+  # shifts, leaq and multiplications by a reciprocal, that are cheaper than
+  # imulq and much cheaper than idivq
+  # it gives None when it has nothing better than the plain instruction
+
+  def __init__(self) :
+    self.hits = {"mul" : 0, "div" : 0} # operations reduced
+
+  def multiply(self, reg : str, value : int) -> list:
+    # reg = reg * value
+    factor, power = abs(value), 0
+
+    if factor == 0 :
+      code = [Instr("movq", "$0", reg)]
+    else :
+      while factor % 2 == 0 :
+        factor //= 2
+        power += 1
+
+      if factor == 1 :
+        code = []
+      elif factor in _lea_factors :
+        code = [Instr("leaq", "(%s,%s,%d)" %(reg, reg, factor - 1), reg)]
+      else :
+        return None
+
+      if power > 0 :
+        code.append(Instr("shlq", "$%d" %(power), reg))
+      if value < 0 :
+        code.append(Instr("negq", reg))
+
+    self.hits["mul"] += 1
+    return code
+
+  def divide(self, value : int, scratch : str) -> list:
+    # %rax = %rax / value, rounded toward zero, %rdx and scratch are clobbered
+    divisor = abs(value)
+
+    if divisor == 0 :
+      return None # left to trap at run time
+
+    elif divisor & (divisor - 1) == 0 :
+      power = divisor.bit_length() - 1
+      if power == 0 :
+        code = []
+      else :
+        # negative dividends are biased by divisor-1, so the shift rounds toward zero
+        code = [Instr("cqto"), # %rdx = -1 if %rax < 0, else 0
+                Instr("shrq", "$%d" %(64 - power), "%rdx"),
+                Instr("addq", "%rdx", "%rax"),
+                Instr("sarq", "$%d" %(power), "%rax")]
+
+    else :
+      multiplier, shift = _magic(divisor)
+      signed = multiplier - (1 << 64) if multiplier >= (1 << 63) else multiplier
+
+      code = [Instr("movq", "%rax", scratch),
+              Instr(*_imm(signed), "%rax"),
+              Instr("imulq", scratch)] # %rdx = high 64 bits of n * multiplier
+
+      if multiplier >= (1 << 63) :
+        # the multiplier was taken as negative, n * 2^64 is added back
+        code.append(Instr("addq", scratch, "%rdx"))
+      if shift > 0 :
+        code.append(Instr("sarq", "$%d" %(shift), "%rdx"))
+
+      # the quotient is one less than rounded toward zero for a negative n
+      code += [Instr("shrq", "$63", scratch),
+               Instr("leaq", "(%%rdx,%s)" %(scratch), "%rax")]
+
+    if value < 0 :
+      code.append(Instr("negq", "%rax"))
+
+    self.hits["div"] += 1
+    return code
@@ -0,0 +1,61 @@
+
+from .object_type import *
+
+__all__ = ["SymbolTable"]
+
+class SymbolTable :
+  # globals and functions are indexed by name, and local variables live in a
+  # stack of block scopes
+  # every name maps to the chain of its visible declarations (innermost last),
+  # so a lookup is O(1) whatever the nesting, and exiting a scope only
+  # touches the names declared in it
+
+  def __init__(self) :
+    self.globals = dict()   # name -> GVar
+    self.functions = dict() # name -> Fn
+    self._bindings = dict() # name -> [LVar], the last one shadows the others
+    self._scopes = []       # [{name -> LVar}] of the open scopes, innermost last
+
+  def add_global(self, var : GVar) -> None:
+    # the first declaration wins
+    self.globals.setdefault(var.name, var)
+
+  def add_function(self, fn : Fn) -> None:
+    self.functions.setdefault(fn.name, fn)
+
+  def find_function(self, name : str) -> Fn:
+    return self.functions.get(name)
+
+  def enter_scope(self) -> None:
+    self._scopes.append(dict())
+
+  def exit_scope(self) -> list:
+    # returns the local variables declared in the scope
+
+    scope = self._scopes.pop()
+    for name in scope :
+      chain = self._bindings[name]
+      chain.pop()
+      if not chain : del self._bindings[name]
+
+    return list(scope.values())
+
+  @property
+  def depth(self) -> int:
+    # number of open scopes, 0 at file scope
+    return len(self._scopes)
+
+  def declared_in_scope(self, name : str) -> bool:
+    # if name was already declared in the innermost scope
+    return name in self._scopes[-1]
+
+  def add_local(self, name : str, var : LVar) -> None:
+    self._scopes[-1][name] = var
+    self._bindings.setdefault(name, []).append(var)
+
+  def find_var(self, name : str) -> Var:
+    # the innermost local variable, or else the global one (None if undeclared)
+    chain = self._bindings.get(name)
+
+    if chain : return chain[-1]
+    return self.globals.get(name)
@@ -0,0 +1,74 @@
+
+from .object_type import *
+from .data_type import ty_int
+from .ir import *
+
+__all__ = ["TailCallOptimizer"]
+
+class TailCallOptimizer :
+  # a call whose value is returned right away (a tail call) doesn't need the
+  # frame of the caller anymore
+  # the tail calls of a function to itself become jumps back to its start, and
+  # the other ones jump to the callee once the frame is gone, so it returns
+  # straight to the caller of the function
+  #
+  # both are left alone in functions that take the address of a local variable,
+  # as the callee may still reach it
+
+  def __init__(self, functions : list = ()) :
+    self.loops = 0 # self-recursive calls turned into jumps to the start
+    self.jumps = 0 # calls turned into tailcall
+    # the return types of the functions, the others return int
+    self._ret_types = {fn.name : fn.ret_type for fn in functions}
+
+  def _tail_calls(self, fn : IRFunction) -> list:
+    # the blocks ending in a call followed by a ret of its value
+    if any(ins.op == "addr" and ins.args[0].is_local for ins in fn.instructions()) :
+      return []
+
+    blocks = []
+    for block in fn.blocks :
+      if len(block.instrs) < 2 : continue
+      call, ret = block.instrs[-2:]
+      if call.op == "call" and ret.op == "ret" and ret.args and ret.args[0] is call.dest :
+        blocks.append(block)
+
+    return blocks
+
+  def to_loops(self, fn : IRFunction) -> None:
+    # over the IR before SSA, where the parameters are stored to their variables
+    # at the entry, the arguments of a self-recursive tail call are stored there
+    # again, and the call jumps back to the code that follows
+    blocks = [block for block in self._tail_calls(fn)
+              if block.instrs[-2].args[0] == fn.name and len(block.instrs[-2].args) - 1 == len(fn.params)]
+    if not blocks : return
+
+    entry = fn.blocks[0]
+    nparams = len(fn.params)
+    params = [ins.args[0] for ins in entry.instrs[:nparams]]
+
+    start = fn.new_block()
+    start.instrs = entry.instrs[nparams:]
+    entry.instrs[nparams:] = [Ins("jmp", None, start)]
+    fn.blocks.remove(start)
+    fn.blocks.insert(1, start)
+
+    for block in blocks :
+      if block is entry : block = start # its instructions moved there
+      args = block.instrs[-2].args[1:]
+      block.instrs[-2:] = [Ins("store", None, var, arg) for var, arg in zip(params, args)]
+      block.instrs.append(Ins("jmp", None, start))
+      self.loops += 1
+
+    fn.compute_cfg()
+
+  def to_jumps(self, fn : IRFunction) -> None:
+    # the remaining tail calls become tailcall terminators, at the end of the IR passes
+    for block in self._tail_calls(fn) :
+      call = block.instrs[-2]
+
+      # the caller of fn only sign-extends the bytes of the type of fn, the
+      # ones above the type of the callee would be left undefined
+      if self._ret_types.get(call.args[0], ty_int).size < fn.ret_type.size : continue
+      block.instrs[-2:] = [Ins("tailcall", None, *call.args)]
+      self.jumps += 1
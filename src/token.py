@@ -3,6 +3,7 @@ from .token_type import *
 __all__ = ["Token"]
 
 _debug = {
+  TokenType.COMMA : "COMMA",
   TokenType.SEMICOLON : "SEMICOLON",
   TokenType.LEFT_PAREN : "LEFT_PAREN", 
   TokenType.RIGHT_PAREN : "RIGHT_PAREN",
@@ -24,11 +25,16 @@ _debug = {
   TokenType.LESS_EQUAL : "LESS_EQUAL",
   TokenType.GREATER_EQUAL : "GREATER_EQUAL",
   TokenType.IDENTIFIER : "IDENTIFIER",
+  TokenType.CHAR : "CHAR",
+  TokenType.SHORT : "SHORT",
+  TokenType.INT : "INT",
+  TokenType.LONG : "LONG",
   TokenType.IF : "IF",
   TokenType.ELSE : "ELSE",
   TokenType.FOR : "FOR",
   TokenType.WHILE : "WHILE",
   TokenType.RETURN : "RETURN",
+  TokenType.SIZEOF : "SIZEOF",
   TokenType.NUM : "NUM",
   TokenType.EOF : "EOF"
 }
@@ -0,0 +1,100 @@
+from array import array
+
+from .token import *
+from .token_type import *
+
+__all__ = ["TokenBuffer", "TokenView"]
+
+class TokenBuffer :
+  # compact token storage: kinds, start offsets, lengths and line numbers are kept
+  # in typed arrays, and lexemes are only sliced from the source when asked for
+  # indexing it gives a TokenView, with the same fields as a Token
+
+  def __init__(self, source : str) :
+    self.source = source
+    self.kinds = array('B')   # TokenType
+    self.starts = array('q')  # offset of the lexeme in source
+    self.lengths = array('i') # length of the lexeme
+    self.rows = array('i')    # line number
+    self._line_starts = None  # offset of each line, only computed for columns
+
+  def __len__(self) -> int:
+    return len(self.kinds)
+
+  def __getitem__(self, index : int) -> "TokenView":
+    return TokenView(self, self._position(index))
+
+  def __iter__(self) :
+    for index in range(len(self.kinds)) :
+      yield TokenView(self, index)
+
+  def kind(self, index : int) -> TokenType:
+    # the kind of a token, without creating a view for it
+    return self.kinds[self._position(index)]
+
+  def release(self, index : int) -> None:
+    # the whole buffer is kept, it is compact enough
+    pass
+
+  def lexeme(self, index : int) -> str:
+    start = self.starts[index]
+    return self.source[start : start + self.lengths[index]]
+
+  def col(self, index : int) -> int:
+
+    if self._line_starts is None :
+      self._line_starts = array('q', [0])
+      pos = self.source.find('\n')
+      while pos != -1 :
+        self._line_starts.append(pos + 1)
+        pos = self.source.find('\n', pos + 1)
+
+    return self.starts[index] - self._line_starts[self.rows[index] - 1]
+
+  def _position(self, index : int) -> int:
+    # like a list, but past the end it keeps answering with the last (EOF) token
+    if index >= len(self.kinds) :
+      return len(self.kinds) - 1
+    elif index < 0 :
+      return index + len(self.kinds)
+    return index
+
+class TokenView :
+  # lightweight stand-in for a Token stored in a TokenBuffer
+  # kind is copied, since the parser reads it from almost every token it looks at
+  # (e.g. to match the one it expects), the other fields are read on demand
+  __slots__ = ("_buffer", "_index", "kind")
+
+  def __init__(self, buffer : TokenBuffer, index : int) :
+    self._buffer = buffer
+    self._index = index
+    self.kind = buffer.kinds[index]
+
+  @property
+  def lexeme(self) -> str:
+    return self._buffer.lexeme(self._index)
+
+  @property
+  def literal(self) -> object:
+
+    kind = self._buffer.kinds[self._index]
+
+    if kind == TokenType.NUM :
+      return int(self.lexeme)
+    elif kind == TokenType.IDENTIFIER :
+      return self.lexeme
+    return None
+
+  @property
+  def row(self) -> int:
+    return self._buffer.rows[self._index]
+
+  @property
+  def col(self) -> int:
+    return self._buffer.col(self._index)
+
+  def __str__(self) -> str:
+    return str(Token(self.kind, self.lexeme, self.literal))
+
+  def __copy__(self) :
+    return TokenView(self._buffer, self._index)
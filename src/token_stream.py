@@ -0,0 +1,62 @@
+
+from .token import *
+from .token_type import *
+
+__all__ = ["TokenStream"]
+
+class TokenStream :
+  # tokens pulled on demand from an iterator (e.g. a scanner generator), and
+  # addressed by their absolute index, like a list
+  # only a window of them is kept in memory: the owner releases the tokens it
+  # won't look back at anymore, so the window is bounded by the lookahead and
+  # backtracking of the parser instead of growing with the whole program
+
+  def __init__(self, tokens) :
+    self._iter = iter(tokens)
+    self._window = []
+    self._base = 0     # absolute index of _window[0]
+    self._last = None  # last token, once the iterator is exhausted
+
+  def __getitem__(self, index : int) -> Token:
+
+    pos = index - self._base
+
+    while pos >= len(self._window) :
+      if not self._fill() :
+        # past the end, keep answering with the last (EOF) token
+        return self._last
+
+    if pos < 0 :
+      if index == -1 :
+        # previous token at the beginning of input,
+        # a list of tokens would wrap around to its EOF token
+        return Token(TokenType.EOF, "", None)
+      raise IndexError("token %d was already released" %(index))
+
+    return self._window[pos]
+
+  def kind(self, index : int) -> TokenType:
+    return self[index].kind
+
+  def release(self, index : int) -> None:
+    # tokens before index aren't needed anymore
+    # the window is only trimmed once in a while, to amortize the cost of shifting it
+    pos = index - self._base
+
+    if pos > 256 :
+      del self._window[:pos]
+      self._base = index
+
+  def _fill(self) -> bool:
+
+    if self._last is not None : return False
+
+    token = next(self._iter, None)
+
+    if token is None :
+      # the scanner always ends with an EOF token
+      self._last = self._window[-1] if self._window else Token(TokenType.EOF, "", None)
+      return False
+
+    self._window.append(token)
+    return True
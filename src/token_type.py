@@ -12,11 +12,11 @@ class TokenType :
   BANG, BANG_EQUAL, EQUAL, EQUAL_EQUAL, \
   GREATER, GREATER_EQUAL, LESS, LESS_EQUAL, \
   \
-  IDENTIFIER, NUM, INT, \
+  IDENTIFIER, NUM, CHAR, SHORT, INT, LONG, \
   \
   ELSE, FOR, IF, RETURN, WHILE, \
   SIZEOF, \
   \
-  EOF =  range(31)
+  EOF =  range(34)
 
 
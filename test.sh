@@ -1,5 +1,17 @@
 #!/bin/bash
 
+# the whole suite runs once for every set of compiler flags,
+# unless the flags are given as arguments
+if [ $# -eq 0 ]; then
+  for flags in "-O0" "-O1" "-O1 -fno-fold" "-O1 -fno-regalloc" "-O1 -fno-peephole" "-O1 --tokens buffer" "-O2" "-O2 -fno-ssa" "-O2 -fno-peephole"; do
+    echo "flags: $flags"
+    "$0" $flags || exit
+  done
+  exit
+fi
+
+flags="$@"
+
 # cat input until EOF keyword and use it as a pipe to gcc
 # gcc compile as a .c source file, but stops before linking
 cat <<EOF | gcc -xc -c -o tmp2.o -
@@ -14,7 +26,7 @@ function assert {
   expected=$1
   input=$2
   
-  python3 main.py "$input" > tmp.S  2>STDERR.txt || exit
+  echo "$input" | python3 main.py $flags - > tmp.S  2>STDERR.txt || exit
   gcc -o tmp tmp.S tmp2.o
   ./tmp
   actual=$?
@@ -34,6 +46,11 @@ assert 41 'int main() { return 12 + 34 - 5 ; }'
 assert 47 'int main() { return 5+6*7; }'
 assert 15 'int main() { return 5*(9-6); }'
 assert 4  'int main() { return (3+5)/2; }'
+assert 253 'int main() { return -7/2; }'
+assert 3  'int main() { return 7/-2 * -1; }'
+assert 1  'int main() { return -7/2 == -3; }'
+assert 1  'int main() { return 4294967296 * 4294967296 == 0; }'
+assert 2  'int main() { return (3000000000 * 3) / 4500000000; }'
 
 assert 10 'int main() { return -10+20; }'
 assert 10 'int main() { return - -10; }'
@@ -116,6 +133,12 @@ assert  7 'int main() { return add2(3,4); } int add2(int x, int y) { return x+y;
 assert  1 'int main() { return sub2(4,3); } int sub2(int x, int y) { return x-y; }'
 assert 55 'int main() { return fib(9); } int fib(int x) { if (x<=1) return 1; return fib(x-1) + fib(x-2); }'
 
+assert  36 'int main() { int a=1, b=2, c=3, d=4, e=5, f=6, g=7, h=8; return a+b+c+d+e+f+g+h; }'
+assert  30 'int main() { int a=1, b=2, c=3, d=4, e=5, f=6, g=7; return add6(a,b,c,d,e,f) + g + ret2(); }'
+assert   9 'int main() { int x=1; return (((((((ret2()+x)*(x+1))-(x+2))+(x+3))-(x+4))+(x+5))-(x+6))+(x+7); }'
+assert  55 'int main() { int i=0, a=0, b=1, c; while (i<10) { c=add(a,b); a=b; b=c; i=i+1; } return a; }'
+assert 213 'int main() { int a=1,b=2,c=3,d=4,e=5,f=6,g=7,i; for (i=0;i<3;i=i+1) { a=a+b; b=b+c; c=c+d; d=d+e; e=e+f; f=f+g; g=g+1; } return a+b+c+d+e+f+g; }'
+
 assert 3 'int main() { int x[2]; int* y=&x; *y=3; return *x; }'
 
 assert 3 'int main() { int x[3]; *x=3; *(x+1)=4; *(x+2)=5; return *x; }'
@@ -133,19 +156,45 @@ assert 3 'int main() { int x[2][3]; int *y=x; *(y+3)=3; return **(x+1); }'
 assert 4 'int main() { int x[2][3]; int *y=x; *(y+4)=4; return *(*(x+1)+1); }'
 assert 5 'int main() { int x[2][3]; int *y=x; *(y+5)=5; return *(*(x+1)+2); }'
 
-assert  8 'int main() { int x; return sizeof(x); }'
-assert  8 'int main() { int x; return sizeof x; }'
+assert  4 'int main() { int x; return sizeof(x); }'
+assert  4 'int main() { int x; return sizeof x; }'
 assert  8 'int main() { int *x; return sizeof(x); }'
-assert 32 'int main() { int x[4]; return sizeof(x); }'
-assert 96 'int main() { int x[3][4]; return sizeof(x); }'
-assert 32 'int main() { int x[3][4]; return sizeof(*x); }'
-assert  8 'int main() { int x[3][4]; return sizeof(**x); }'
-assert  9 'int main() { int x[3][4]; return sizeof(**x) + 1; }'
-assert  9 'int main() { int x[3][4]; return sizeof **x + 1; }'
-assert  8 'int main() { int x[3][4]; return sizeof(**x + 1); }'
-assert  8 'int main() { int x=1; return sizeof(x=2); }'
+assert 16 'int main() { int x[4]; return sizeof(x); }'
+assert 48 'int main() { int x[3][4]; return sizeof(x); }'
+assert  8 'int main() { int x[4]; x[3]=8; return *(x+1+2); }'
+assert  6 'int main() { int x[2][3]; x[1][2]=6; return *(*(x+1)+2+0); }'
+assert 16 'int main() { int x[3][4]; return sizeof(*x); }'
+assert  4 'int main() { int x[3][4]; return sizeof(**x); }'
+assert  5 'int main() { int x[3][4]; return sizeof(**x) + 1; }'
+assert  5 'int main() { int x[3][4]; return sizeof **x + 1; }'
+assert  4 'int main() { int x[3][4]; return sizeof(**x + 1); }'
+assert  4 'int main() { int x=1; return sizeof(x=2); }'
 assert  1 'int main() { int x=1; sizeof(x=2); return x; }'
 
+assert  1 'int main() { char x; return sizeof(x); }'
+assert  2 'int main() { short x; return sizeof(x); }'
+assert  8 'int main() { long x; return sizeof(x); }'
+assert 12 'int main() { char x[3][4]; return sizeof(x); }'
+assert  4 'int main() { char x; return sizeof(x+1); }'
+assert  8 'int main() { int x; long y; return sizeof(x+y); }'
+assert  8 'int main() { int x; return sizeof(x+4294967296); }'
+assert  8 'int main() { int x[4], *p=x+3; return sizeof(p-x); }'
+
+assert 44 'int main() { char c=300; return c; }'
+assert 1 'int main() { char c=255; return c==-1; }'
+assert 1 'int main() { short s=65535; return s==-1; }'
+assert 1 'int main() { long b=4294967297; int x=b; return x; }'
+assert 1 'int main() { int x=2147483647; x=x+x; return x==-2; }'
+assert 44 'int main() { char c; return c=300; }'
+assert 2 'int main() { char c[4]; int i; for (i=0; i<4; i=i+1) c[i]=i*100; return (c[3]<0)+(c[2]<0)+(c[1]>0)*1; }'
+assert 3 'int main() { int x[4], *p=x+3; long l=x+3-x; return p-x+l-3; }'
+assert 7 'int main() { char a; int b; char c; long d; a=1; b=2; c=3; d=1; return a+b+c+d; }'
+assert 10 'int main() { short s[5]; char *p; int i; for (i=0; i<5; i=i+1) s[i]=i; p=s; return *(p+6)+s[4]+s[3]; }'
+assert 1 'long f(long x) { return x*x; } int main() { return f(65536)==4294967296; }'
+assert 1 'int f(int x) { return x; } int main() { return f(4294967297); }'
+assert 44 'char f(int x) { return x; } int main() { int y=f(300); return y; }'
+assert 5 'int f(char c, short s, int i, long l) { return c+s+i+l; } int main() { return f(257, 65537, 1, 2); }'
+
 assert 0 'int x; int main() { return x; }'
 assert 3 'int x; int main() { x=3; return x; }'
 assert 7 'int x; int y; int main() { x=3; y=4; return x+y; }'
@@ -155,7 +204,157 @@ assert 1 'int x[4]; int main() { x[0]=0; x[1]=1; x[2]=2; x[3]=3; return x[1]; }'
 assert 2 'int x[4]; int main() { x[0]=0; x[1]=1; x[2]=2; x[3]=3; return x[2]; }'
 assert 3 'int x[4]; int main() { x[0]=0; x[1]=1; x[2]=2; x[3]=3; return x[3]; }'
 
-assert 8 'int x; int main() { return sizeof(x); }'
-assert 32 'int x[4]; int main() { return sizeof(x); }'
+assert 2 'int x; int main() { int x=2; return x; }'
+assert 1 'int main() { int x=1; { int x=2; } return x; }'
+assert 2 'int main() { int x=1; { int x=2; return x; } }'
+assert 3 'int main() { int x=1; { int y=2; x=x+y; } return x; }'
+assert 5 'int main() { int x=1; { int x=2; { int x=3; } x=x+3; return x; } }'
+assert 6 'int x; int main() { x=1; { int x=5; x=x+1; return x; } }'
+
+assert 3 'int main() { int x=-7; return -(x/2); }'
+assert 2 'int main() { int x=-7; return -(x/3); }'
+assert 6 'int main() { int x=-7; return x*(-6)/7; }'
+assert 40 'int main() { int x=5; return x*8; }'
+
+assert 4 'int main() { for (;1<2;) return 4; return 5; }'
+assert 5 'int main() { for (;2<1;) return 4; return 5; }'
+assert 3 'int main() { int x=2<3; if (x) return 3; return 4; }'
+assert 7 'int main() { int x=0; if (x-1) return 7; return 8; }'
+assert 9 'int main() { int i=0, s=0; for (; 10>i; i=i+1) { if (i==3) s=s+1; else if (i<=4) s=s+2; } return s; }'
+
+assert 15 'int g; int bump() { g=g+1; return 0; } int main() { int i, s=0; g=0; for (i=0; i<5; i=i+1) { bump(); s=s+g; } return s; }'
+assert 15 'int g; int main() { int i, s=0, *p=&g; g=0; for (i=0; i<5; i=i+1) { *p=*p+1; s=s+g; } return s; }'
+assert 27 'int a[4]; int main() { int i, s=0, k=2; a[1]=3; for (i=0; i<3; i=i+1) { s=s+k*k+a[1]; a[1]=a[1]+1; a[2]=k; } return s+a[2]+1; }'
+
+assert 10 'int add2(int x, int y) { return x+y; } int main() { return add2(add2(1,2), add2(3,4)); }'
+assert 1 'int ev(int n) { if (n==0) return 1; return od(n-1); } int od(int n) { if (n==0) return 0; return ev(n-1); } int main() { return ev(10); }'
+assert 9 'int f(int k) { int a[2]; a[0]=k; a[1]=k*2; return a[0]+a[1]; } int main() { return f(1)+f(2); }'
+assert 6 'int g; int set(int x) { g=x; return x; } int main() { int i, s=0; for (i=0; i<3; i=i+1) { s=s+set(i); s=s+g; } return s; }'
+
+assert 120 'int fact(int n, int acc) { if (n<=1) return acc; return fact(n-1, acc*n); } int main() { return fact(5, 1); }'
+assert 7 'int gcd(int a, int b) { if (b==0) return a; return gcd(b, a-a/b*b); } int main() { return gcd(91, 35); }'
+assert 10 'int down(int n) { int s=n; if (n==0) return 0; s=s+down(n-1); return s; } int main() { return down(4); }'
+assert 3 'int f(int x, int y) { if (x==0) return y; return f(x-1, x+y) + 0; } int main() { return f(2, 0); }'
+assert 9 'int last(int *p, int n) { if (n==1) return *p; return last(p+1, n-1); } int main() { int a[3]; a[0]=1; a[1]=5; a[2]=9; return last(a, 3); }'
+assert 4 'int twice(int x) { return add(x, x); } int main() { return twice(2); }'
+
+assert 8 'int f(int a, int b, int c, int d, int e, int g) { return a-b+c-d+e-g*2; } int main() { return f(1, 2, 3, 4, 20, 5); }'
+assert 12 'int f(int a, int b, int c, int d) { int s=0, i; for (i=0; i<a; i=i+1) s=s+b*c-d/3; return s; } int main() { return f(3, 2, 3, 6); }'
+assert 8 'int f(int k) { int a[20]; a[0]=1; a[19]=k; return a[0]+a[19]; } int main() { return f(7); }'
+assert 6 'int f(int x) { int *p=&x; *p=*p+1; return x; } int main() { return f(5); }'
+assert 5 'int f(int x, int y) { int a[2]; a[0]=x; a[1]=y; return a[0]*a[0]+a[1]; } int main() { return f(1, 2)+f(0, 2); }'
+
+assert 35 'int f(int n) { int s=0; if (n) { int a[40]; a[3]=n; s=a[3]; } else { int b[40]; b[5]=2; s=b[5]; } { int c[30]; c[0]=s; s=c[0]+1; } int d[10]; d[1]=s; return d[1]; } int main() { return f(2)*10+f(0)+2; }'
+assert 12 'int main() { int s=0, i; for (i=0; i<3; i=i+1) { int a[2]; a[0]=i; { int b[2]; b[1]=a[0]+1; s=s+b[1]; } { int c; c=a[0]; s=s+c; } } return s+3; }'
+assert 7 'int main() { int x=1; { int a[4]; a[0]=2; x=x+a[0]; } { int b[4], *p=&b[1]; b[0]=0; *p=4; x=x+b[1]; } return x; }'
+
+# tail calls don't grow the stack, deep enough to overflow it otherwise
+case "$flags" in
+*-fno-tailcall*) ;;
+*-O2*)
+  assert 4 'int ev(int n) { if (n==0) return 1; return od(n-1); } int od(int n) { if (n==0) return 0; return ev(n-1); } int main() { return ev(10000000)*4; }'
+  assert 50 'long sum(long n, long s) { if (n==0) return s; return sum(n-1, s+n); } int main() { return sum(10000000, 0) / 1000000000000; }'
+  ;;
+esac
+
+assert 21 'int main() { int x=1, y=2, t, i; for (i=0; i<3; i=i+1) { t=x; x=y; y=t; } return x*10+y; }'
+assert 2 'int main() { int r=0, i; for (i=0; i<5; i=i+1) { if (i==2) r=i; } return r; }'
+assert 3 'int main() { int a=3; int b=5; return a; }'
+assert 8 'int main() { int a=3; a=5; a+1; a=8; return a; }'
+assert 4 'int main() { int x=1; int *p=&x; x=2; x=4; return *p; }'
+assert 6 'int x; int main() { x=1; x=6; return x; }'
+
+assert 4 'int x; int main() { return sizeof(x); }'
+assert 16 'int x[4]; int main() { return sizeof(x); }'
+assert 8 'long x; int main() { return sizeof(x); }'
+assert 1 'char g[3]; long h; int main() { g[0]=1; g[1]=-1; g[2]=1; h=-1; return g[0]+g[1]+g[2]+h+1; }'
+
+assert 5 'int g=5; int main() { return g; }'
+assert 9 'int g=5; long t[4]={1, 2, 3, 4}; int main() { return g+t[3]; }'
+assert 6 'int t[4]={1, 2, 3,}; int main() { return t[0]+t[1]+t[2]+t[3]; }'
+assert 7 'int m[2][3]={1, 2, 3, 4, 5, 6}; int main() { return m[1][0]+m[0][2]; }'
+assert 3 'char c=300; short s[2]={65535}; int main() { return (c==44)+(s[0]==-1)+(s[1]==0); }'
+assert 17 'long n=2*sizeof(n)+1, z; int main() { z=z+n; return z; }'
+assert 8 'int g=0, h, *p; int main() { return g+h+(p==0)*8; }'
+
+# several translation units compiled in one invocation, one .s per input
+echo 'int main() { return 3; }' > tmp_a.c
+echo 'int x; int main() { x=4; return x; }' > tmp_b.c
+
+for jobs in 1 2; do
+  rm -f tmp_a.s tmp_b.s
+  python3 main.py $flags -j $jobs tmp_a.c tmp_b.c 2>STDERR.txt || exit
+
+  for expected in "3 tmp_a" "4 tmp_b"; do
+    set -- $expected
+    gcc -o tmp $2.s tmp2.o
+    ./tmp
+    actual=$?
+
+    if [ "$actual" = "$1" ]; then
+      echo "-j $jobs $2.c => $actual"
+    else
+      echo "-j $jobs $2.c => expected $1, got $actual"
+      exit 1
+    fi
+  done
+done
+
+# the second compilation of a source comes from the cache, with the same
+# assembly and warnings, other options or a cache too small to keep it miss
+cache=$(mktemp -d)
+echo 'int main() { return f(); } int f() { return 3; }' > tmp_a.c
+
+first=$(python3 main.py $flags --cache-dir $cache tmp_a.c -o tmp_a.s 2>&1) || exit 1
+second=$(python3 main.py $flags --cache-dir $cache --cache-stats tmp_a.c -o tmp_b.s 2>&1) || exit 1
+echo "$first" | grep -q "implicit declaration" || exit 1
+[ "$(echo "$second" | grep -v "^cache")" = "$first" ] && cmp -s tmp_a.s tmp_b.s || exit 1
+echo "$second" | grep -q "1 hits, 0 misses, 1 entries" || exit 1
+
+python3 main.py $flags --cache-dir $cache --cache-stats --inline-threshold 1 tmp_a.c -o tmp_b.s 2>&1 |
+  grep -q "0 hits, 1 misses, 2 entries" || exit 1
+python3 main.py $flags --cache-dir $cache --cache-stats --cache-size 1 2>&1 |
+  grep -q "0 entries, 0 bytes" || exit 1
+rm -rf $cache
+
+# an input that isn't UTF-8 text fails, and the others are still compiled
+printf 'int main() { return 0; } \xff\n' > tmp_b.c
+
+for jobs in 1 2; do
+  rm -f tmp_a.s
+  python3 main.py $flags -j $jobs tmp_b.c tmp_a.c 2>STDERR.txt && exit 1
+  grep -q "sidcc: tmp_b.c: invalid UTF-8" STDERR.txt && [ -f tmp_a.s ] || exit 1
+done
+
+# the compile server answers a malformed request with an error, and keeps serving
+# the next one, compiled with the options it gives
+printf '%s\n' '{"id": 1, "source": 5}' \
+  '{"id": 2, "source": "int main() { return 0; }", "options": {"opt_level": 2, "emit_ir": true}}' |
+  python3 main.py --serve - | cat > tmp.S
+head -1 tmp.S | grep -q '"error"' && tail -1 tmp.S | grep -q '"ok": true.*ret 0' || exit 1
+
+# the IR is written instead of the assembly
+echo 'int main() { return 3; }' | python3 main.py $flags --emit-ir - | grep -q "ret 3" || exit 1
+
+# the variables of sibling blocks share their stack slots
+case "$flags" in
+*-O0*|*-fno-slots*) ;;
+*) echo 'int f() { { long a[8]; a[0]=1; } { long b[8]; b[0]=2; return b[0]; } }' |
+     python3 main.py $flags --stats - 2>&1 >/dev/null | grep -q "frame of f: 64 bytes" || exit 1 ;;
+esac
+
+# the zero-initialized globals go to .bss, the others to .data
+echo 'int x, y=0, z=1; int main() { return 0; }' | python3 main.py $flags - |
+  sed -n '/^\.bss/,/^\.text/p' > tmp.S
+grep -q "^y:" tmp.S && ! grep -q "^z:" tmp.S || exit 1
+
+# the initializers of globals are known at compile time
+echo 'int h; int g=h; int main() { return 0; }' | python3 main.py $flags - >/dev/null 2>&1 && exit 1
+
+# leaf functions don't set up a frame
+case "$flags" in
+*-O0*|*-fno-leaf*|*-fno-regalloc*) ;;
+*) echo 'int inc(int x) { int a[2]; a[1]=x; return a[1]+1; }' | python3 main.py $flags - | grep -q "%rbp" && exit 1 ;;
+esac
 
 echo OK
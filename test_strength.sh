@@ -0,0 +1,81 @@
+#!/bin/bash
+
+# checks the multiplications and divisions by constants, that the strength
+# reduction rewrites, against the same operations compiled by gcc
+# every constant gets a function compiled by sidcc, called by a gcc harness
+# with thousands of dividends, including the extremes of 64 bits
+
+constants="(-9223372036854775807-1) 9223372036854775807 1000000007 3221225472 5368709120 6442450944"
+
+for ((c = 1; c <= 260; c++)); do
+  constants="$constants $c (-$c)"
+done
+
+for ((k = 9; k <= 62; k++)); do
+  p=$((1 << k))
+  constants="$constants $p (-$p) $((p - 1)) (-$((p - 1))) $((p + 1)) (-$((p + 1)))"
+done
+
+rm -f tmp_strength.c tmp_harness.c
+
+n=0
+for c in $constants; do
+  echo "long d$n(long x) { return x / $c; }" >> tmp_strength.c
+  echo "long m$n(long x) { return x * $c; }" >> tmp_strength.c
+  echo "long d$n(long); long m$n(long);" >> tmp_harness.c
+  echo "long r_d$n(long x) { return x / ${c/%)/L)}; }" >> tmp_harness.c
+  echo "long r_m$n(long x) { return (long)((unsigned long)x * (unsigned long)${c/%)/L)}); }" >> tmp_harness.c
+  n=$((n + 1))
+done
+
+cat <<EOF >> tmp_harness.c
+#include <stdio.h>
+#include <limits.h>
+
+typedef long (*fn)(long);
+struct test { const char *op; fn ours, ref; int divides; };
+
+struct test tests[] = {
+$(for ((i = 0; i < n; i++)); do echo "  { \"d$i\", d$i, r_d$i, 1 }, { \"m$i\", m$i, r_m$i, 0 },"; done)
+};
+
+int main() {
+  static long xs[30000];
+  int count = 0, failed = 0;
+  unsigned long seed = 88172645463325252UL;
+
+  for (long x = -1100; x <= 1100; x++) xs[count++] = x;
+  for (int k = 0; k < 63; k++) {
+    long p = 1L << k;
+    xs[count++] = p; xs[count++] = -p; xs[count++] = p - 1; xs[count++] = -p + 1;
+  }
+  xs[count++] = LONG_MAX; xs[count++] = LONG_MIN; xs[count++] = LONG_MIN + 1;
+  while (count < 30000) {
+    seed ^= seed << 13; seed ^= seed >> 7; seed ^= seed << 17;
+    xs[count++] = (long)(seed >> (seed & 63)) * ((seed & 64) ? -1 : 1);
+  }
+
+  for (unsigned t = 0; t < sizeof(tests) / sizeof(tests[0]); t++) {
+    for (int i = 0; i < count; i++) {
+      long x = xs[i];
+      if (tests[t].divides && x == LONG_MIN && tests[t].ref(-1) == 1) continue; /* LONG_MIN / -1 traps */
+      long expected = tests[t].ref(x), actual = tests[t].ours(x);
+      if (expected != actual) {
+        if (failed++ < 10) printf("%s(%ld) => expected %ld, got %ld\n", tests[t].op, x, expected, actual);
+      }
+    }
+  }
+
+  printf("%d constants, %d dividends, %d failures\n", (int)(sizeof(tests) / sizeof(tests[0]) / 2), count, failed);
+  return failed != 0;
+}
+EOF
+
+for flags in "-O1" "-O2"; do
+  python3 main.py $flags tmp_strength.c -o tmp_strength.s || exit
+  gcc -O1 -o tmp_strength tmp_harness.c tmp_strength.s 2>/dev/null || exit
+  echo -n "flags: $flags: "
+  ./tmp_strength || exit
+done
+
+echo OK